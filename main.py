@@ -1,5 +1,13 @@
-import uvicorn
-from md_api.main import app
+import argparse
+
+from md_api.server import serve
+from md_core.config import API_HOST, API_PORT, API_WORKERS
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Servidor da API Delegacia 5.0")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS,
+                        help="Número de workers (>1 pré-carrega dados e modelo e faz fork)")
+    args = parser.parse_args()
+    serve("md_api.main", host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from md_core.metrics import REGISTRY, span
+from md_core.serialization import dumps
+
+QUEUE_WAIT_SECONDS = REGISTRY.histogram("delegacia_pool_queue_wait_seconds",
+                                        "Tempo de espera na fila do pool até começar a executar", ["pool"])
+_END = object()
+
+
+class WorkPool:
+    """Executor dedicado a uma classe de endpoints, com limite de concorrência.
+
+    Até ``max_workers`` tarefas rodam ao mesmo tempo e até ``max_queue``
+    aguardam; além disso a requisição é recusada com 429 em vez de entrar numa
+    fila sem fim. Como cada classe tem o seu executor, um pico de KMeans não
+    ocupa as threads que atendem os endpoints leves.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.capacity = self.max_workers + max(0, max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"pool-{name}")
+        # Só é alterado no event loop, então dispensa lock.
+        self.in_flight = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Reserva uma vaga na fila do pool ou responde 429; devolva com ``release``."""
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(status_code=429, headers={"Retry-After": "1"},
+                                detail=f"Servidor ocupado ('{self.name}'). Tente novamente em instantes.")
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Reserva uma vaga durante o bloco ``async with``."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def execute(self, fn, *args, **kwargs):
+        """Executa ``fn`` no executor do pool, sem reservar vaga (quem chama já tem uma)."""
+        enfileirado = time.perf_counter()
+
+        def tarefa():
+            QUEUE_WAIT_SECONDS.observe(time.perf_counter() - enfileirado, self.name)
+            return fn(*args, **kwargs)
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, tarefa)
+
+    async def run(self, fn, *args, **kwargs):
+        async with self.slot():
+            return await self.execute(fn, *args, **kwargs)
+
+    async def stream(self, chunks):
+        """Percorre o gerador síncrono ``chunks`` no executor e devolve a vaga no fim.
+
+        Para ``StreamingResponse``: a vaga reservada com ``acquire`` no handler
+        fica presa enquanto os pedaços são gerados (a serialização por linha
+        é a maior parte do trabalho), em vez de só durante a consulta.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, _END)
+                if chunk is _END:
+                    break
+                yield chunk
+        finally:
+            self.release()
+            try:
+                chunks.close()
+            except ValueError:
+                # Cancelado com um pedaço ainda em execução numa thread: o
+                # gerador termina esse pedaço e é descartado depois.
+                pass
+
+    async def run_json(self, fn, *args, **kwargs):
+        """Executa ``fn`` e serializa o resultado no pool, fora do event loop.
+
+        O resultado vai direto para bytes (``md_core.serialization``), sem
+        passar pelo ``jsonable_encoder``; ``fn`` deve devolver tipos JSON,
+        escalares numpy ou datas.
+        """
+        def tarefa():
+            resultado = fn(*args, **kwargs)
+            with span("api.serialize"):
+                return Response(content=dumps(resultado), media_type="application/json")
+        return await self.run(tarefa)
+
+    def stats(self):
+        return {"workers": self.max_workers, "capacidade": self.capacity, "em_andamento": self.in_flight,
+                "recusadas": self.rejected}
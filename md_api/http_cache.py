@@ -0,0 +1,19 @@
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """Compara o cabeçalho If-None-Match (lista, ``*`` ou ETags fracos) com o ETag atual."""
+    if not if_none_match:
+        return False
+    candidatos = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidatos or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidatos)
+
+
+def etag_response(request: Request, body: bytes, etag: str):
+    """200 com o corpo pré-serializado, ou 304 se o cliente já tem esta versão."""
+    # no-cache: o cliente pode guardar a resposta, mas revalida (e recebe 304) a cada uso.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
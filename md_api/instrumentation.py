@@ -0,0 +1,48 @@
+"""Middleware de métricas por rota (latência, status, requisições em andamento).
+
+É um middleware ASGI puro: mede até o último byte do corpo, inclusive nas
+respostas em streaming, sem o custo do BaseHTTPMiddleware. A rota vem do
+template do FastAPI (``/occurrences/grid``), não da URL, para não criar uma
+série por parâmetro; requisições sem rota (404) ficam em ``<sem rota>``.
+"""
+import asyncio
+import time
+
+from md_core.metrics import REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram("delegacia_http_request_duration_seconds",
+                                     "Latência das requisições HTTP por rota", ["method", "route"])
+REQUESTS_TOTAL = REGISTRY.counter("delegacia_http_requests_total", "Requisições HTTP por rota e status",
+                                  ["method", "route", "status"])
+IN_FLIGHT = REGISTRY.gauge("delegacia_http_requests_in_flight", "Requisições HTTP em andamento")
+
+
+class MetricsMiddleware:
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duracao = time.perf_counter() - inicio
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            rota = getattr(route, "path", None) or "<sem rota>"
+            REQUEST_SECONDS.observe(duracao, scope["method"], rota)
+            REQUESTS_TOTAL.inc(scope["method"], rota, str(status[0]))
+            if self.profiler is not None and duracao * 1000 >= self.profiler.slow_ms:
+                await asyncio.to_thread(self.profiler.request_finished, scope["method"], rota, inicio, duracao)
@@ -1,18 +1,61 @@
-from fastapi import FastAPI, Query
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel
-from md_data_analysis.analyzer import DataAnalyzer
-from md_model.predictor import CrimePredictor
+from md_data_analysis.analyzer import HEATMAP_COLS, OCCURRENCE_COLS, DataAnalyzer
+from md_model.batching import MicroBatcher
+from md_model.cache import PredictionCache
+from md_model.hotswap import ModelManager
+from md_model.registry import ModelRegistry
+from md_core.config import (PREDICT_BATCH_MAX_SIZE, PREDICT_BATCH_WINDOW_MS, INGEST_JOURNAL_PATH,
+                            HOTSPOT_CACHE_SIZE, HOTSPOT_WARMUP, RESPONSE_CACHE_SIZE, GRID_CACHE_SIZE, MODEL_NAME, MODEL_RELOAD_INTERVAL_S,
+                            MODEL_SHADOW_SAMPLE_RATE, MODEL_SHADOW_MAX_PENDING, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S,
+                            PREDICT_POOL_WORKERS, PREDICT_POOL_QUEUE, HOTSPOT_POOL_WORKERS, HOTSPOT_POOL_QUEUE,
+                            STATS_POOL_WORKERS, STATS_POOL_QUEUE, INGEST_POOL_WORKERS, INGEST_POOL_QUEUE,
+                            METRICS_ENABLED, PROFILE_SLOW_REQUEST_MS, PROFILE_INTERVAL_MS, PROFILE_DIR)
+from md_core.metrics import REGISTRY, Counter, Gauge, process_rss_bytes
+from md_core.serialization import to_columns
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from md_api.streaming import stream_json_array, stream_json_columns, stream_ndjson
+from md_api.concurrency import WorkPool
+from md_api.http_cache import etag_response
+from md_api.instrumentation import MetricsMiddleware
+from md_api.profiler import SamplingProfiler
 from pathlib import Path
+import os
+import threading
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_PATH = BASE_DIR / "data" / "dataset_ocorrencias_delegacia_5.csv"
-MODEL_PIPELINE_PATH = BASE_DIR / "artifacts" / "lgbm_model.joblib"
+# DATA_PATH permite servir outro CSV com o mesmo esquema (ex.: os sintéticos de md_benchmark)
+DATA_PATH = Path(os.getenv("DATA_PATH") or BASE_DIR / "data" / "dataset_ocorrencias_delegacia_5.csv")
+# Modelo legado, usado enquanto o registro (artifacts/registry.json) não tiver versão ativa
+MODEL_PIPELINE_PATH = BASE_DIR / "artifacts" / "lightgbm_model.joblib"
+# Artefato compacto exportado do pipeline (python -m md_model.serving artifacts/lightgbm_model.joblib)
+MODEL_SERVING_PATH = BASE_DIR / "artifacts" / "lightgbm_model.serving"
+# Marcado por md_api/server.py quando o pai já pré-calculou os hotspots antes do fork
+HOTSPOTS_PRELOADED = False
+
+@asynccontextmanager
+async def lifespan(app):
+    # Threads em segundo plano nascem no processo que serve: no modo multi-worker
+    # (md_api/server.py) isso acontece depois do fork, em cada worker.
+    if HOTSPOT_WARMUP and not HOTSPOTS_PRELOADED:
+        threading.Thread(target=analyzer.warm_hotspots, daemon=True).start()
+    if MODEL_RELOAD_INTERVAL_S > 0:
+        model_manager.start_polling(MODEL_RELOAD_INTERVAL_S)
+    if profiler is not None:
+        profiler.start()
+    yield
+    if profiler is not None:
+        profiler.stop()
 
 app = FastAPI(
     title="Delegacia 5.0 - API Preditiva de Crimes",
     description="API para análise e predição de ocorrências criminais.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = ["http://localhost:5173"]
@@ -24,8 +67,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-analyzer = DataAnalyzer(file_path=DATA_PATH)
-predictor = CrimePredictor(model_pipeline_path=MODEL_PIPELINE_PATH)
+profiler = SamplingProfiler(PROFILE_DIR, PROFILE_SLOW_REQUEST_MS, PROFILE_INTERVAL_MS) \
+    if PROFILE_SLOW_REQUEST_MS > 0 else None
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, profiler=profiler)
+
+analyzer = DataAnalyzer(file_path=DATA_PATH, journal_path=INGEST_JOURNAL_PATH,
+                        hotspot_cache_size=HOTSPOT_CACHE_SIZE, response_cache_size=RESPONSE_CACHE_SIZE,
+                        grid_cache_size=GRID_CACHE_SIZE)
+
+model_manager = ModelManager(
+    ModelRegistry(BASE_DIR / "artifacts"),
+    MODEL_NAME,
+    fallback_paths=[MODEL_SERVING_PATH, MODEL_PIPELINE_PATH],
+    shadow_sample_rate=MODEL_SHADOW_SAMPLE_RATE,
+    shadow_max_pending=MODEL_SHADOW_MAX_PENDING
+)
+model_manager.reload()
+
+def _predict_batch(inputs: list):
+    """Prediz o lote e devolve ``(resultado, versão do modelo)`` por entrada.
+
+    Preditor e versão são lidos juntos (troca atômica no ModelManager), então
+    o resultado vai para o cache sob a versão que de fato o produziu, mesmo
+    que o modelo seja trocado durante a requisição.
+    """
+    predictor, versao = model_manager.active
+    resultados = predictor.predict_batch(inputs)
+    model_manager.shadow(inputs, resultados)
+    return [(resultado, versao) for resultado in resultados]
+
+# Trabalho pesado roda em pools dedicados e limitados; endpoints de metadados
+# respondem direto no event loop e não disputam threads com KMeans ou inferência.
+predict_pool = WorkPool("predict", PREDICT_POOL_WORKERS, PREDICT_POOL_QUEUE)
+hotspot_pool = WorkPool("hotspots", HOTSPOT_POOL_WORKERS, HOTSPOT_POOL_QUEUE)
+stats_pool = WorkPool("statistics", STATS_POOL_WORKERS, STATS_POOL_QUEUE)
+ingest_pool = WorkPool("ingest", INGEST_POOL_WORKERS, INGEST_POOL_QUEUE)
+work_pools = [predict_pool, hotspot_pool, stats_pool, ingest_pool]
+
+predict_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=PREDICT_BATCH_WINDOW_MS,
+    executor=predict_pool.executor
+)
+prediction_cache = PredictionCache(maxsize=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL_S)
 
 class OcorrenciaInput(BaseModel):
     bairro: str
@@ -44,48 +130,224 @@ class OcorrenciaInput(BaseModel):
     dia_semana: int
     hora: int
 
+class OcorrenciaRegistro(BaseModel):
+    id_ocorrencia: str
+    data_ocorrencia: datetime
+    bairro: str
+    tipo_crime: str
+    descricao_modus_operandi: str
+    arma_utilizada: str
+    quantidade_vitimas: int
+    quantidade_suspeitos: int
+    sexo_suspeito: str
+    idade_suspeito: int
+    orgao_responsavel: str
+    status_investigacao: str
+    latitude: float
+    longitude: float
+
 class HotspotInput(BaseModel):
     bairro: str
     hora: int
     n_hotspots: int = 3
 
+@REGISTRY.collector
+def _runtime_metrics():
+    """Estatísticas já mantidas por caches, pools e modelo, lidas na hora do /metrics."""
+    hits = Counter("delegacia_cache_hits_total", "Acertos por cache", ["cache"])
+    misses = Counter("delegacia_cache_misses_total", "Faltas por cache", ["cache"])
+    for nome, cache in (("predicoes", prediction_cache), ("respostas", analyzer.response_cache),
+                        ("grade", analyzer.grid_cache), ("hotspots", analyzer.hotspot_cache)):
+        hits.inc(nome, amount=cache.hits)
+        misses.inc(nome, amount=cache.misses)
+    em_andamento = Gauge("delegacia_pool_in_flight", "Tarefas executando ou na fila, por pool", ["pool"])
+    capacidade = Gauge("delegacia_pool_capacity", "Limite de tarefas (workers + fila) por pool", ["pool"])
+    recusadas = Counter("delegacia_pool_rejected_total", "Requisições recusadas com 429, por pool", ["pool"])
+    for pool in work_pools:
+        em_andamento.set(pool.in_flight, pool.name)
+        capacidade.set(pool.capacity, pool.name)
+        recusadas.inc(pool.name, amount=pool.rejected)
+    metricas = [hits, misses, em_andamento, capacidade, recusadas]
+    linhas = Gauge("delegacia_occurrences", "Ocorrências carregadas em memória")
+    linhas.set(analyzer.n_rows)
+    memoria_dados = Gauge("delegacia_analyzer_memory_bytes", "Memória do DataAnalyzer (dados e índices)", ["parte"])
+    for parte, total in analyzer.memory_usage().items():
+        if parte != "total":
+            memoria_dados.set(total, parte)
+    metricas.append(memoria_dados)
+    versao_dados = Gauge("delegacia_data_version", "Versão dos dados (incrementa a cada ingestão)")
+    versao_dados.set(analyzer.version)
+    modelo = Gauge("delegacia_model_info", "Versão do modelo servida", ["modelo", "versao"])
+    modelo.set(1, MODEL_NAME, str(model_manager.active_version))
+    metricas += [linhas, versao_dados, modelo]
+    rss = process_rss_bytes()
+    if rss is not None:
+        memoria = Gauge("process_resident_memory_bytes", "Memória residente do processo")
+        memoria.set(rss)
+        metricas.append(memoria)
+    return metricas
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Formato texto do Prometheus; cada worker responde pelas próprias métricas.
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Bem-vindo à API Delegacia 5.0. Acesse /docs para a documentação."}
 
 @app.post("/predict")
-def predict_crime(ocorrencia: OcorrenciaInput):
-    return predictor.predict(ocorrencia.dict())
+async def predict_crime(ocorrencia: OcorrenciaInput):
+    entrada = ocorrencia.dict()
+    # A versão entra na chave: após uma troca de modelo o cache antigo deixa de ser consultado.
+    resultado = prediction_cache.get(prediction_cache.key(entrada, model_manager.active_version))
+    if resultado is None:
+        async with predict_pool.slot():
+            resultado, versao = await predict_batcher.submit(entrada)
+        prediction_cache.put(prediction_cache.key(entrada, versao), resultado)
+    return resultado
+
+def _predict_batch_cached(entradas: list):
+    versao = model_manager.active_version
+    chaves = [prediction_cache.key(entrada, versao) for entrada in entradas]
+    resultados = [prediction_cache.get(chave) for chave in chaves]
+    faltantes = [i for i, resultado in enumerate(resultados) if resultado is None]
+    if faltantes:
+        for i, (resultado, versao_usada) in zip(faltantes, _predict_batch([entradas[i] for i in faltantes])):
+            resultados[i] = resultado
+            prediction_cache.put(prediction_cache.key(entradas[i], versao_usada), resultado)
+    return resultados
+
+@app.post("/predict/batch")
+async def predict_crime_batch(ocorrencias: List[OcorrenciaInput]):
+    return await predict_pool.run_json(_predict_batch_cached, [ocorrencia.dict() for ocorrencia in ocorrencias])
+
+@app.get("/models")
+async def get_model_status():
+    return {**model_manager.status(), "cache_predicoes": prediction_cache.stats(),
+            "pools": {pool.name: pool.stats() for pool in work_pools}}
+
+@app.post("/models/reload")
+async def reload_model():
+    # Carrega em segundo plano; a troca acontece quando a nova versão estiver pronta.
+    model_manager.reload_async()
+    return {"status": "recarregando", **model_manager.status()}
 
 @app.post("/predict/hotspots")
-def predict_crime_hotspots(data: HotspotInput):
-    return analyzer.predict_hotspots(
-        bairro=data.bairro, 
-        hora=data.hora, 
+async def predict_crime_hotspots(data: HotspotInput):
+    return await hotspot_pool.run_json(
+        analyzer.predict_hotspots,
+        bairro=data.bairro,
+        hora=data.hora,
         n_clusters=data.n_hotspots
     )
 
+def _viewport(lat_min, lat_max, lon_min, lon_max):
+    limites = (lat_min, lat_max, lon_min, lon_max)
+    if all(valor is None for valor in limites):
+        return None
+    if any(valor is None for valor in limites):
+        raise HTTPException(status_code=422, detail="Informe lat_min, lat_max, lon_min e lon_max juntos.")
+    if lat_min > lat_max or lon_min > lon_max:
+        raise HTTPException(status_code=422, detail="Retângulo inválido: mínimos maiores que máximos.")
+    return limites
+
 @app.get("/occurrences")
-def get_occurrences(
+async def get_occurrences(
     tipo_crime: str = Query(None, description="Filtra ocorrências por um tipo de crime específico"),
-    bairro: str = Query(None, description="Filtra ocorrências por parte do nome do bairro")
+    bairro: str = Query(None, description="Filtra ocorrências por parte do nome do bairro"),
+    limit: int = Query(None, ge=1, description="Tamanho máximo da página"),
+    after_id: str = Query(None, description="Cursor: retorna ocorrências com id_ocorrencia posterior a este"),
+    format: str = Query("json", pattern="^(json|ndjson|columns)$",
+                        description="json (array), ndjson (um registro por linha) ou columns ({coluna: [valores]})"),
+    lat_min: float = Query(None, ge=-90, le=90, description="Viewport: latitude mínima"),
+    lat_max: float = Query(None, ge=-90, le=90, description="Viewport: latitude máxima"),
+    lon_min: float = Query(None, ge=-180, le=180, description="Viewport: longitude mínima"),
+    lon_max: float = Query(None, ge=-180, le=180, description="Viewport: longitude máxima"),
+    lat: float = Query(None, ge=-90, le=90, description="Centro para as buscas por raio e vizinhos mais próximos"),
+    lon: float = Query(None, ge=-180, le=180, description="Centro para as buscas por raio e vizinhos mais próximos"),
+    radius_m: float = Query(None, gt=0, description="Ocorrências a até esta distância (metros) do centro"),
+    nearest: int = Query(None, ge=1, le=10000, description="As N ocorrências mais próximas do centro (ordem de distância, sem paginação)")
 ):
-    return analyzer.get_all_occurrences(tipo_crime=tipo_crime, bairro=bairro)
+    bbox = _viewport(lat_min, lat_max, lon_min, lon_max)
+    if (radius_m is not None or nearest is not None) and (lat is None or lon is None):
+        raise HTTPException(status_code=422, detail="radius_m e nearest exigem lat e lon.")
+    # A vaga do stats_pool vale pela resposta inteira: a consulta e a geração
+    # dos pedaços rodam no pool e ela só é devolvida ao fim do stream.
+    stats_pool.acquire()
+    try:
+        rows = await stats_pool.execute(analyzer.select_occurrences, tipo_crime=tipo_crime, bairro=bairro,
+                                        limit=limit, after_id=after_id, bbox=bbox, center=(lat, lon),
+                                        radius_m=radius_m, nearest=nearest)
+    except BaseException:
+        stats_pool.release()
+        raise
+    headers = {}
+    cursor = analyzer.next_cursor(rows, limit) if nearest is None else None
+    if cursor is not None:
+        headers["X-Next-After-Id"] = cursor
+    if format == "columns":
+        colunas = {col: analyzer.iter_occurrence_column(rows, col) for col in OCCURRENCE_COLS}
+        chunks, media_type = stream_json_columns(colunas), "application/json"
+    elif format == "ndjson":
+        chunks, media_type = stream_ndjson(analyzer.iter_occurrences(rows)), "application/x-ndjson"
+    else:
+        chunks, media_type = stream_json_array(analyzer.iter_occurrences(rows)), "application/json"
+    return StreamingResponse(stats_pool.stream(chunks), media_type=media_type, headers=headers)
+
+@app.get("/occurrences/grid")
+async def get_occurrence_grid(
+    request: Request,
+    zoom: int = Query(..., ge=0, le=22, description="Nível de zoom do mapa (células de 360/2^zoom graus)"),
+    tipo_crime: str = Query(None, description="Filtra ocorrências por um tipo de crime específico"),
+    bairro: str = Query(None, description="Filtra ocorrências por parte do nome do bairro"),
+    lat_min: float = Query(None, ge=-90, le=90, description="Viewport: latitude mínima"),
+    lat_max: float = Query(None, ge=-90, le=90, description="Viewport: latitude máxima"),
+    lon_min: float = Query(None, ge=-180, le=180, description="Viewport: longitude mínima"),
+    lon_max: float = Query(None, ge=-180, le=180, description="Viewport: longitude máxima")
+):
+    _viewport(lat_min, lat_max, lon_min, lon_max)
+    body, etag = await stats_pool.run(
+        analyzer.grid_response, zoom=zoom, tipo_crime=tipo_crime,
+        bairro=bairro, lat_min=lat_min, lat_max=lat_max, lon_min=lon_min, lon_max=lon_max
+    )
+    return etag_response(request, body, etag)
+
+@app.post("/occurrences")
+async def ingest_occurrences(ocorrencias: List[OcorrenciaRegistro]):
+    return await ingest_pool.run(analyzer.append, [ocorrencia.dict() for ocorrencia in ocorrencias])
+
+# Endpoints cujo resultado só muda com os dados: resposta pré-serializada por
+# (parâmetros, versão dos dados), com ETag para o cliente revalidar com 304.
+async def _cached_response(request: Request, nome: str, compute, **params):
+    # O acerto sai direto do event loop; a falta (toda ingestão muda a versão) é
+    # calculada e serializada no stats_pool, com o mesmo limite de concorrência.
+    entrada = analyzer.cached_entry(nome, **params)
+    if entrada is None:
+        entrada = await stats_pool.run(analyzer.compute_response, nome, compute, **params)
+    return etag_response(request, *entrada)
 
 @app.get("/statistics/top-bairros")
-def get_top_bairros(limit: int = 10):
-    return analyzer.get_top_bairros(limit)
+async def get_top_bairros(request: Request, limit: int = Query(10, ge=1, le=100, description="Quantidade de bairros")):
+    return await _cached_response(request, "top-bairros", analyzer.get_top_bairros, limit=limit)
+
+def _heatmap_data(format: str, **filtros):
+    dados = analyzer.get_heatmap_data(**filtros)
+    return to_columns(dados, HEATMAP_COLS) if format == "columns" else dados
 
 @app.get("/statistics/crime-heatmap-data")
-def get_crime_heatmap_data(
+async def get_crime_heatmap_data(
     bairro: str = Query(None, description="Filtra por parte do nome do bairro"),
     hora: int = Query(None, description="Filtra por uma hora específica", ge=0, le=23),
     tipo_crime: str = Query(None, description="Filtra por um tipo de crime específico"),
     dia_semana: int = Query(None, description="Filtra por um dia da semana (0=Seg, 6=Dom)", ge=0, le=6),
     ano: int = Query(None, description="Filtra por um ano específico"),
-    mes: int = Query(None, description="Filtra por um mês específico", ge=1, le=12)
+    mes: int = Query(None, description="Filtra por um mês específico", ge=1, le=12),
+    format: str = Query("json", pattern="^(json|columns)$", description="json (registros) ou columns ({coluna: [valores]})")
 ):
-    return analyzer.get_heatmap_data(
+    return await stats_pool.run_json(
+        _heatmap_data,
+        format,
         bairro=bairro,
         hora=hora,
         tipo_crime=tipo_crime,
@@ -95,17 +357,26 @@ def get_crime_heatmap_data(
     )
 
 @app.get("/statistics/seasonality")
-def get_seasonality_data(by: str = 'month'):
-    return analyzer.get_seasonality_data(by)
+async def get_seasonality_data(request: Request, by: str = 'month'):
+    # Qualquer valor diferente de day_of_week agrupa por mês: uma chave de cache só para eles.
+    by = 'day_of_week' if by == 'day_of_week' else 'month'
+    return await _cached_response(request, "seasonality", analyzer.get_seasonality_data, by=by)
 
 @app.get("/statistics/unique-crime-types")
-def get_unique_crime_types():
-    return analyzer.get_unique_crime_types()
+async def get_unique_crime_types(request: Request):
+    return await _cached_response(request, "unique-crime-types", analyzer.get_unique_crime_types)
 
 @app.get("/statistics/unique-bairros")
-def get_unique_bairros():
-    return analyzer.get_unique_bairros()
+async def get_unique_bairros(request: Request):
+    return await _cached_response(request, "unique-bairros", analyzer.get_unique_bairros)
+
+@app.get("/statistics/bairros/autocomplete")
+async def autocomplete_bairros(
+    q: str = Query(..., min_length=1, description="Parte do nome do bairro (ignora acentos e maiúsculas)"),
+    limit: int = Query(10, ge=1, le=100, description="Quantidade máxima de sugestões")
+):
+    return analyzer.autocomplete_bairros(q, limit)
 
 @app.get("/statistics/unique-years")
-def get_unique_years():
-    return analyzer.get_unique_years()
+async def get_unique_years(request: Request):
+    return await _cached_response(request, "unique-years", analyzer.get_unique_years)
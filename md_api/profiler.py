@@ -0,0 +1,83 @@
+"""Profiler por amostragem para requisições lentas (opcional).
+
+Uma thread amostra a pilha de todas as threads do processo a cada
+``interval_ms`` e guarda as amostras recentes num buffer circular. Quando uma
+requisição passa de ``slow_ms``, as amostras colhidas durante ela são gravadas
+em ``<output_dir>/<horário>_<método>_<rota>_<ms>ms.folded`` no formato "folded
+stacks" (uma pilha por linha, ``frame;frame;frame contagem``), aceito por
+flamegraph.pl, speedscope e inferno.
+
+Requisições concorrentes compartilham a janela de tempo, então o arquivo de
+uma requisição lenta pode incluir amostras de outras que rodavam junto.
+"""
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+
+# ~1 min de histórico com amostras a cada 5 ms
+MAX_SAMPLES = 12_000
+
+
+def _folded_stack(frame):
+    partes = []
+    while frame is not None:
+        code = frame.f_code
+        partes.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir, slow_ms: float, interval_ms: float = 5.0):
+        self.output_dir = Path(output_dir)
+        self.slow_ms = slow_ms
+        self.interval_s = max(interval_ms, 0.5) / 1000
+        self._samples = deque(maxlen=MAX_SAMPLES)
+        self._thread = None
+        self._stop = threading.Event()
+        self.dumps = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        proprio = threading.get_ident()
+        nomes = {}
+        while not self._stop.wait(self.interval_s):
+            agora = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                if ident not in nomes:
+                    nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+                self._samples.append((agora, f"{nomes.get(ident, ident)};{_folded_stack(frame)}"))
+
+    def request_finished(self, method: str, route: str, started_at: float, duration_s: float):
+        """Grava as amostras da janela da requisição se ela tiver sido lenta."""
+        if duration_s * 1000 < self.slow_ms:
+            return None
+        fim = started_at + duration_s
+        pilhas = Counter(pilha for instante, pilha in list(self._samples) if started_at <= instante <= fim)
+        if not pilhas:
+            return None
+        nome_rota = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "raiz"
+        destino = self.output_dir / (f"{datetime.now():%Y%m%d-%H%M%S-%f}_{method}_{nome_rota}_"
+                                     f"{duration_s * 1000:.0f}ms.folded")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        destino.write_text("".join(f"{pilha} {total}\n" for pilha, total in pilhas.most_common()), encoding="utf-8")
+        self.dumps += 1
+        return destino
@@ -0,0 +1,122 @@
+"""Servidor multi-worker com pré-carregamento (modelo "preload + fork").
+
+O processo pai importa ``md_api.main`` uma única vez (DataAnalyzer, índices,
+cubo e modelo), abre o socket e só então faz ``fork`` dos workers. Cada worker
+herda esse estado copy-on-write: as páginas ficam compartilhadas enquanto
+ninguém as modifica, então memória e tempo de partida não se multiplicam pelo
+número de workers. O pai apenas supervisiona, reiniciando workers que morrem.
+"""
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+# Workers que morrem logo após subir indicam erro de inicialização, não falha transitória.
+MIN_WORKER_UPTIME_S = 5.0
+
+
+def _bind_socket(host: str, port: int):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(config: uvicorn.Config, sock):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Sem um código de erro o supervisor trataria a falha como saída limpa.
+    codigo = 1
+    try:
+        server = uvicorn.Server(config)
+        server.run(sockets=[sock])
+        # Falha no startup (ex.: lifespan) faz o uvicorn retornar sem ter servido.
+        codigo = 0 if server.started else 3
+    except SystemExit as exc:
+        codigo = exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(codigo)
+
+
+def serve(app_module: str = "md_api.main", host: str = "127.0.0.1", port: int = 8000, workers: int = 1,
+          log_level: str = "info"):
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(f"{app_module}:app", host=host, port=port, log_level=log_level)
+        return
+
+    # Cada worker roda a inferência em uma thread; o paralelismo vem dos processos.
+    # Também evita o travamento conhecido de OpenMP usado antes de um fork.
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+    inicio = time.perf_counter()
+    module = importlib.import_module(app_module)
+    if getattr(module, "HOTSPOT_WARMUP", False):
+        # Pré-calculado no pai: os workers herdam o cache pronto e não repetem o aquecimento.
+        module.analyzer.warm_hotspots()
+        module.HOTSPOTS_PRELOADED = True
+    print(f"Aplicação pré-carregada em {time.perf_counter() - inicio:.1f}s; iniciando {workers} workers "
+          f"em http://{host}:{port}")
+
+    sock = _bind_socket(host, port)
+    config = uvicorn.Config(module.app, log_level=log_level)
+    # Objetos criados até aqui não são mais varridos pelo GC, que de outra forma
+    # tocaria suas páginas e quebraria o compartilhamento copy-on-write.
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(config, sock)
+        children[pid] = time.monotonic()
+        return pid
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started_at = children.pop(pid, None)
+        if stopping or started_at is None:
+            continue
+        codigo = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started_at < MIN_WORKER_UPTIME_S:
+            print(f"Worker {pid} terminou na inicialização (código {codigo}); encerrando o servidor.",
+                  file=sys.stderr)
+            stop(None, None)
+            continue
+        print(f"Worker {pid} terminou (código {codigo}); iniciando outro.", file=sys.stderr)
+        spawn()
+    sock.close()
@@ -0,0 +1,45 @@
+from md_core.metrics import span
+from md_core.serialization import dumps
+
+
+def stream_ndjson(batches):
+    """Gera um registro JSON por linha (NDJSON), lote a lote."""
+    for batch in batches:
+        if batch:
+            with span("api.serialize"):
+                chunk = b"\n".join(map(dumps, batch)) + b"\n"
+            yield chunk
+
+
+def stream_json_array(batches):
+    """Gera um array JSON em pedaços, sem materializar a lista inteira."""
+    yield b"["
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        with span("api.serialize"):
+            # Um dumps por lote: tira os colchetes do array do lote e emenda.
+            chunk = dumps(batch)[1:-1]
+            chunk = chunk if first else b"," + chunk
+        yield chunk
+        first = False
+    yield b"]"
+
+
+def stream_json_columns(columns: dict):
+    """Gera ``{"coluna": [...], ...}`` em pedaços; cada valor é um iterável de lotes (listas)."""
+    yield b"{"
+    for posicao, (nome, batches) in enumerate(columns.items()):
+        yield (b"," if posicao else b"") + dumps(nome) + b":["
+        first = True
+        for batch in batches:
+            if not batch:
+                continue
+            with span("api.serialize"):
+                chunk = dumps(batch)[1:-1]
+                chunk = chunk if first else b"," + chunk
+            yield chunk
+            first = False
+        yield b"]"
+    yield b"}"
@@ -0,0 +1,474 @@
+"""Benchmarks de desempenho: preditor, consultas do DataAnalyzer, rotas da API e treino.
+
+Cada combinação (escala, suíte) roda em um subprocesso próprio, para que o
+tempo de carga e o pico de memória de uma não contaminem a outra. A escala 1
+usa o CSV original; as demais usam os CSVs sintéticos de
+``md_benchmark/synthetic.py`` (gerados na primeira execução).
+
+Os resultados são gravados em JSON e, se houver uma baseline gravada antes
+com ``--save-baseline`` na mesma máquina (ela não é versionada: os tempos
+dependem do hardware), comparados com ela: um benchmark regride quando a
+mediana (ou o pico de memória da suíte) passa da baseline por mais de
+``--threshold`` e por mais que o ruído mínimo.
+
+Uso:
+    python -m md_benchmark.runner --scales 1,10 --save-baseline
+    python -m md_benchmark.runner --scales 1,10 --suites analyzer,api
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from md_core.config import BASE_DIR, DATA_PATH
+
+SUITES = ("predictor", "analyzer", "api", "training")
+RESULTS_DIR = BASE_DIR / "reports" / "benchmarks"
+DEFAULT_OUTPUT = RESULTS_DIR / "results.json"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+MODEL_PIPELINE_PATH = BASE_DIR / "artifacts" / "lightgbm_model.joblib"
+MODEL_SERVING_PATH = BASE_DIR / "artifacts" / "lightgbm_model.serving"
+
+# Variação relativa tolerada e ruído mínimo (absoluto) antes de acusar regressão
+REGRESSION_THRESHOLD = 0.25
+MIN_DELTA_MS = 1.0
+MIN_DELTA_MB = 20.0
+
+# Ambiente dos subprocessos: sem recarga periódica do modelo nem cache de predições
+# (mediria o cache, não o modelo) e com a inferência em uma thread.
+WORKER_ENV = {"MODEL_RELOAD_INTERVAL_S": "0", "PREDICTION_CACHE_SIZE": "0", "HOTSPOT_WARMUP": "0",
+              "INGEST_JOURNAL_PATH": "", "OMP_NUM_THREADS": "1", "PYTHONWARNINGS": "ignore"}
+
+FEATURE_COLS = ['bairro', 'descricao_modus_operandi', 'arma_utilizada', 'sexo_suspeito', 'orgao_responsavel',
+                'status_investigacao', 'quantidade_vitimas', 'quantidade_suspeitos', 'idade_suspeito', 'latitude',
+                'longitude', 'ano', 'mes', 'dia_semana', 'hora']
+
+
+# --- Medição ---
+
+def rss_mb():
+    """Memória residente atual do processo (MB)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes.
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(fn, setup=None, min_repeat: int = 5, max_repeat: int = 200, budget_s: float = 1.0, warmup: int = 1):
+    """Tempo de ``fn()`` em ms: repete até ``max_repeat`` vezes ou até esgotar ``budget_s``.
+
+    ``setup`` roda antes de cada repetição, fora da medição (ex.: limpar um cache).
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    tempos = []
+    limite = time.perf_counter() + budget_s
+    while len(tempos) < max_repeat and (len(tempos) < min_repeat or time.perf_counter() < limite):
+        if setup is not None:
+            setup()
+        inicio = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "n": len(tempos),
+        "median_ms": statistics.median(tempos),
+        "p95_ms": tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))],
+        "min_ms": tempos[0],
+        "mean_ms": statistics.fmean(tempos),
+    }
+
+
+def once(fn):
+    """Mede uma única execução (cargas e treinos), devolvendo também o resultado."""
+    inicio = time.perf_counter()
+    resultado = fn()
+    ms = (time.perf_counter() - inicio) * 1000
+    return {"n": 1, "median_ms": ms, "p95_ms": ms, "min_ms": ms, "mean_ms": ms}, resultado
+
+
+def quiet(fn, *args, **kwargs):
+    """Executa silenciando os prints de progresso (ex.: 'Analisador ... carregado')."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+# --- Entradas de exemplo ---
+
+def sample_inputs(data_path: Path, n: int, seed: int = 0):
+    """Entradas de predição no formato do /predict, sorteadas do dataset."""
+    from md_data_processing.dataset import load_occurrences
+    df = load_occurrences(data_path)
+    linhas = np.random.default_rng(seed).integers(0, len(df), size=n)
+    amostra = df.iloc[linhas][FEATURE_COLS]
+    registros = amostra.astype({col: object for col in amostra.columns}).to_dict(orient="records")
+    for registro in registros:
+        for col, valor in registro.items():
+            registro[col] = valor.item() if isinstance(valor, np.generic) else valor
+    return registros
+
+
+def new_records(data_path: Path, n: int, inicio: int):
+    """Ocorrências novas (ids inéditos, acima dos existentes) para medir a ingestão."""
+    import pandas as pd
+    registros = pd.read_csv(data_path, nrows=n).to_dict(orient="records")
+    for i, registro in enumerate(registros):
+        registro["id_ocorrencia"] = f"OCR{10 ** 12 + inicio + i}"
+    return registros
+
+
+def _isolated_copy(data_path: Path, directory: Path) -> Path:
+    """Link (ou cópia) do CSV em ``directory``, para que o cache colunar seja criado lá."""
+    destino = directory / data_path.name
+    try:
+        destino.symlink_to(data_path.resolve())
+    except OSError:
+        shutil.copyfile(data_path, destino)
+    return destino
+
+
+def _query_params(analyzer):
+    """Valores de filtro representativos: o bairro e o tipo de crime mais frequentes."""
+    bairro = analyzer.get_top_bairros(1)[0]["bairro"]
+    tipo_crime = max(analyzer.get_unique_crime_types(),
+                     key=lambda tipo: len(analyzer.index.rows('tipo_crime', tipo)))
+    hora = int(analyzer.df['hora'].mode().iat[0])
+    lat = float(analyzer.df['latitude'].median())
+    lon = float(analyzer.df['longitude'].median())
+    return {"bairro": bairro, "tipo_crime": tipo_crime, "hora": hora, "lat": lat, "lon": lon,
+            "bbox": (lat - 0.01, lat + 0.01, lon - 0.01, lon + 0.01)}
+
+
+# --- Suítes ---
+
+def suite_predictor(data_path: Path):
+    from md_model.predictor import CrimePredictor
+    resultados = {}
+    entradas = sample_inputs(data_path, 1024)
+    for nome, caminho in (("serving", MODEL_SERVING_PATH), ("pipeline", MODEL_PIPELINE_PATH)):
+        if not caminho.exists():
+            continue
+        resultados[f"predictor.{nome}.load"] = measure(lambda: quiet(CrimePredictor, caminho), min_repeat=3,
+                                                      max_repeat=10, warmup=0)
+        predictor = quiet(CrimePredictor, caminho)
+        resultados[f"predictor.{nome}.predict"] = measure(lambda: predictor.predict(entradas[0]))
+        resultados[f"predictor.{nome}.predict_batch_64"] = measure(lambda: predictor.predict_batch(entradas[:64]))
+        resultados[f"predictor.{nome}.predict_batch_1024"] = measure(lambda: predictor.predict_batch(entradas))
+    return resultados
+
+
+def suite_analyzer(data_path: Path):
+    # Carga "fria" num diretório temporário: o cache colunar nasce ao lado do CSV,
+    # e apagar o de data/.cache afetaria quem estiver servindo os dados reais.
+    with tempfile.TemporaryDirectory(prefix="md-benchmark-") as pasta:
+        return _suite_analyzer(_isolated_copy(Path(data_path), Path(pasta)))
+
+
+def _suite_analyzer(data_path: Path):
+    from md_data_analysis.analyzer import DataAnalyzer
+
+    resultados = {}
+    resultados["analyzer.load_cold"], analyzer = once(lambda: quiet(DataAnalyzer, data_path))
+    resultados["analyzer.load_warm"] = measure(lambda: quiet(DataAnalyzer, data_path), min_repeat=3,
+                                               max_repeat=10, warmup=0)
+    p = _query_params(analyzer)
+
+    consultas = {
+        "get_top_bairros": lambda: analyzer.get_top_bairros(10),
+        "get_heatmap_data": lambda: analyzer.get_heatmap_data(),
+        "get_heatmap_data.filtered": lambda: analyzer.get_heatmap_data(bairro=p["bairro"], tipo_crime=p["tipo_crime"]),
+        "get_seasonality_data.month": lambda: analyzer.get_seasonality_data('month'),
+        "get_seasonality_data.day_of_week": lambda: analyzer.get_seasonality_data('day_of_week'),
+        "get_unique_crime_types": analyzer.get_unique_crime_types,
+        "get_unique_bairros": analyzer.get_unique_bairros,
+        "get_unique_years": analyzer.get_unique_years,
+        "autocomplete_bairros": lambda: analyzer.autocomplete_bairros(p["bairro"][:3]),
+        "select_occurrences.all": lambda: analyzer.select_occurrences(),
+        "select_occurrences.filtered_page": lambda: analyzer.select_occurrences(
+            tipo_crime=p["tipo_crime"], bairro=p["bairro"], limit=100),
+        "select_occurrences.bbox": lambda: analyzer.select_occurrences(bbox=p["bbox"]),
+        "select_occurrences.radius": lambda: analyzer.select_occurrences(center=(p["lat"], p["lon"]), radius_m=1000),
+        "select_occurrences.nearest": lambda: analyzer.select_occurrences(center=(p["lat"], p["lon"]), nearest=10),
+        "get_all_occurrences.page": lambda: analyzer.get_all_occurrences(limit=1000),
+        "get_all_occurrences.tipo_crime": lambda: analyzer.get_all_occurrences(tipo_crime=p["tipo_crime"]),
+        "occurrence_grid": lambda: analyzer.occurrence_grid(12),
+        "cached_response": lambda: analyzer.cached_response("top-bairros", analyzer.get_top_bairros, limit=10),
+    }
+    for nome, fn in consultas.items():
+        resultados[f"analyzer.{nome}"] = measure(fn)
+
+    hotspot = lambda: analyzer.predict_hotspots(p["bairro"], p["hora"], 3)  # noqa: E731
+    resultados["analyzer.predict_hotspots.cold"] = measure(hotspot, setup=analyzer.hotspot_cache.clear, min_repeat=3)
+    resultados["analyzer.predict_hotspots.cached"] = measure(hotspot)
+
+    # Por último: a ingestão muda os dados (e a versão) do analisador.
+    contador = iter(range(0, 10 ** 9, 100))
+    resultados["analyzer.append_100"] = measure(lambda: analyzer.append(new_records(data_path, 100, next(contador))),
+                                                min_repeat=3, max_repeat=20)
+    return resultados
+
+
+def suite_api(data_path: Path):
+    from fastapi.testclient import TestClient
+
+    resultados = {}
+    os.environ["DATA_PATH"] = str(data_path)
+    resultados["api.startup"], modulo = once(lambda: quiet(__import__, "md_api.main", fromlist=["app"]))
+    analyzer = modulo.analyzer
+    p = _query_params(analyzer)
+    entradas = sample_inputs(data_path, 64)
+    lat_min, lat_max, lon_min, lon_max = p["bbox"]
+    viewport = {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max}
+
+    rotas = {
+        "GET /": ("get", "/", {}),
+        "POST /predict": ("post", "/predict", {"json": entradas[0]}),
+        "POST /predict/batch": ("post", "/predict/batch", {"json": entradas}),
+        "POST /predict/hotspots": ("post", "/predict/hotspots", {"json": {"bairro": p["bairro"], "hora": p["hora"]}}),
+        "GET /models": ("get", "/models", {}),
+        "GET /occurrences?limit=100": ("get", "/occurrences", {"params": {"limit": 100}}),
+        "GET /occurrences?tipo_crime": ("get", "/occurrences", {"params": {"tipo_crime": p["tipo_crime"]}}),
+        "GET /occurrences?format=ndjson": ("get", "/occurrences", {"params": {"tipo_crime": p["tipo_crime"],
+                                                                              "format": "ndjson"}}),
+        "GET /occurrences?bbox": ("get", "/occurrences", {"params": viewport}),
+        "GET /occurrences?nearest": ("get", "/occurrences", {"params": {"lat": p["lat"], "lon": p["lon"],
+                                                                        "nearest": 10}}),
+        "GET /occurrences/grid": ("get", "/occurrences/grid", {"params": {"zoom": 12}}),
+        "GET /statistics/top-bairros": ("get", "/statistics/top-bairros", {}),
+        "GET /statistics/crime-heatmap-data": ("get", "/statistics/crime-heatmap-data", {}),
+        "GET /statistics/crime-heatmap-data?bairro": ("get", "/statistics/crime-heatmap-data",
+                                                      {"params": {"bairro": p["bairro"]}}),
+        "GET /statistics/seasonality": ("get", "/statistics/seasonality", {}),
+        "GET /statistics/unique-crime-types": ("get", "/statistics/unique-crime-types", {}),
+        "GET /statistics/unique-bairros": ("get", "/statistics/unique-bairros", {}),
+        "GET /statistics/unique-years": ("get", "/statistics/unique-years", {}),
+        "GET /statistics/bairros/autocomplete": ("get", "/statistics/bairros/autocomplete",
+                                                 {"params": {"q": p["bairro"][:3]}}),
+    }
+    with TestClient(modulo.app) as client:
+        for nome, (metodo, caminho, kwargs) in rotas.items():
+            def chamada(metodo=metodo, caminho=caminho, kwargs=kwargs, nome=nome):
+                resposta = getattr(client, metodo)(caminho, **kwargs)
+                if resposta.status_code != 200:
+                    raise RuntimeError(f"{nome}: HTTP {resposta.status_code} {resposta.text[:200]}")
+            resultados[f"api.{nome}"] = measure(chamada)
+
+        contador = iter(range(0, 10 ** 9, 10))
+
+        def ingestao():
+            resposta = client.post("/occurrences", json=new_records(data_path, 10, 10 ** 8 + next(contador)))
+            if resposta.status_code != 200:
+                raise RuntimeError(f"POST /occurrences: HTTP {resposta.status_code} {resposta.text[:200]}")
+        resultados["api.POST /occurrences"] = measure(ingestao, min_repeat=3, max_repeat=20)
+    return resultados
+
+
+def suite_training(data_path: Path):
+    from md_training.common import create_preprocessor, feature_columns, load_temporal_split, portuguese_stopwords
+    from md_training.orchestrator import build_classifier
+
+    resultados = {}
+    stop_words = quiet(portuguese_stopwords)
+    resultados["training.load"], (X_train, y_train, X_test, y_test) = once(lambda: load_temporal_split(data_path))
+    num_cols, cat_cols = feature_columns(X_train)
+    # Matrizes em CSR (modo --sparse): nas escalas maiores a matriz densa não cabe na memória.
+    preprocessor = create_preprocessor(num_cols, cat_cols, stop_words, sparse=True)
+    resultados["training.preprocess"], X_train_t = once(lambda: preprocessor.fit_transform(X_train, y_train))
+    resultados["training.transform_test"], X_test_t = once(lambda: preprocessor.transform(X_test))
+    for nome in ("baseline", "randomforest", "lightgbm"):
+        classifier = build_classifier(nome, n_jobs=-1, class_weight=None if nome == "baseline" else "balanced")
+        if nome == "lightgbm":
+            classifier.set_params(verbosity=-1)
+        resultados[f"training.{nome}.fit"], _ = once(lambda: classifier.fit(X_train_t, y_train))
+        resultados[f"training.{nome}.predict"] = measure(lambda: classifier.predict(X_test_t), min_repeat=1,
+                                                         max_repeat=5, warmup=0)
+    return resultados
+
+
+SUITE_FUNCTIONS = {"predictor": suite_predictor, "analyzer": suite_analyzer, "api": suite_api,
+                   "training": suite_training}
+
+
+# --- Execução ---
+
+def data_for_scale(scale: int, seed: int = 42):
+    if scale == 1:
+        return DATA_PATH
+    from md_benchmark.synthetic import generate
+    return generate(scale, seed)
+
+
+def count_rows(path: Path):
+    import pandas as pd
+    return sum(len(bloco) for bloco in pd.read_csv(path, usecols=[0], chunksize=1_000_000))
+
+
+def run_worker(suite: str, data_path: Path, result_path: Path):
+    """Executado no subprocesso: roda uma suíte e grava o resultado em JSON."""
+    rss_inicial = rss_mb()
+    inicio = time.perf_counter()
+    benchmarks = SUITE_FUNCTIONS[suite](data_path)
+    payload = {
+        "benchmarks": benchmarks,
+        "memory": {"rss_start_mb": rss_inicial, "rss_end_mb": rss_mb(), "peak_rss_mb": peak_rss_mb()},
+        "duration_s": time.perf_counter() - inicio,
+    }
+    Path(result_path).write_text(json.dumps(payload), encoding="utf-8")
+
+
+def run_suite(suite: str, scale: int, data_path: Path, timeout_s: float = None):
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp) / "result.json"
+        comando = [sys.executable, "-m", "md_benchmark.runner", "--worker", suite, "--data", str(data_path),
+                   "--result", str(result_path)]
+        env = {**os.environ, **WORKER_ENV}
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BASE_DIR), env.get("PYTHONPATH")]))
+        processo = subprocess.run(comando, cwd=BASE_DIR, env=env, timeout=timeout_s, capture_output=True, text=True)
+        if processo.returncode != 0:
+            return {"error": (processo.stderr or processo.stdout).strip().splitlines()[-20:]}
+        return json.loads(result_path.read_text(encoding="utf-8"))
+
+
+def environment():
+    import lightgbm
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pandas.__version__, "sklearn": sklearn.__version__,
+            "lightgbm": lightgbm.__version__, "commit": commit}
+
+
+def run(scales, suites, timeout_s: float = None):
+    resultado = {"created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "environment": environment(), "scales": {}}
+    for scale in scales:
+        data_path = data_for_scale(scale)
+        por_escala = {"rows": count_rows(data_path), "data": str(data_path), "suites": {}}
+        for suite in suites:
+            print(f"[x{scale}] {suite}...", flush=True)
+            por_escala["suites"][suite] = run_suite(suite, scale, data_path, timeout_s)
+            if "error" in por_escala["suites"][suite]:
+                print("\n".join(por_escala["suites"][suite]["error"]), file=sys.stderr)
+        resultado["scales"][str(scale)] = por_escala
+    return resultado
+
+
+# --- Comparação com a baseline ---
+
+def _flatten(resultado: dict):
+    """``{"x<escala>/<benchmark>": mediana_ms}`` e ``{"x<escala>/<suíte>": pico_mb}``."""
+    tempos, memoria = {}, {}
+    for scale, por_escala in resultado.get("scales", {}).items():
+        for suite, dados in por_escala["suites"].items():
+            if "error" in dados:
+                continue
+            memoria[f"x{scale}/{suite}"] = dados["memory"]["peak_rss_mb"]
+            for nome, stats in dados["benchmarks"].items():
+                tempos[f"x{scale}/{nome}"] = stats["median_ms"]
+    return tempos, memoria
+
+
+def compare(atual: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD):
+    """Linhas de comparação ``(nome, baseline, atual, razão, regrediu)`` de tempo e de memória."""
+    linhas = []
+    pares = zip(_flatten(baseline), _flatten(atual), (("ms", MIN_DELTA_MS), ("MB", MIN_DELTA_MB)))
+    for anterior, novo, (unidade, ruido) in pares:
+        for nome in sorted(set(anterior) & set(novo)):
+            razao = novo[nome] / anterior[nome] if anterior[nome] > 0 else float("inf")
+            regrediu = razao > 1 + threshold and novo[nome] - anterior[nome] > ruido
+            linhas.append((nome, unidade, anterior[nome], novo[nome], razao, regrediu))
+    return linhas
+
+
+def print_report(resultado: dict, comparacao=None):
+    for scale, por_escala in resultado["scales"].items():
+        print(f"\n== x{scale} ({por_escala['rows']} linhas) ==")
+        for suite, dados in por_escala["suites"].items():
+            if "error" in dados:
+                print(f"  {suite}: ERRO")
+                continue
+            print(f"  {suite}: pico de memória {dados['memory']['peak_rss_mb']:.0f} MB")
+            for nome, stats in dados["benchmarks"].items():
+                print(f"    {nome:<52} {stats['median_ms']:>11.3f} ms  (p95 {stats['p95_ms']:.3f}, n={stats['n']})")
+    if comparacao:
+        regressoes = [linha for linha in comparacao if linha[-1]]
+        print(f"\nComparação com a baseline: {len(comparacao)} medidas, {len(regressoes)} regressões")
+        for nome, unidade, anterior, novo, razao, _ in regressoes:
+            print(f"  REGRESSÃO {nome}: {anterior:.3f} -> {novo:.3f} {unidade} ({razao:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho da API, do analisador e do treino")
+    parser.add_argument("--scales", default="1,10", help="Fatores de escala dos dados, ex.: 1,10,100,1000")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Subconjunto de {','.join(SUITES)}")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado também como baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Aumento relativo tolerado antes de acusar regressão (0.25 = 25%%)")
+    parser.add_argument("--timeout", type=float, default=None, help="Tempo máximo (s) de cada suíte")
+    # Modo interno: executa uma suíte no subprocesso
+    parser.add_argument("--worker", choices=SUITES, help=argparse.SUPPRESS)
+    parser.add_argument("--data", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.data, args.result)
+        return 0
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    desconhecidas = set(suites) - set(SUITES)
+    if desconhecidas:
+        parser.error(f"Suítes desconhecidas: {', '.join(sorted(desconhecidas))}")
+    scales = [int(scale) for scale in args.scales.split(",")]
+
+    resultado = run(scales, suites, args.timeout)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados gravados em {args.output}")
+
+    comparacao = None
+    if args.baseline.exists() and not args.save_baseline:
+        comparacao = compare(resultado, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    print_report(resultado, comparacao)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline atualizada: {args.baseline}")
+
+    falhas = any("error" in dados for por_escala in resultado["scales"].values()
+                 for dados in por_escala["suites"].values())
+    regressoes = comparacao and any(linha[-1] for linha in comparacao)
+    return 1 if falhas or regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Gerador de dados sintéticos para os benchmarks.
+
+Escala o ``dataset_ocorrencias_delegacia_5.csv`` para N vezes o número de
+linhas mantendo o esquema e as distribuições: cada linha nova é uma linha
+sorteada do original, com data redistribuída no mesmo período e coordenadas
+levemente deslocadas (os pontos continuam dentro dos bairros, mas não se
+repetem). Os ids seguem a numeração ``OCR<n>`` do original.
+
+Uso: ``python -m md_benchmark.synthetic --scale 10 [--scale 100 ...]``
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from md_core.config import BASE_DIR, DATA_PATH
+
+SYNTHETIC_DIR = BASE_DIR / "data" / "benchmark"
+CHUNK_ROWS = 250_000
+# ~100 m: o suficiente para espalhar os pontos sem sair do bairro
+COORD_JITTER_DEG = 0.001
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+FIRST_ID = 100_000
+
+
+def synthetic_path(scale: int, seed: int = 42, output_dir: Path = SYNTHETIC_DIR):
+    return Path(output_dir) / f"ocorrencias_x{scale}_s{seed}.csv"
+
+
+def _chunk(base: pd.DataFrame, dia_inicial: pd.Timestamp, n_dias: int, inicio: int, n: int,
+           rng: np.random.Generator):
+    amostra = base.iloc[rng.integers(0, len(base), size=n)].reset_index(drop=True)
+    amostra["id_ocorrencia"] = np.char.add("OCR", np.arange(FIRST_ID + inicio, FIRST_ID + inicio + n).astype(str))
+
+    # Mesmo horário do dia da linha sorteada, em um dia qualquer do período original.
+    originais = pd.to_datetime(amostra["data_ocorrencia"])
+    novas = dia_inicial + pd.to_timedelta(rng.integers(0, n_dias, size=n), unit="D") + \
+        (originais - originais.dt.normalize())
+    amostra["data_ocorrencia"] = novas.dt.strftime(DATE_FORMAT)
+
+    amostra["latitude"] = amostra["latitude"] + rng.normal(0, COORD_JITTER_DEG, size=n)
+    amostra["longitude"] = amostra["longitude"] + rng.normal(0, COORD_JITTER_DEG, size=n)
+    return amostra
+
+
+def generate(scale: int, seed: int = 42, source: Path = DATA_PATH, output_dir: Path = SYNTHETIC_DIR,
+             force: bool = False):
+    """Grava (ou reaproveita) o CSV com ``scale`` vezes as linhas da fonte e devolve o caminho.
+
+    O arquivo é escrito em blocos de ``CHUNK_ROWS`` linhas, então 1000x não
+    precisa caber na memória, e só aparece no destino quando estiver completo.
+    """
+    destino = synthetic_path(scale, seed, output_dir)
+    if destino.exists() and not force:
+        return destino
+    base = pd.read_csv(source)
+    datas = pd.to_datetime(base["data_ocorrencia"])
+    dia_inicial = datas.min().normalize()
+    n_dias = (datas.max().normalize() - dia_inicial).days + 1
+    total = len(base) * scale
+    rng = np.random.default_rng(seed)
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix(".tmp")
+    inicio = time.perf_counter()
+    with open(tmp, "w", encoding="utf-8", newline="") as arquivo:
+        for offset in range(0, total, CHUNK_ROWS):
+            bloco = _chunk(base, dia_inicial, n_dias, offset, min(CHUNK_ROWS, total - offset), rng)
+            bloco.to_csv(arquivo, index=False, header=offset == 0)
+    os.replace(tmp, destino)
+    print(f"{total} linhas sintéticas ({scale}x) gravadas em {destino} em {time.perf_counter() - inicio:.1f}s")
+    return destino
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos escalados a partir do dataset original")
+    parser.add_argument("--scale", type=int, action="append", required=True, help="Fator de escala (repetível)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", type=Path, default=SYNTHETIC_DIR)
+    parser.add_argument("--force", action="store_true", help="Regrava mesmo se o arquivo já existir")
+    args = parser.parse_args(argv)
+    for scale in args.scale:
+        print(generate(scale, args.seed, output_dir=args.output_dir, force=args.force))
+
+
+if __name__ == "__main__":
+    main()
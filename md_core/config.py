@@ -1,4 +1,5 @@
 # md_core/config.py
+import os
 from pathlib import Path
 
 # Define o caminho base do projeto
@@ -15,5 +16,59 @@ TARGET = "tipo_crime"
 NUM_COLS = ['quantidade_vitimas', 'quantidade_suspeitos', 'idade_suspeito', 'latitude', 'longitude', 'ano', 'mes', 'dia_semana', 'hora']
 CAT_COLS = ['bairro', 'descricao_modus_operandi', 'arma_utilizada', 'sexo_suspeito', 'orgao_responsavel', 'status_investigacao']
 
+# Micro-batching do endpoint /predict
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5"))
+
+# Journal (NDJSON) opcional das ocorrências ingeridas via API (ex.: data/ingest_journal.ndjson)
+INGEST_JOURNAL_PATH = os.getenv("INGEST_JOURNAL_PATH") or None
+
+# Cache de hotspots (KMeans) por (bairro, hora, n_clusters, versão dos dados)
+HOTSPOT_CACHE_SIZE = int(os.getenv("HOTSPOT_CACHE_SIZE", "1024"))
+HOTSPOT_WARMUP = os.getenv("HOTSPOT_WARMUP", "0") == "1"
+
+# Respostas serializadas (com ETag) dos endpoints de metadados e estatísticas estáveis
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Respostas do /occurrences/grid, à parte: cada viewport é uma chave nova e não
+# deve expulsar as respostas acima
+GRID_CACHE_SIZE = int(os.getenv("GRID_CACHE_SIZE", "64"))
+
+# Registro de modelos (artifacts/registry.json): modelo servido, intervalo de
+# verificação de novas versões (0 desliga) e fração do tráfego enviada ao candidato
+MODEL_NAME = os.getenv("MODEL_NAME", "lightgbm")
+MODEL_RELOAD_INTERVAL_S = float(os.getenv("MODEL_RELOAD_INTERVAL_S", "30"))
+MODEL_SHADOW_SAMPLE_RATE = float(os.getenv("MODEL_SHADOW_SAMPLE_RATE", "0.1"))
+# Lotes em modo sombra aguardando o candidato; acima disso as amostras são descartadas
+MODEL_SHADOW_MAX_PENDING = int(os.getenv("MODEL_SHADOW_MAX_PENDING", "8"))
+
+# Cache de resultados de predição por (entrada canônica, versão do modelo); 0 desliga
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "600"))
+
+# Pools dedicados por classe de endpoint: threads e tamanho máximo da fila
+# (acima disso a requisição recebe 429)
+PREDICT_POOL_WORKERS = int(os.getenv("PREDICT_POOL_WORKERS", "2"))
+PREDICT_POOL_QUEUE = int(os.getenv("PREDICT_POOL_QUEUE", "256"))
+HOTSPOT_POOL_WORKERS = int(os.getenv("HOTSPOT_POOL_WORKERS", "2"))
+HOTSPOT_POOL_QUEUE = int(os.getenv("HOTSPOT_POOL_QUEUE", "8"))
+STATS_POOL_WORKERS = int(os.getenv("STATS_POOL_WORKERS", "2"))
+STATS_POOL_QUEUE = int(os.getenv("STATS_POOL_QUEUE", "32"))
+INGEST_POOL_WORKERS = int(os.getenv("INGEST_POOL_WORKERS", "1"))
+INGEST_POOL_QUEUE = int(os.getenv("INGEST_POOL_QUEUE", "16"))
+
+# Métricas (/metrics, formato Prometheus) e profiler por amostragem opcional:
+# requisições acima de PROFILE_SLOW_REQUEST_MS (0 desliga) têm as pilhas
+# amostradas gravadas em PROFILE_DIR como "folded stacks" (flame graph)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or BASE_DIR / "reports" / "profiles")
+
+# Servidor (main.py): com mais de um worker o app é pré-carregado e os workers
+# compartilham o DataAnalyzer e o modelo via fork (ver md_api/server.py)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
 # Garante que o diretório de artefatos exista
 ARTIFACTS_PATH.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
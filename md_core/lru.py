@@ -0,0 +1,70 @@
+"""Cache LRU em memória compartilhado pelos caches da API."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU (thread-safe) com expiração opcional por entrada.
+
+    ``get`` devolve ``None`` na falta, então ``None`` não deve ser guardado
+    como valor. Com ``ttl_s`` as entradas expiram após esse tempo;
+    ``maxsize <= 0`` desliga o cache. Acertos, faltas e expirações são
+    contados para ``stats`` e para o /metrics.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_s: float = None):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key):
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return value
+        expires_at = None if self.ttl_s is None else time.monotonic() + self.ttl_s
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def __contains__(self, key):
+        """Se ``key`` tem valor válido (não conta como acesso nem altera a ordem)."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"tamanho": len(self._data), "capacidade": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "expirados": self.expired,
+                    "taxa_acerto": self.hits / total if total else None}
+
+    def __len__(self):
+        return len(self._data)
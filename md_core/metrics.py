@@ -0,0 +1,182 @@
+"""Métricas de processo no formato texto do Prometheus, sem dependências externas.
+
+Contadores, gauges e histogramas simples (thread-safe) num registro global,
+mais ``span(nome)``: um bloco cronometrado cujo tempo vai para o histograma
+``delegacia_span_seconds{span="..."}``. Os spans marcam as etapas internas
+(pré-processamento, predict_proba, filtros, agregações, serialização, KMeans)
+para separar onde o tempo de uma requisição é gasto.
+
+No modo multi-worker cada processo mantém as próprias métricas.
+"""
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Segundos: de 0,5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(nomes, valores, extra: str = ""):
+    pares = [f'{nome}="{_escape(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _number(valor):
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self):
+        with self._lock:
+            itens = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, chave)} {_number(valor)}"
+                                 for chave, valor in itens]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        posicao = bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._values.get(labels)
+            if serie is None:
+                # contagens por bucket (a última é o +Inf), soma, total
+                serie = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][posicao] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def collect(self):
+        with self._lock:
+            itens = sorted((chave, (list(contagens), soma, total)) for chave, (contagens, soma, total)
+                           in self._values.items())
+        linhas = self._header()
+        for chave, (contagens, soma, total) in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (math.inf,), contagens):
+                acumulado += contagem
+                le = 'le="' + _number(limite) + '"'
+                linhas.append(f"{self.name}_bucket{_labels(self.labelnames, chave, le)} {acumulado}")
+            linhas.append(f"{self.name}_sum{_labels(self.labelnames, chave)} {_number(soma)}")
+            linhas.append(f"{self.name}_count{_labels(self.labelnames, chave)} {total}")
+        return linhas
+
+
+class MetricsRegistry:
+    """Conjunto de métricas expostas em /metrics.
+
+    Além das métricas atualizadas no caminho da requisição, aceita coletores:
+    funções chamadas na hora da leitura que devolvem métricas prontas (ex.:
+    estatísticas de caches e pools que já são contadas em outro lugar).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, fn):
+        """Registra ``fn() -> [métrica]``; pode ser usado como decorador."""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        with self._lock:
+            metricas = list(self._metrics)
+            coletores = list(self._collectors)
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.collect())
+        for coletor in coletores:
+            for metrica in coletor():
+                linhas.extend(metrica.collect())
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+SPAN_SECONDS = REGISTRY.histogram("delegacia_span_seconds", "Tempo das etapas internas (spans)", ["span"])
+
+
+@contextmanager
+def span(name: str):
+    """Cronometra o bloco e registra a duração em ``delegacia_span_seconds{span=name}``."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - inicio, name)
+
+
+def process_rss_bytes():
+    """Memória residente atual do processo (Linux); ``None`` se indisponível."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,56 @@
+"""Serialização JSON das respostas da API direto para bytes.
+
+Usa o orjson quando instalado (escreve numpy, datetime e str em C, sem passar
+por ``jsonable_encoder``); sem ele, cai no ``json`` da biblioteca padrão com o
+mesmo formato compacto em UTF-8. Escalares numpy e datas são aceitos nos dois
+caminhos, e NaN/±inf saem como ``null`` nos dois (o ``json`` padrão escreveria
+``NaN``, que não é JSON válido).
+"""
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
+
+
+def _finite(value):
+    """Troca NaN/±inf por ``None``, como o orjson faz ao serializar."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, np.floating):
+        return _finite(float(value))
+    if isinstance(value, np.ndarray):
+        return _finite(value.tolist())
+    return value
+
+
+def dumps(value) -> bytes:
+    """JSON compacto em UTF-8, no mesmo formato do JSONResponse do FastAPI."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(value), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_json_default).encode("utf-8")
+
+
+def to_columns(records: list, columns: list) -> dict:
+    """``[{"a": 1, "b": 2}, ...]`` -> ``{"a": [1, ...], "b": [2, ...]}`` (formato colunar)."""
+    return {col: [record[col] for record in records] for col in columns}
@@ -1,95 +1,549 @@
+import json
+import os
+import threading
+from bisect import bisect_right
+from pathlib import Path
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from md_core.lru import LRUCache
+from md_core.metrics import span
+from md_data_analysis.appendable import AppendOnlyArray
+from md_data_analysis.columns import ColumnStore
+from md_data_analysis.index import ColumnIndex
+from md_data_analysis.cube import OccurrenceCube
+from md_data_analysis.text_search import TrigramIndex
+from md_data_analysis.hotspots import fit_hotspots, fit_many
+from md_data_analysis.ids import OccurrenceIds, row_dtype
+from md_data_analysis.response_cache import ResponseCache
+from md_data_analysis.spatial import SpatialGrid
+from md_data_processing.dataset import (ID_COL, SOURCE_COLS, TIME_COLS, derive_time_columns,
+                                        load_occurrences)
+
+INDEXED_COLS = ['bairro', 'tipo_crime', 'ano', 'mes', 'dia_semana', 'hora']
+OCCURRENCE_COLS = ['id_ocorrencia', 'latitude', 'longitude', 'tipo_crime', 'bairro', 'data_ocorrencia']
+HEATMAP_COLS = ['bairro', 'hora', 'ocorrencias']
+# Colunas mantidas em memória: as que algum endpoint lê. O id fica fora do
+# DataFrame, codificado em OccurrenceIds.
+FRAME_COLS = ['data_ocorrencia', 'bairro', 'tipo_crime', 'latitude', 'longitude'] + TIME_COLS
+# Casas decimais das coordenadas devolvidas (~10 cm; o float32 guarda ~0,5 m)
+COORD_DECIMALS = 6
+CUBE_DIMS = ['bairro', 'tipo_crime', 'ano', 'mes', 'dia_semana', 'hora']
+CUBE_DOMAINS = {'mes': list(range(1, 13)), 'dia_semana': list(range(7)), 'hora': list(range(24))}
+DIAS_SEMANA = {0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta', 4: 'Sexta', 5: 'Sábado', 6: 'Domingo'}
+OCCURRENCE_BATCH_SIZE = 1000
+RECIFE_BBOX = {'lat_min': -8.3, 'lat_max': -7.9, 'lon_min': -35.1, 'lon_max': -34.8}
+
+def _iso_strings(values: np.ndarray):
+    """datetime64 -> texto ISO 8601 igual ao ``Timestamp.isoformat()`` (sem ``.000000``)."""
+    texto = np.datetime_as_string(values, unit='us')
+    return np.where(np.char.endswith(texto, '.000000'), texto.astype('U19'), texto).tolist()
+
+def _bbox_rows(lat, lon, inicio: int = 0):
+    return inicio + np.flatnonzero(
+        (lat > RECIFE_BBOX['lat_min']) & (lat < RECIFE_BBOX['lat_max']) &
+        (lon > RECIFE_BBOX['lon_min']) & (lon < RECIFE_BBOX['lon_max'])
+    )
+
+def _id_key(id_ocorrencia):
+    return len(id_ocorrencia), id_ocorrencia
+
+class AnalyzerState:
+    """Uma versão dos dados do analisador: colunas, ids e todos os índices derivados.
+
+    Nunca é alterado depois de publicado. A ingestão monta um estado novo ao
+    lado e troca a referência ``DataAnalyzer._state`` de uma vez; as consultas
+    pegam essa referência uma vez no início e leem tudo dela, sem lock e sem
+    ver um índice de uma versão e as colunas de outra. Colunas, listas de
+    linhas e ids são ``AppendOnlyArray``: o estado novo escreve só depois do
+    fim do anterior, então uma ingestão custa O(lote), não O(dados).
+    """
+
+    def __init__(self, columns, ids, index, cube, bairro_search, spatial, rows_in_bbox, id_order, id_rank,
+                 sorted_ids, version: int):
+        self.columns = columns
+        self.ids = ids
+        self.index = index
+        self.cube = cube
+        self.bairro_search = bairro_search
+        self.spatial = spatial
+        self._rows_in_bbox = rows_in_bbox
+        # Ordem "natural" dos ids (comprimento, depois texto): OCR99999 < OCR100000.
+        self._id_order = id_order
+        self._id_rank = id_rank
+        self._sorted_ids = sorted_ids
+        self.version = version
+
+    @classmethod
+    def build(cls, df, ids, version: int = 0):
+        lat = df['latitude'].to_numpy()
+        lon = df['longitude'].to_numpy()
+        cube = OccurrenceCube.from_frame(df, CUBE_DIMS, CUBE_DOMAINS)
+        rows_in_bbox = AppendOnlyArray(_bbox_rows(lat, lon).astype(row_dtype(len(df))))
+        return cls(ColumnStore.from_frame(df), ids, ColumnIndex(df, INDEXED_COLS), cube,
+                   TrigramIndex(cube.labels['bairro']), SpatialGrid(lat, lon), rows_in_bbox,
+                   *cls._id_arrays(ids), version)
+
+    @staticmethod
+    def _id_arrays(ids):
+        id_order = ids.natural_order()
+        id_rank = np.empty_like(id_order)
+        id_rank[id_order] = np.arange(len(id_order), dtype=id_order.dtype)
+        return AppendOnlyArray(id_order), AppendOnlyArray(id_rank), AppendOnlyArray(ids.values()[id_order])
+
+    def __len__(self):
+        return len(self.columns)
+
+    @property
+    def rows_in_bbox(self):
+        return self._rows_in_bbox.array
+
+    @property
+    def id_order(self):
+        return self._id_order.array
+
+    @property
+    def id_rank(self):
+        return self._id_rank.array
+
+    @property
+    def sorted_ids(self):
+        return self._sorted_ids.array
+
+    def sorted_id_key(self, value):
+        return _id_key(self.ids.format(value))
+
+    def id_position(self, id_ocorrencia: str):
+        """Quantos ids (na ordem natural) são menores ou iguais a ``id_ocorrencia``."""
+        return bisect_right(self.sorted_ids, _id_key(id_ocorrencia), key=self.sorted_id_key)
+
+    def has_id(self, id_ocorrencia: str):
+        pos = self.id_position(id_ocorrencia)
+        return pos > 0 and self.ids.format(self.sorted_ids[pos - 1]) == id_ocorrencia
+
+    def nbytes(self):
+        dados = self.columns.nbytes + self.ids.nbytes
+        indices = (self.index.nbytes + self.spatial.nbytes + self.cube.nbytes + self._rows_in_bbox.nbytes
+                   + self._id_order.nbytes + self._id_rank.nbytes + self._sorted_ids.nbytes)
+        return dados, indices
+
+    def extended(self, registros: pd.DataFrame):
+        """Novo estado com ``registros`` acrescentados; este não é alterado.
+
+        O custo é proporcional ao lote (mais o vocabulário das colunas
+        categóricas): nada do que já está indexado é copiado.
+        """
+        inicio = len(self)
+        registros = registros.reset_index(drop=True)
+        # Os tipos compactos vêm das colunas do estado (ColumnStore.appended converte).
+        novos = registros[FRAME_COLS]
+        columns = self.columns.appended(novos)
+
+        index = self.index.copy()
+        index.append(novos)
+        cube = self.cube.copy()
+        cube.add(novos)
+        bairro_search = self.bairro_search
+        ineditos = [bairro for bairro in novos['bairro'].dropna().unique().tolist()
+                    if bairro not in bairro_search]
+        if ineditos:
+            bairro_search = bairro_search.copy()
+            for bairro in ineditos:
+                bairro_search.add(bairro)
+        lat = columns.values('latitude')[inicio:]
+        lon = columns.values('longitude')[inicio:]
+        spatial = self.spatial.copy()
+        spatial.append(lat, lon)
+        rows_in_bbox = self._rows_in_bbox.appended(_bbox_rows(lat, lon, inicio).astype(row_dtype(len(columns))))
+        ids = self.ids.copy()
+        fallback = ids.append(np.asarray(registros['id_ocorrencia'].astype(str), dtype=str))
+        estado = AnalyzerState(columns, ids, index, cube, bairro_search, spatial, rows_in_bbox, self._id_order,
+                               self._id_rank, self._sorted_ids, self.version + 1)
+        if fallback or not estado._extend_id_order(inicio):
+            # Um id fora do padrão fez a coluna voltar para texto, ou os ids novos não
+            # vêm depois dos existentes: reconstrói a ordenação completa.
+            estado._id_order, estado._id_rank, estado._sorted_ids = self._id_arrays(ids)
+        return estado
+
+    def _extend_id_order(self, inicio: int):
+        """Acrescenta os ids a partir de ``inicio`` à ordenação; False se eles não vierem depois dos atuais."""
+        novos = self.ids.values()[inicio:]
+        ordem = self.ids.natural_order(novos)
+        ids_ordenados = novos[ordem]
+        if len(self._sorted_ids) and \
+                self.sorted_id_key(ids_ordenados[0]) <= self.sorted_id_key(self.sorted_ids[-1]):
+            return False
+        n = len(self._id_order)
+        dtype = row_dtype(len(self.ids))
+        # Os ids novos ficam depois de todos os atuais: os ranks existentes não mudam.
+        rank_novos = np.empty(len(ordem), dtype=dtype)
+        rank_novos[ordem] = np.arange(n, n + len(ordem))
+        self._id_order = self._id_order.appended((inicio + ordem).astype(dtype))
+        self._id_rank = self._id_rank.appended(rank_novos)
+        self._sorted_ids = self._sorted_ids.appended(ids_ordenados)
+        return True
+
+    def filtered_rows(self, tipo_crime: str = None, bairro: str = None, bbox: tuple = None,
+                      center: tuple = None, radius_m: float = None):
+        with span("analyzer.filter"):
+            row_sets = [self.rows_in_bbox]
+            if tipo_crime:
+                row_sets.append(self.index.rows('tipo_crime', tipo_crime))
+            if bairro:
+                row_sets.append(self.index.rows('bairro', bairro))
+            if bbox is not None:
+                row_sets.append(self.spatial.bbox(*bbox))
+            if radius_m is not None:
+                row_sets.append(self.spatial.radius(*center, radius_m))
+            return ColumnIndex.intersect(row_sets)
+
+    def column(self, rows, col: str):
+        """Valores de ``col`` nas linhas ``rows`` como lista de tipos nativos, prontos para JSON."""
+        if col == ID_COL:
+            return self.ids.take(rows)
+        valores = self.columns.values(col)[rows]
+        if self.columns.is_categorical(col):
+            # Indexa o vocabulário pelos códigos; o -1 (ausente) cai no None do fim.
+            categorias = np.append(self.columns.categories(col), None)
+            return categorias[valores].tolist()
+        if col in ('latitude', 'longitude'):
+            # float32 -> float64 arredondado: devolve -8.111355 e não -8.111355285644531.
+            return np.round(valores.astype(np.float64), COORD_DECIMALS).tolist()
+        if np.issubdtype(valores.dtype, np.datetime64):
+            return _iso_strings(valores)
+        return valores.tolist()
+
+    def hotspot_coordinates(self, bairro: str, hora: int):
+        rows = ColumnIndex.intersect([self.index.rows('bairro', bairro), self.index.rows('hora', hora)])
+        # KMeans em float64, como antes da compactação das coordenadas.
+        return np.column_stack((self.columns.values('latitude')[rows], self.columns.values('longitude')[rows])) \
+            .astype(np.float64)
 
 class DataAnalyzer:
-    def __init__(self, file_path: str):
-        self.df = pd.read_csv(file_path)
-        self.df['data_ocorrencia'] = pd.to_datetime(self.df['data_ocorrencia'])
-        self.df['ano'] = self.df['data_ocorrencia'].dt.year
-        self.df['mes'] = self.df['data_ocorrencia'].dt.month
-        self.df['dia_semana'] = self.df['data_ocorrencia'].dt.dayofweek
-        self.df['hora'] = self.df['data_ocorrencia'].dt.hour
-        print("Analisador de dados carregado com sucesso.")
+    def __init__(self, file_path: str, journal_path: str = None, hotspot_cache_size: int = 1024,
+                 response_cache_size: int = 256, grid_cache_size: int = 64):
+        df = load_occurrences(file_path, columns=[ID_COL] + FRAME_COLS, compact=True)
+        ids = OccurrenceIds.from_column(df.pop(ID_COL), df.attrs.get('id_prefix'))
+        self._lock = threading.Lock()
+        # Centróides por (bairro, hora, n_clusters, versão dos dados)
+        self.hotspot_cache = LRUCache(hotspot_cache_size)
+        self.response_cache = ResponseCache(response_cache_size)
+        self.grid_cache = ResponseCache(grid_cache_size)
+        self._state = AnalyzerState.build(df, ids)
+        self.journal_path = Path(journal_path) if journal_path else None
+        if self.journal_path is not None and self.journal_path.exists():
+            self._replay_journal()
+        memoria = self.memory_usage()
+        print(f"Analisador de dados carregado com sucesso: {self.n_rows} ocorrências, "
+              f"{memoria['total'] / 2 ** 20:.1f} MB (dados {memoria['dados'] / 2 ** 20:.1f} MB, "
+              f"índices {memoria['indices'] / 2 ** 20:.1f} MB).")
+
+    # Atalhos para o estado atual (leituras isoladas; consultas com várias leituras usam ``self._state``).
+    @property
+    def n_rows(self):
+        return len(self._state)
+
+    @property
+    def df(self):
+        """DataFrame montado a partir das colunas do estado atual (cópia, O(dados))."""
+        return self._state.columns.to_frame()
+
+    @property
+    def ids(self):
+        return self._state.ids
+
+    @property
+    def index(self):
+        return self._state.index
+
+    @property
+    def cube(self):
+        return self._state.cube
+
+    @property
+    def spatial(self):
+        return self._state.spatial
+
+    @property
+    def version(self):
+        return self._state.version
+
+    def memory_usage(self):
+        """Bytes em memória do DataFrame, dos ids e dos índices (reportado no início e em /metrics)."""
+        dados, indices = self._state.nbytes()
+        return {"dados": dados, "indices": indices, "total": dados + indices}
+
+    def _replay_journal(self):
+        with open(self.journal_path, encoding='utf-8') as journal:
+            records = [json.loads(line) for line in journal if line.strip()]
+        novos = self._prepare_records(records)
+        if len(novos):
+            self._apply(novos)
+        print(f"{len(novos)} ocorrências recuperadas do journal {self.journal_path}.")
+
+    def _prepare_records(self, records: list):
+        """Monta o DataFrame das novas ocorrências, descartando ids já conhecidos.
+
+        Mantém todas as colunas do registro (o journal guarda o registro
+        completo); ``_apply`` só leva para a memória as de ``FRAME_COLS``.
+        """
+        estado = self._state
+        vistos = set()
+        validos = []
+        for record in records:
+            id_ocorrencia = str(record['id_ocorrencia'])
+            if id_ocorrencia in vistos or estado.has_id(id_ocorrencia):
+                continue
+            vistos.add(id_ocorrencia)
+            validos.append(record)
+        novos = pd.DataFrame(validos, columns=SOURCE_COLS)
+        if not len(novos):
+            return novos
+        novos['id_ocorrencia'] = novos['id_ocorrencia'].astype(str).astype(object)
+        novos['data_ocorrencia'] = pd.to_datetime(novos['data_ocorrencia'])
+        if novos['data_ocorrencia'].dt.tz is not None:
+            novos['data_ocorrencia'] = novos['data_ocorrencia'].dt.tz_localize(None)
+        novos['data_ocorrencia'] = novos['data_ocorrencia'].astype(estado.columns.dtypes['data_ocorrencia'])
+        return derive_time_columns(novos)
+
+    def _apply(self, registros: pd.DataFrame):
+        # Publicação atômica: as consultas em andamento continuam no estado anterior.
+        self._state = self._state.extended(registros)
+        # Respostas antigas já não seriam consultadas (a versão faz parte da chave); libera a memória.
+        self.response_cache.clear()
+        self.grid_cache.clear()
+
+    def append(self, records: list):
+        """Acrescenta novas ocorrências ao estado em memória sem recarregar o CSV.
+
+        Índices, cubo e vocabulários são atualizados incrementalmente. Se houver
+        journal configurado, os registros aceitos são gravados nele (NDJSON)
+        antes de entrarem na memória, para serem reaplicados no próximo início.
+        """
+        with self._lock:
+            novos = self._prepare_records(records)
+            if len(novos):
+                if self.journal_path is not None:
+                    self._write_journal(novos)
+                self._apply(novos)
+            return {"inseridas": len(novos), "ignoradas": len(records) - len(novos), "versao": self.version}
+
+    def _write_journal(self, novos: pd.DataFrame):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        colunas = [col for col in novos.columns if col not in TIME_COLS]
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            for record in novos[colunas].to_dict(orient='records'):
+                record['data_ocorrencia'] = record['data_ocorrencia'].isoformat()
+                journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
 
     def get_top_bairros(self, limit: int = 10):
-        top_bairros = self.df['bairro'].value_counts().head(limit).reset_index()
-        top_bairros.columns = ['bairro', 'ocorrencias']
-        return top_bairros.to_dict(orient='records')
+        cube = self._state.cube
+        with span("analyzer.aggregate"):
+            contagem = cube.marginal(['bairro'])
+            cells = sorted(cube.nonzero_cells(contagem, ['bairro']), key=lambda cell: (-cell[1], cell[0]))
+        return [{"bairro": nome, "ocorrencias": total} for nome, total in cells[:limit]]
 
     def get_heatmap_data(self, bairro: str = None, hora: int = None, tipo_crime: str = None, dia_semana: int = None,
                          ano: int = None, mes: int = None):
-        df_filtrado = self.df.copy()
+        estado = self._state
+        filters = {}
         if bairro:
-            df_filtrado = df_filtrado[df_filtrado['bairro'].str.contains(bairro, case=False, na=False)]
+            # Resolve o filtro parcial (sem acento/caixa) para os nomes conhecidos.
+            filters['bairro'] = estado.bairro_search.search(bairro)
         if hora is not None:
-            df_filtrado = df_filtrado[df_filtrado['hora'] == hora]
+            filters['hora'] = [hora]
         if tipo_crime:
-            df_filtrado = df_filtrado[df_filtrado['tipo_crime'] == tipo_crime]
+            filters['tipo_crime'] = [tipo_crime]
         if dia_semana is not None:
-            df_filtrado = df_filtrado[df_filtrado['dia_semana'] == dia_semana]
+            filters['dia_semana'] = [dia_semana]
         if ano is not None:
-            df_filtrado = df_filtrado[df_filtrado['ano'] == ano]
+            filters['ano'] = [ano]
         if mes is not None:
-            df_filtrado = df_filtrado[df_filtrado['mes'] == mes]
-        heatmap_data = df_filtrado.groupby(['bairro', 'hora']).size().reset_index(name='ocorrencias')
-        heatmap_data = heatmap_data.sort_values('ocorrencias', ascending=False)
-        return heatmap_data.to_dict(orient='records')
+            filters['mes'] = [mes]
+        with span("analyzer.aggregate"):
+            contagem = estado.cube.aggregate(filters, ['bairro', 'hora'])
+            cells = estado.cube.nonzero_cells(contagem, ['bairro', 'hora'], filters)
+            cells.sort(key=lambda cell: (-cell[2], cell[0], cell[1]))
+        return [{"bairro": nome, "hora": h, "ocorrencias": total} for nome, h, total in cells]
 
     def get_seasonality_data(self, by: str = 'month'):
+        with span("analyzer.aggregate"):
+            return self._seasonality(self._state.cube, by)
+
+    @staticmethod
+    def _seasonality(cube, by: str):
         if by == 'day_of_week':
-            dias = {0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta', 4: 'Sexta', 5: 'Sábado', 6: 'Domingo'}
-            season_data = self.df['dia_semana'].map(dias).value_counts().reset_index()
-            season_data.columns = ['dia_semana', 'ocorrencias']
-        else:
-            season_data = self.df.groupby(['ano', 'mes']).size().reset_index(name='ocorrencias')
-            season_data = season_data.sort_values(['ano', 'mes'])
-        return season_data.to_dict(orient='records')
+            contagem = cube.marginal(['dia_semana'])
+            cells = sorted(cube.nonzero_cells(contagem, ['dia_semana']), key=lambda cell: (-cell[1], cell[0]))
+            return [{"dia_semana": DIAS_SEMANA[dia], "ocorrencias": total} for dia, total in cells]
+        contagem = cube.marginal(['ano', 'mes'])
+        cells = sorted(cube.nonzero_cells(contagem, ['ano', 'mes']))
+        return [{"ano": ano, "mes": mes, "ocorrencias": total} for ano, mes, total in cells]
+
+    def cached_response(self, nome: str, compute, **params):
+        """Resposta de ``compute(**params)`` já serializada, como ``(corpo JSON, ETag)``.
+
+        Só recalcula quando os dados mudam (a versão faz parte da chave).
+        """
+        return self.cached_entry(nome, **params) or self.compute_response(nome, compute, **params)
+
+    def cached_entry(self, nome: str, **params):
+        """``(corpo JSON, ETag)`` já em cache para os dados atuais, ou ``None`` (não calcula)."""
+        return self._lookup(self.response_cache, nome, params)
+
+    def compute_response(self, nome: str, compute, **params):
+        """Calcula ``compute(**params)``, serializa e guarda no cache; devolve ``(corpo JSON, ETag)``."""
+        return self._compute(self.response_cache, nome, compute, params)
+
+    def grid_response(self, **params):
+        """``occurrence_grid`` serializada, no cache próprio da grade.
+
+        Cada viewport do mapa é uma chave nova; num cache separado elas não
+        expulsam as respostas de metadados e estatísticas.
+        """
+        return self._lookup(self.grid_cache, "occurrence-grid", params) or \
+            self._compute(self.grid_cache, "occurrence-grid", self.occurrence_grid, params)
+
+    def _lookup(self, cache: ResponseCache, nome: str, params: dict):
+        return cache.get(ResponseCache.key(nome, params, self.version))
+
+    def _compute(self, cache: ResponseCache, nome: str, compute, params: dict):
+        chave = ResponseCache.key(nome, params, self.version)
+        valor = compute(**params)
+        with span("analyzer.serialize"):
+            return cache.put(chave, valor)
 
     def get_unique_crime_types(self):
-        crime_types = sorted(self.df['tipo_crime'].unique().tolist())
+        crime_types = sorted(self.cube.labels['tipo_crime'])
         return crime_types
 
     def get_unique_bairros(self):
-        bairros = sorted(self.df['bairro'].unique().tolist())
+        bairros = sorted(self.cube.labels['bairro'])
         return bairros
 
-    def get_all_occurrences(self, tipo_crime: str = None, bairro: str = None):
-        df_filtrado = self.df.copy()
-        lat_min, lat_max = -8.3, -7.9
-        lon_min, lon_max = -35.1, -34.8
-        df_filtrado = df_filtrado[
-            (df_filtrado['latitude'] > lat_min) & (df_filtrado['latitude'] < lat_max) &
-            (df_filtrado['longitude'] > lon_min) & (df_filtrado['longitude'] < lon_max)
-        ]
-        if tipo_crime:
-            df_filtrado = df_filtrado[df_filtrado['tipo_crime'] == tipo_crime]
-        if bairro:
-            df_filtrado = df_filtrado[df_filtrado['bairro'] == bairro]
-        cols_to_return = ['id_ocorrencia', 'latitude', 'longitude', 'tipo_crime', 'bairro', 'data_ocorrencia']
-        return df_filtrado[cols_to_return].to_dict(orient='records')
+    def autocomplete_bairros(self, query: str, limit: int = 10):
+        return self._state.bairro_search.autocomplete(query, limit)
+
+    def _filtered_rows(self, tipo_crime: str = None, bairro: str = None, bbox: tuple = None,
+                       center: tuple = None, radius_m: float = None):
+        """Linhas (ordenadas) que passam pelos filtros de atributo e espaciais.
+
+        ``bbox`` é ``(lat_min, lat_max, lon_min, lon_max)``; ``center`` é
+        ``(lat, lon)``, usado com ``radius_m``.
+        """
+        return self._state.filtered_rows(tipo_crime, bairro, bbox, center, radius_m)
+
+    def select_occurrences(self, tipo_crime: str = None, bairro: str = None, limit: int = None,
+                           after_id: str = None, bbox: tuple = None, center: tuple = None,
+                           radius_m: float = None, nearest: int = None):
+        """Linhas das ocorrências filtradas, ordenadas por id_ocorrencia.
+
+        ``after_id`` e ``limit`` implementam paginação por cursor: a página
+        seguinte começa depois do último id recebido. Com ``nearest`` o
+        resultado são as N ocorrências mais próximas de ``center``, em ordem
+        de distância (sem paginação).
+        """
+        estado = self._state
+        rows = estado.filtered_rows(tipo_crime, bairro, bbox, center, radius_m)
+        if nearest is not None:
+            return estado.spatial.nearest(*center, nearest, within=rows)
+        ranks = np.sort(estado.id_rank[rows])
+        if after_id is not None:
+            ranks = ranks[np.searchsorted(ranks, estado.id_position(after_id)):]
+        if limit is not None:
+            ranks = ranks[:limit]
+        return estado.id_order[ranks]
+
+    def next_cursor(self, rows, limit: int = None):
+        """Id a ser usado como ``after_id`` na próxima página, se houver."""
+        if limit is None or len(rows) < limit:
+            return None
+        return self.ids.take(rows[-1:])[0]
+
+    def occurrence_column(self, rows, col: str):
+        """Valores de ``col`` nas linhas ``rows`` como lista de tipos nativos, prontos para JSON."""
+        return self._state.column(rows, col)
+
+    # Linhas já selecionadas continuam válidas em estados mais novos (só há acréscimos),
+    # então os lotes podem ser lidos do estado atual no momento em que o iterador começa.
+    def iter_occurrences(self, rows, batch_size: int = OCCURRENCE_BATCH_SIZE):
+        """Registros das linhas ``rows`` em lotes, montados coluna a coluna (sem ``to_dict``)."""
+        estado = self._state
+        for inicio in range(0, len(rows), batch_size):
+            linhas = rows[inicio:inicio + batch_size]
+            with span("analyzer.serialize"):
+                colunas = [estado.column(linhas, col) for col in OCCURRENCE_COLS]
+                lote = [dict(zip(OCCURRENCE_COLS, valores)) for valores in zip(*colunas)]
+            yield lote
+
+    def iter_occurrence_column(self, rows, col: str, batch_size: int = OCCURRENCE_BATCH_SIZE):
+        """Valores de uma coluna das linhas ``rows`` em lotes (formato colunar)."""
+        estado = self._state
+        for inicio in range(0, len(rows), batch_size):
+            with span("analyzer.serialize"):
+                lote = estado.column(rows[inicio:inicio + batch_size], col)
+            yield lote
+
+    def occurrence_grid(self, zoom: int, tipo_crime: str = None, bairro: str = None, lat_min: float = None,
+                        lat_max: float = None, lon_min: float = None, lon_max: float = None):
+        """Contagem de ocorrências por célula da grade do nível de zoom, em vez dos pontos."""
+        estado = self._state
+        bbox = None if lat_min is None else (lat_min, lat_max, lon_min, lon_max)
+        rows = estado.filtered_rows(tipo_crime, bairro, bbox)
+        with span("analyzer.aggregate"):
+            return estado.spatial.aggregate(rows, zoom)
+
+    def get_all_occurrences(self, tipo_crime: str = None, bairro: str = None, limit: int = None,
+                            after_id: str = None):
+        rows = self.select_occurrences(tipo_crime, bairro, limit, after_id)
+        return [record for batch in self.iter_occurrences(rows) for record in batch]
 
     def get_unique_years(self):
-        years = sorted(self.df['ano'].unique().tolist())
+        years = sorted(self.cube.labels['ano'])
         return years
 
+    @staticmethod
+    def _hotspot_response(centros):
+        resultado = [{"lat": lat, "lon": lon} for lat, lon in centros]
+        return {
+            "message": f"{len(resultado)} hotspots previstos encontrados.",
+            "hotspots": resultado
+        }
+
     def predict_hotspots(self, bairro: str, hora: int, n_clusters: int = 3):
-        df_filtrado = self.df[
-            (self.df['bairro'] == bairro) & 
-            (self.df['hora'] == hora)
-        ]
-        if len(df_filtrado) < n_clusters:
+        estado = self._state
+        chave = (bairro, hora, n_clusters, estado.version)
+        cached = self.hotspot_cache.get(chave)
+        if cached is not None:
+            return cached
+        coordenadas = estado.hotspot_coordinates(bairro, hora)
+        if len(coordenadas) < n_clusters:
             return {
                 "message": "Dados insuficientes para prever hotspots com os filtros fornecidos.",
                 "hotspots": []
             }
-        coordenadas = df_filtrado[['latitude', 'longitude']]
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        kmeans.fit(coordenadas)
-        hotspots = kmeans.cluster_centers_
-        resultado = [
-            {"lat": lat, "lon": lon} for lat, lon in hotspots
-        ]
-        return {
-            "message": f"{len(resultado)} hotspots previstos encontrados.",
-            "hotspots": resultado
-        }
+        with span("analyzer.kmeans"):
+            centros = fit_hotspots(coordenadas, n_clusters)
+        resposta = self._hotspot_response(centros)
+        self.hotspot_cache.put(chave, resposta)
+        return resposta
+
+    def warm_hotspots(self, n_clusters: int = 3, max_workers: int = None):
+        """Pré-calcula os hotspots de todos os pares (bairro, hora) num pool de processos."""
+        estado = self._state
+        versao = estado.version
+        particoes = {}
+        for bairro in estado.cube.labels['bairro']:
+            for hora in estado.cube.labels['hora']:
+                if (bairro, hora, n_clusters, versao) in self.hotspot_cache:
+                    continue
+                coordenadas = estado.hotspot_coordinates(bairro, hora)
+                if len(coordenadas) >= n_clusters:
+                    particoes[(bairro, hora)] = coordenadas
+        if not particoes:
+            return 0
+        for (bairro, hora), centros in fit_many(particoes, n_clusters, max_workers).items():
+            self.hotspot_cache.put((bairro, hora, n_clusters, versao), self._hotspot_response(centros))
+        print(f"{len(particoes)} partições de hotspots pré-calculadas.")
+        return len(particoes)
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Fator de crescimento do buffer quando falta espaço (custo amortizado O(1) por elemento).
+GROWTH = 1.5
+
+
+class _Buffer:
+    __slots__ = ('data', 'used')
+
+    def __init__(self, data: np.ndarray, used: int):
+        self.data = data
+        self.used = used
+
+
+class AppendOnlyArray:
+    """Array (crescendo no primeiro eixo) cujas versões compartilham o mesmo buffer.
+
+    Cada instância enxerga as ``n`` primeiras posições de um buffer com folga.
+    ``appended`` grava os valores novos logo depois delas e devolve outra
+    instância, que enxerga ``n + k``; a original continua vendo exatamente o
+    que via, porque posições já escritas nunca mudam. O conteúdo só é copiado
+    para um buffer maior quando falta espaço, ou quando outra versão já
+    escreveu depois de ``n``, então acrescentar custa O(tamanho do lote)
+    amortizado em vez de O(tamanho do array).
+
+    Não é seguro para dois escritores ao mesmo tempo (o DataAnalyzer serializa
+    a ingestão); leitores nunca são afetados.
+    """
+
+    __slots__ = ('_buffer', '_n')
+
+    def __init__(self, values: np.ndarray):
+        # Sem folga inicial: o array (ou a fatia de outro array) é usado como está
+        # e só o primeiro acréscimo aloca um buffer próprio.
+        values = np.asarray(values)
+        self._buffer = _Buffer(values, len(values))
+        self._n = len(values)
+
+    @classmethod
+    def empty(cls, dtype, shape=()):
+        return cls(np.empty((0,) + tuple(shape), dtype=dtype))
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._buffer.data[:self._n]
+
+    @property
+    def dtype(self):
+        return self._buffer.data.dtype
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def nbytes(self):
+        """Bytes alocados pelo buffer (inclui a folga)."""
+        return self._buffer.data.nbytes
+
+    def appended(self, values) -> 'AppendOnlyArray':
+        """Nova versão com ``values`` no fim; esta não é alterada."""
+        values = np.asarray(values)
+        k = len(values)
+        if not k:
+            return self
+        buffer = self._buffer
+        dtype = buffer.data.dtype
+        if not np.can_cast(values.dtype, dtype, 'safe'):
+            dtype = np.promote_types(dtype, values.dtype)
+        fim = self._n + k
+        if buffer.used != self._n or fim > len(buffer.data) or dtype != buffer.data.dtype:
+            capacidade = max(fim, int(len(buffer.data) * GROWTH))
+            data = np.empty((capacidade,) + buffer.data.shape[1:], dtype=dtype)
+            data[:self._n] = buffer.data[:self._n]
+            buffer = _Buffer(data, self._n)
+        buffer.data[self._n:fim] = values
+        buffer.used = fim
+        novo = object.__new__(AppendOnlyArray)
+        novo._buffer = buffer
+        novo._n = fim
+        return novo
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from md_data_analysis.appendable import AppendOnlyArray
+
+
+def _code_dtype(n_categories: int):
+    """Menor inteiro com sinal para os códigos (o -1 marca valor ausente)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class ColumnStore:
+    """Colunas do DataFrame do analisador em ``AppendOnlyArray``.
+
+    Substitui o ``pd.concat`` do frame inteiro a cada ingestão: acrescentar
+    linhas só escreve no fim de cada coluna. Colunas categóricas guardam os
+    códigos e o vocabulário; categorias novas entram no fim do vocabulário,
+    então os códigos das linhas antigas continuam valendo. ``to_frame`` monta
+    um DataFrame (cópia) para quem precisa de um.
+    """
+
+    def __init__(self, values: dict, categories: dict, dtypes: dict):
+        self._values = values
+        self._categories = categories
+        self._lookup = {col: {valor: i for i, valor in enumerate(cats.tolist())}
+                        for col, cats in categories.items()}
+        self.dtypes = dtypes
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        values, categories = {}, {}
+        for col, dtype in df.dtypes.items():
+            serie = df[col]
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories[col] = serie.cat.categories.to_numpy(dtype=object)
+                values[col] = AppendOnlyArray(serie.cat.codes.to_numpy())
+            else:
+                values[col] = AppendOnlyArray(serie.to_numpy())
+        return cls(values, categories, dict(df.dtypes.items()))
+
+    def __len__(self):
+        return len(next(iter(self._values.values()))) if self._values else 0
+
+    @property
+    def columns(self):
+        return list(self._values)
+
+    def is_categorical(self, col: str):
+        return col in self._categories
+
+    def values(self, col: str) -> np.ndarray:
+        """Valores da coluna (para categóricas, os códigos)."""
+        return self._values[col].array
+
+    def categories(self, col: str) -> np.ndarray:
+        return self._categories[col]
+
+    @property
+    def nbytes(self):
+        categorias = sum(int(pd.Index(cats).memory_usage(deep=True)) for cats in self._categories.values())
+        return sum(coluna.nbytes for coluna in self._values.values()) + categorias
+
+    def appended(self, df: pd.DataFrame) -> 'ColumnStore':
+        """Nova versão com as linhas de ``df`` no fim; esta não é alterada."""
+        values = dict(self._values)
+        categories = dict(self._categories)
+        dtypes = dict(self.dtypes)
+        novo = object.__new__(ColumnStore)
+        novo._lookup = dict(self._lookup)
+        for col in self._values:
+            if col in self._categories:
+                lookup = self._lookup[col]
+                textos = df[col].tolist()
+                ineditos = [valor for valor in dict.fromkeys(textos) if not pd.isna(valor) and valor not in lookup]
+                if ineditos:
+                    # Vocabulário novo só para esta versão: a anterior continua com o dela.
+                    lookup = {**lookup, **{valor: len(lookup) + i for i, valor in enumerate(ineditos)}}
+                    categories[col] = np.append(categories[col], np.asarray(ineditos, dtype=object))
+                    dtypes[col] = pd.CategoricalDtype(pd.Index(categories[col]))
+                    novo._lookup[col] = lookup
+                codigos = np.fromiter((-1 if pd.isna(valor) else lookup[valor] for valor in textos),
+                                      dtype=_code_dtype(len(lookup)), count=len(textos))
+                values[col] = self._values[col].appended(codigos)
+            else:
+                values[col] = self._values[col].appended(df[col].to_numpy().astype(self.dtypes[col]))
+        novo._values, novo._categories, novo.dtypes = values, categories, dtypes
+        return novo
+
+    def to_frame(self) -> pd.DataFrame:
+        colunas = {}
+        for col, coluna in self._values.items():
+            if col in self._categories:
+                colunas[col] = pd.Categorical.from_codes(coluna.array, dtype=self.dtypes[col])
+            else:
+                colunas[col] = coluna.array.copy()
+        return pd.DataFrame(colunas)
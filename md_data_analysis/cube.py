@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from md_data_analysis.appendable import AppendOnlyArray
+
+
+class OccurrenceCube:
+    """Cubo esparso de contagens de ocorrências sobre dimensões categóricas.
+
+    Cada dimensão tem um eixo com rótulos (``labels``). Só as células ocupadas
+    são guardadas, em formato de coordenadas: a entrada ``k`` diz que
+    ``counts[k]`` ocorrências têm a combinação de posições ``coords[k]``.
+    Consultas de agregação filtram as entradas e somam por ``bincount``, com
+    custo proporcional às células ocupadas e não ao produto dos eixos.
+
+    ``add`` só acrescenta entradas (uma célula pode aparecer mais de uma vez
+    até a próxima compactação), em ``AppendOnlyArray``, e rótulos novos vão
+    para o fim do eixo, então nada do que já existe é realocado ou copiado.
+    """
+
+    def __init__(self, dims: list, domains: dict = None):
+        domains = domains or {}
+        self.dims = list(dims)
+        self.labels = {dim: list(domains.get(dim, [])) for dim in self.dims}
+        self._positions = {dim: {label: i for i, label in enumerate(self.labels[dim])} for dim in self.dims}
+        self._coords = AppendOnlyArray.empty(np.int32, (len(self.dims),))
+        self._counts = AppendOnlyArray.empty(np.int32)
+        # Entradas logo após a última compactação: com o dobro disso, compacta de novo.
+        self._compacted = 0
+        self._marginals = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dims: list, domains: dict = None):
+        domains = dict(domains or {})
+        for dim in dims:
+            if dim not in domains:
+                domains[dim] = sorted(df[dim].dropna().unique().tolist())
+        cube = cls(dims, domains)
+        cube.add(df)
+        return cube
+
+    def copy(self):
+        """Cópia independente (``add`` nela não altera este cubo; as entradas compartilham os buffers)."""
+        novo = object.__new__(OccurrenceCube)
+        novo.dims = list(self.dims)
+        novo.labels = {dim: list(labels) for dim, labels in self.labels.items()}
+        novo._positions = {dim: dict(positions) for dim, positions in self._positions.items()}
+        novo._coords = self._coords
+        novo._counts = self._counts
+        novo._compacted = self._compacted
+        novo._marginals = {}
+        return novo
+
+    @property
+    def coords(self):
+        return self._coords.array
+
+    @property
+    def counts(self):
+        return self._counts.array
+
+    @property
+    def shape(self):
+        return tuple(len(self.labels[dim]) for dim in self.dims)
+
+    @property
+    def nbytes(self):
+        return self._coords.nbytes + self._counts.nbytes
+
+    def add(self, df: pd.DataFrame):
+        """Soma as linhas de ``df`` ao cubo, expandindo eixos para valores novos."""
+        if len(df) == 0:
+            return
+        df = df[self.dims].dropna()
+        positions = []
+        for dim in self.dims:
+            values = df[dim].tolist()
+            lookup = self._positions[dim]
+            for value in dict.fromkeys(values):
+                if value not in lookup:
+                    lookup[value] = len(self.labels[dim])
+                    self.labels[dim].append(value)
+            positions.append(np.fromiter((lookup[value] for value in values), dtype=np.int64, count=len(values)))
+        coords, counts = self._group(positions)
+        self._coords = self._coords.appended(coords)
+        self._counts = self._counts.appended(counts)
+        if len(self._counts) >= 2 * max(self._compacted, 1):
+            self._compact()
+        self._marginals.clear()
+
+    def _group(self, positions):
+        """Agrupa posições repetidas em ``(coords únicas, contagens)``."""
+        flat = np.ravel_multi_index(positions, self.shape)
+        cells, counts = np.unique(flat, return_counts=True)
+        coords = np.column_stack(np.unravel_index(cells, self.shape)).astype(np.int32)
+        return coords.reshape(-1, len(self.dims)), counts.astype(np.int32)
+
+    def _compact(self):
+        """Soma as entradas repetidas da mesma célula (em arrays novos; O(entradas), amortizado)."""
+        flat = np.ravel_multi_index(tuple(self.coords.T.astype(np.int64)), self.shape)
+        cells, inverso = np.unique(flat, return_inverse=True)
+        counts = np.bincount(inverso.ravel(), weights=self.counts, minlength=len(cells))
+        self._coords = AppendOnlyArray(np.column_stack(np.unravel_index(cells, self.shape)).astype(np.int32)
+                                       .reshape(-1, len(self.dims)))
+        self._counts = AppendOnlyArray(counts.astype(np.int32))
+        self._compacted = len(self._counts)
+
+    def positions(self, dim, labels):
+        lookup = self._positions[dim]
+        return [lookup[label] for label in labels if label in lookup]
+
+    def marginal(self, keep: list):
+        """Soma o cubo inteiro sobre todas as dimensões fora de ``keep`` (com cache)."""
+        key = tuple(keep)
+        if key not in self._marginals:
+            self._marginals[key] = self.aggregate({}, keep)
+        return self._marginals[key]
+
+    def aggregate(self, filters: dict, keep: list):
+        """Filtra o cubo pelos rótulos em ``filters`` e soma as dimensões fora de ``keep``.
+
+        ``filters`` mapeia dimensão -> lista de rótulos aceitos. O resultado é
+        um array denso com um eixo por dimensão de ``keep``, na ordem de
+        ``self.dims``; o eixo de uma dimensão filtrada segue a ordem dos
+        rótulos do filtro.
+        """
+        coords, counts = self.coords, self.counts
+        mask = np.ones(len(counts), dtype=bool)
+        eixos, shape = [], []
+        for axis, dim in enumerate(self.dims):
+            coluna = coords[:, axis]
+            tamanho = len(self.labels[dim])
+            if dim in filters:
+                posicoes = self.positions(dim, filters[dim])
+                remap = np.full(tamanho, -1, dtype=np.int64)
+                remap[posicoes] = np.arange(len(posicoes))
+                coluna = remap[coluna]
+                mask &= coluna >= 0
+                tamanho = len(posicoes)
+            if dim in keep:
+                eixos.append(coluna)
+                shape.append(tamanho)
+        if not shape:
+            return np.int64(counts[mask].sum())
+        flat = np.ravel_multi_index(tuple(eixo[mask] for eixo in eixos), shape)
+        total = np.bincount(flat, weights=counts[mask], minlength=int(np.prod(shape)))
+        return total.astype(np.int64).reshape(shape)
+
+    def nonzero_cells(self, counts, dims: list, filters: dict = None):
+        """Lista ``(rótulos..., contagem)`` das células não nulas de um agregado."""
+        filters = filters or {}
+        axis_labels = []
+        for dim in dims:
+            if dim in filters:
+                axis_labels.append([self.labels[dim][p] for p in self.positions(dim, filters[dim])])
+            else:
+                axis_labels.append(self.labels[dim])
+        return [
+            tuple(labels[i] for labels, i in zip(axis_labels, idx)) + (int(counts[idx]),)
+            for idx in zip(*np.nonzero(counts))
+        ]
@@ -0,0 +1,30 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# Acima deste número de pontos o KMeans completo (n_init=10) fica caro demais
+# para uma requisição; o MiniBatchKMeans dá centróides equivalentes para mapa.
+MINIBATCH_THRESHOLD = 20000
+
+
+def fit_hotspots(coordenadas: np.ndarray, n_clusters: int):
+    """Ajusta os clusters e devolve os centróides como lista de (lat, lon)."""
+    if len(coordenadas) > MINIBATCH_THRESHOLD:
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3,
+                                 batch_size=4096)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    kmeans.fit(coordenadas)
+    return [(float(lat), float(lon)) for lat, lon in kmeans.cluster_centers_]
+
+
+def fit_many(particoes: dict, n_clusters: int, max_workers: int = None):
+    """Ajusta várias partições {chave: coordenadas} em paralelo num pool de processos."""
+    # "spawn" pelo mesmo motivo do orquestrador: roda numa thread da API, que já
+    # carregou OpenMP (LightGBM, sklearn), e fork + OpenMP pode travar.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = {chave: pool.submit(fit_hotspots, coords, n_clusters) for chave, coords in particoes.items()}
+        return {chave: future.result() for chave, future in futures.items()}
@@ -0,0 +1,107 @@
+import numpy as np
+
+from md_data_analysis.appendable import AppendOnlyArray
+from md_data_processing.dataset import encode_ids
+
+
+def row_dtype(n_rows: int):
+    """Menor tipo inteiro que endereça ``n_rows`` linhas (int32 até ~2 bilhões)."""
+    return np.int32 if n_rows < 2 ** 31 else np.int64
+
+
+class OccurrenceIds:
+    """Coluna ``id_ocorrencia`` guardada como prefixo comum + número inteiro.
+
+    ``OCR100000`` vira ``("OCR", 100000)``: 8 bytes por linha em vez de um
+    objeto str. Se chegar um id fora do padrão (outro prefixo, zeros à
+    esquerda), a coluna passa a guardar o texto e tudo continua funcionando,
+    só que sem a economia. A ordem "natural" (comprimento, depois texto) é a
+    mesma ordem numérica quando todos os ids compartilham o prefixo.
+    """
+
+    def __init__(self, numbers: np.ndarray = None, prefix: str = None, strings: np.ndarray = None):
+        self.prefix = prefix
+        # Um dos dois, como AppendOnlyArray: acrescentar ids só escreve no fim.
+        self._numbers = None if numbers is None else AppendOnlyArray(numbers)
+        self._strings = None if strings is None else AppendOnlyArray(strings)
+
+    @property
+    def numbers(self):
+        return None if self._numbers is None else self._numbers.array
+
+    @property
+    def strings(self):
+        return None if self._strings is None else self._strings.array
+
+    @classmethod
+    def from_column(cls, values, prefix: str = None):
+        """A partir da coluna carregada: inteiros (com ``prefix``) ou texto."""
+        values = np.asarray(values)
+        if np.issubdtype(values.dtype, np.integer) and prefix is not None:
+            return cls(numbers=values.astype(np.int64, copy=False), prefix=prefix)
+        return cls.from_strings(values)
+
+    @classmethod
+    def from_strings(cls, ids):
+        prefix, numbers = encode_ids(ids)
+        if numbers is None or prefix is None:
+            return cls(strings=np.asarray(ids, dtype=str))
+        return cls(numbers=numbers, prefix=prefix)
+
+    def copy(self):
+        """Cópia que pode receber ``append`` sem alterar esta (posições já escritas nunca mudam)."""
+        novo = object.__new__(OccurrenceIds)
+        novo.prefix, novo._numbers, novo._strings = self.prefix, self._numbers, self._strings
+        return novo
+
+    @property
+    def encoded(self):
+        return self._numbers is not None
+
+    def __len__(self):
+        return len(self._numbers) if self.encoded else len(self._strings)
+
+    @property
+    def nbytes(self):
+        return self._numbers.nbytes if self.encoded else self._strings.nbytes
+
+    def values(self):
+        """Array comparável por ``natural_order`` (números ou texto)."""
+        return self.numbers if self.encoded else self.strings
+
+    def format(self, value):
+        """Texto do id a partir de um elemento de ``values()``."""
+        return f"{self.prefix}{int(value)}" if self.encoded else str(value)
+
+    def take(self, rows):
+        """Ids (texto) das linhas dadas, como lista."""
+        if self.encoded:
+            return [f"{self.prefix}{numero}" for numero in self.numbers[rows].tolist()]
+        return self.strings[rows].tolist()
+
+    def natural_order(self, values=None):
+        """Posições que ordenam ``values`` (padrão: todos) pelo comprimento e depois pelo texto."""
+        values = self.values() if values is None else values
+        if self.encoded:
+            ordem = np.argsort(values, kind='stable')
+        else:
+            ordem = np.lexsort((values, np.char.str_len(values)))
+        return ordem.astype(row_dtype(len(self)), copy=False)
+
+    def append(self, ids):
+        """Acrescenta ids (texto). Retorna True se a representação mudou para texto."""
+        ids = np.asarray(ids, dtype=str)
+        if not len(ids):
+            return False
+        if self.encoded:
+            _, numbers = encode_ids(ids, prefix=self.prefix)
+            if numbers is not None:
+                self._numbers = self._numbers.appended(numbers)
+                return False
+            # Mudança de representação: a única situação em que a coluna toda é reescrita.
+            self._strings = AppendOnlyArray(np.concatenate((np.asarray(self.take(slice(None)), dtype=str), ids)))
+            self._numbers = None
+            self.prefix = None
+            return True
+        self._strings = self._strings.appended(ids)
+        return False
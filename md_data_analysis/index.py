@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from md_data_analysis.appendable import AppendOnlyArray
+from md_data_analysis.ids import row_dtype
+
+
+class ColumnIndex:
+    """Índice invertido em memória sobre colunas de baixa cardinalidade.
+
+    Cada coluna tem o vocabulário ordenado (``categories``) e cada valor aponta
+    para a lista ordenada de linhas onde ocorre (``postings``, int32 enquanto
+    couber). Filtros com várias colunas viram interseções dessas listas, sem
+    copiar nem varrer o DataFrame. As listas são ``AppendOnlyArray``: indexar
+    linhas novas só escreve no fim delas.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list):
+        self.n_rows = len(df)
+        self.columns = list(columns)
+        self.categories = {}
+        self.postings = {}
+        self._lookup = {}
+        for col in columns:
+            self._build_column(col, df[col])
+
+    def _build_column(self, col, series):
+        codes, categories = pd.factorize(series, sort=True)
+        order = np.argsort(codes, kind='stable').astype(row_dtype(self.n_rows))
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        # Linhas com valor nulo (código -1) ficam no início de `order` e são ignoradas.
+        start = int((codes < 0).sum())
+        self.categories[col] = np.asarray(categories)
+        self._lookup[col] = {value: i for i, value in enumerate(np.asarray(categories).tolist())}
+        self.postings[col] = {
+            value: AppendOnlyArray(order[start + bounds[i]:start + bounds[i + 1]])
+            for i, value in enumerate(np.asarray(categories).tolist())
+        }
+
+    def copy(self):
+        """Cópia que pode receber ``append`` sem alterar este índice (as listas compartilham os buffers)."""
+        novo = object.__new__(ColumnIndex)
+        novo.n_rows = self.n_rows
+        novo.columns = list(self.columns)
+        novo.categories = dict(self.categories)
+        novo.postings = {col: dict(postings) for col, postings in self.postings.items()}
+        novo._lookup = {col: dict(lookup) for col, lookup in self._lookup.items()}
+        return novo
+
+    def append(self, df: pd.DataFrame):
+        """Indexa novas linhas, numeradas a partir de ``n_rows``.
+
+        Valores inéditos ganham códigos no fim do vocabulário; como as novas
+        linhas vêm depois das existentes, as listas continuam ordenadas.
+        """
+        rows = np.arange(self.n_rows, self.n_rows + len(df))
+        dtype = row_dtype(self.n_rows + len(df))
+        for col in self.columns:
+            lookup = self._lookup[col]
+            novos_por_valor = {}
+            for row, value in zip(rows.tolist(), df[col].tolist()):
+                if pd.isna(value):
+                    continue
+                if value not in lookup:
+                    lookup[value] = len(lookup)
+                    self.categories[col] = np.append(self.categories[col], [value])
+                novos_por_valor.setdefault(value, []).append(row)
+            postings = self.postings[col]
+            for value, novas_linhas in novos_por_valor.items():
+                lista = postings.get(value)
+                novas_linhas = np.asarray(novas_linhas, dtype=dtype)
+                postings[value] = AppendOnlyArray(novas_linhas) if lista is None else lista.appended(novas_linhas)
+        self.n_rows += len(df)
+
+    @property
+    def nbytes(self):
+        return sum(rows.nbytes for postings in self.postings.values() for rows in postings.values())
+
+    def values(self, col):
+        return self.categories[col].tolist()
+
+    def rows(self, col, value):
+        """Linhas (ordenadas) em que ``col == value``."""
+        lista = self.postings[col].get(value)
+        return _EMPTY if lista is None else lista.array
+
+    def rows_any(self, col, values):
+        """Linhas (ordenadas) em que ``col`` assume qualquer um dos valores."""
+        listas = [self.rows(col, value) for value in values]
+        listas = [rows for rows in listas if len(rows)]
+        if not listas:
+            return _EMPTY
+        if len(listas) == 1:
+            return listas[0]
+        return np.sort(np.concatenate(listas))
+
+    @staticmethod
+    def intersect(row_sets):
+        """Interseção de listas de linhas; ``None`` na entrada significa "sem filtro".
+
+        Retorna ``None`` quando nenhum filtro foi aplicado.
+        """
+        row_sets = [rows for rows in row_sets if rows is not None]
+        if not row_sets:
+            return None
+        row_sets.sort(key=len)
+        result = row_sets[0]
+        for rows in row_sets[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+
+_EMPTY = np.empty(0, dtype=np.int32)
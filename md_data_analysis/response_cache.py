@@ -0,0 +1,24 @@
+import hashlib
+
+from md_core.lru import LRUCache
+from md_core.serialization import dumps
+
+
+class ResponseCache(LRUCache):
+    """Cache LRU de respostas já serializadas.
+
+    Guarda ``(corpo JSON, ETag)`` por (endpoint, parâmetros, versão dos dados).
+    O ETag é derivado do conteúdo, então continua válido entre reinícios e
+    entre workers que sirvam os mesmos dados.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        super().__init__(maxsize)
+
+    @staticmethod
+    def key(nome: str, params: dict, version: int):
+        return nome, tuple(sorted(params.items())), version
+
+    def put(self, key, value):
+        body = dumps(value)
+        return super().put(key, (body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'))
@@ -0,0 +1,215 @@
+import math
+
+import numpy as np
+
+from md_data_analysis.appendable import AppendOnlyArray
+from md_data_analysis.ids import row_dtype
+
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def haversine_m(lat, lon, lats, lons):
+    """Distância em metros de (lat, lon) até cada ponto de (lats, lons)."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def zoom_cell_size(zoom: int):
+    """Largura (em graus) de uma célula de agregação no nível de zoom dado (como os tiles de mapa)."""
+    return 360.0 / (2 ** zoom)
+
+
+class SpatialGrid:
+    """Índice espacial em grade regular sobre latitude/longitude.
+
+    Cada linha cai numa célula de ``cell_deg`` graus; cada célula ocupada
+    aponta para a lista ordenada das suas linhas (como as ``postings`` do
+    ColumnIndex, também ``AppendOnlyArray``). Consultas por retângulo, raio e vizinhos mais próximos só
+    olham as células que podem conter resultados e depois refinam pelas
+    coordenadas exatas.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 0.005):
+        self.cell_deg = cell_deg
+        # Mantém a precisão das coordenadas recebidas (float32 no DataAnalyzer).
+        dtype = np.result_type(np.asarray(lat).dtype, np.float32)
+        self._lat = AppendOnlyArray.empty(dtype)
+        self._lon = AppendOnlyArray.empty(dtype)
+        self.cells = {}
+        self.append(lat, lon)
+
+    @property
+    def lat(self):
+        return self._lat.array
+
+    @property
+    def lon(self):
+        return self._lon.array
+
+    def _cell_of(self, lat, lon):
+        return np.floor(np.asarray(lat) / self.cell_deg).astype(np.int64), \
+            np.floor(np.asarray(lon) / self.cell_deg).astype(np.int64)
+
+    def append(self, lat: np.ndarray, lon: np.ndarray):
+        """Indexa novas linhas, numeradas a partir do tamanho atual do índice."""
+        lat = np.asarray(lat, dtype=self._lat.dtype)
+        lon = np.asarray(lon, dtype=self._lon.dtype)
+        inicio = len(self._lat)
+        self._lat = self._lat.appended(lat)
+        self._lon = self._lon.appended(lon)
+        validos = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        if not len(validos):
+            return
+        ci, cj = self._cell_of(lat[validos], lon[validos])
+        ordem = np.lexsort((validos, cj, ci))
+        ci, cj = ci[ordem], cj[ordem]
+        linhas = (inicio + validos[ordem]).astype(row_dtype(inicio + len(lat)))
+        quebras = np.flatnonzero((np.diff(ci) != 0) | (np.diff(cj) != 0)) + 1
+        for grupo in np.split(np.arange(len(linhas)), quebras):
+            chave = (int(ci[grupo[0]]), int(cj[grupo[0]]))
+            # Novas linhas têm números maiores: a lista continua ordenada.
+            existentes = self.cells.get(chave)
+            novas = linhas[grupo]
+            self.cells[chave] = AppendOnlyArray(novas) if existentes is None else existentes.appended(novas)
+
+    def __len__(self):
+        return len(self._lat)
+
+    def copy(self):
+        """Cópia que pode receber ``append`` sem alterar este índice (os arrays compartilham os buffers)."""
+        novo = object.__new__(SpatialGrid)
+        novo.cell_deg = self.cell_deg
+        novo._lat, novo._lon = self._lat, self._lon
+        novo.cells = dict(self.cells)
+        return novo
+
+    @property
+    def nbytes(self):
+        return self._lat.nbytes + self._lon.nbytes + sum(rows.nbytes for rows in self.cells.values())
+
+    def _cells_in(self, i_min, i_max, j_min, j_max):
+        n_range = (i_max - i_min + 1) * (j_max - j_min + 1)
+        if n_range > len(self.cells):
+            # Retângulo maior que a área ocupada: mais barato varrer as células existentes.
+            return [rows.array for (i, j), rows in self.cells.items()
+                    if i_min <= i <= i_max and j_min <= j <= j_max]
+        return [self.cells[(i, j)].array for i in range(i_min, i_max + 1) for j in range(j_min, j_max + 1)
+                if (i, j) in self.cells]
+
+    def _candidates(self, lat_min, lat_max, lon_min, lon_max):
+        i_min, j_min = self._cell_of(lat_min, lon_min)
+        i_max, j_max = self._cell_of(lat_max, lon_max)
+        listas = self._cells_in(int(i_min), int(i_max), int(j_min), int(j_max))
+        if not listas:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(listas)
+
+    def bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+        """Linhas (ordenadas) dentro do retângulo, bordas inclusive."""
+        rows = self._candidates(lat_min, lat_max, lon_min, lon_max)
+        lat, lon = self.lat[rows], self.lon[rows]
+        rows = rows[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+        return np.sort(rows)
+
+    def radius(self, lat: float, lon: float, radius_m: float):
+        """Linhas (ordenadas) a até ``radius_m`` metros do ponto."""
+        # Retângulo que contém o círculo (calota esférica), com folga para arredondamento.
+        angulo = min(radius_m / EARTH_RADIUS_M, math.pi)
+        dlat = math.degrees(angulo) * (1 + 1e-9)
+        seno = math.sin(angulo) / max(math.cos(math.radians(lat)), 1e-12)
+        dlon = 180.0 if seno >= 1 or abs(lat) + dlat >= 90 else math.degrees(math.asin(seno)) * (1 + 1e-9)
+        rows = self._candidates(lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+        rows = rows[haversine_m(lat, lon, self.lat[rows], self.lon[rows]) <= radius_m]
+        return np.sort(rows)
+
+    def nearest(self, lat: float, lon: float, n: int, within: np.ndarray = None):
+        """As ``n`` linhas mais próximas do ponto, em ordem de distância.
+
+        ``within`` (linhas ordenadas) restringe a busca a um subconjunto, ex.:
+        o resultado dos filtros por tipo de crime ou bairro.
+        """
+        if n <= 0 or not self.cells or (within is not None and not len(within)):
+            return np.empty(0, dtype=np.intp)
+        ci, cj = (int(v) for v in self._cell_of(lat, lon))
+        ocupadas = np.array(list(self.cells), dtype=np.int64)
+        max_ring = int(max(np.abs(ocupadas[:, 0] - ci).max(), np.abs(ocupadas[:, 1] - cj).max()))
+        # Anéis custam (2r+1)² consultas; longe dos dados (ou com ``within`` pequeno)
+        # sai mais barato medir a distância de todos os candidatos de uma vez.
+        limite = len(self.cells) if within is None else min(len(self.cells), len(within))
+        # Expande anéis de células até juntar n candidatos ...
+        candidatos = np.empty(0, dtype=np.intp)
+        for ring in range(max_ring + 1):
+            if (2 * ring + 1) ** 2 > limite:
+                return self._nearest_brute(lat, lon, n, within)
+            candidatos = self._candidates_ring(ci, cj, ring, candidatos, within)
+            if len(candidatos) >= n:
+                break
+        if not len(candidatos):
+            return candidatos
+        # ... e confirma com uma busca por raio: um ponto fora dos anéis pode estar mais perto
+        # que o n-ésimo candidato (as células não são círculos).
+        dist = haversine_m(lat, lon, self.lat[candidatos], self.lon[candidatos])
+        if len(candidatos) >= n:
+            raio = float(np.partition(dist, n - 1)[n - 1])
+            candidatos = self.radius(lat, lon, raio)
+            if within is not None:
+                candidatos = np.intersect1d(candidatos, within, assume_unique=True)
+            dist = haversine_m(lat, lon, self.lat[candidatos], self.lon[candidatos])
+        ordem = np.lexsort((candidatos, dist))[:n]
+        return candidatos[ordem]
+
+    def _nearest_brute(self, lat, lon, n, within):
+        if within is None:
+            candidatos = np.concatenate([rows.array for rows in self.cells.values()])
+        else:
+            candidatos = within[~(np.isnan(self.lat[within]) | np.isnan(self.lon[within]))]
+        dist = haversine_m(lat, lon, self.lat[candidatos], self.lon[candidatos])
+        ordem = np.lexsort((candidatos, dist))[:n]
+        return candidatos[ordem]
+
+    def _candidates_ring(self, ci, cj, ring, acumulado, within):
+        if ring == 0:
+            listas = [self.cells.get((ci, cj))]
+        else:
+            listas = [self.cells.get((ci + di, cj + dj))
+                      for di in range(-ring, ring + 1) for dj in range(-ring, ring + 1)
+                      if max(abs(di), abs(dj)) == ring]
+        listas = [rows.array for rows in listas if rows is not None]
+        if not listas:
+            return acumulado
+        novos = np.concatenate(listas)
+        if within is not None:
+            novos = novos[np.isin(novos, within, assume_unique=True)]
+        return np.concatenate((acumulado, novos))
+
+    def aggregate(self, rows: np.ndarray, zoom: int):
+        """Contagem por célula de um nível de zoom (para o mapa em visão ampla).
+
+        Cada célula traz o centróide dos pontos (onde desenhar o marcador), a
+        contagem e os limites da célula.
+        """
+        if not len(rows):
+            return []
+        tamanho = zoom_cell_size(zoom)
+        lat, lon = self.lat[rows], self.lon[rows]
+        ci = np.floor(lat / tamanho).astype(np.int64)
+        cj = np.floor(lon / tamanho).astype(np.int64)
+        celulas, inverso, contagens = np.unique(np.column_stack((ci, cj)), axis=0, return_inverse=True,
+                                                return_counts=True)
+        inverso = inverso.ravel()
+        soma_lat = np.bincount(inverso, weights=lat, minlength=len(celulas))
+        soma_lon = np.bincount(inverso, weights=lon, minlength=len(celulas))
+        resultado = []
+        for (i, j), total, s_lat, s_lon in zip(celulas.tolist(), contagens.tolist(), soma_lat.tolist(),
+                                               soma_lon.tolist()):
+            resultado.append({
+                "latitude": s_lat / total,
+                "longitude": s_lon / total,
+                "ocorrencias": total,
+                "celula": {"lat_min": i * tamanho, "lat_max": (i + 1) * tamanho,
+                           "lon_min": j * tamanho, "lon_max": (j + 1) * tamanho},
+            })
+        resultado.sort(key=lambda celula: -celula["ocorrencias"])
+        return resultado
@@ -0,0 +1,77 @@
+import unicodedata
+
+
+def normalize(text: str) -> str:
+    """Remove acentos e normaliza caixa para comparações de texto."""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().strip()
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Índice de trigramas sobre um vocabulário pequeno (ex.: nomes de bairros).
+
+    A busca por parte do nome ignora acentos e caixa: os trigramas da consulta
+    selecionam candidatos e a substring normalizada confirma o casamento.
+    """
+
+    def __init__(self, terms=()):
+        self.terms = []
+        self._normalized = []
+        self._positions = {}
+        self._postings = {}
+        for term in terms:
+            self.add(term)
+
+    def copy(self):
+        """Cópia independente (``add`` nela não altera este índice)."""
+        novo = TrigramIndex()
+        novo.terms = list(self.terms)
+        novo._normalized = list(self._normalized)
+        novo._positions = dict(self._positions)
+        novo._postings = {gram: set(positions) for gram, positions in self._postings.items()}
+        return novo
+
+    def __contains__(self, term):
+        return term in self._positions
+
+    def add(self, term: str):
+        if term in self._positions:
+            return
+        position = len(self.terms)
+        normalized = normalize(term)
+        self._positions[term] = position
+        self.terms.append(term)
+        self._normalized.append(normalized)
+        for gram in trigrams(normalized):
+            self._postings.setdefault(gram, set()).add(position)
+
+    def _candidates(self, query: str):
+        grams = trigrams(query)
+        if not grams:
+            return range(len(self.terms))
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        return sorted(set.intersection(*postings))
+
+    def search(self, query: str):
+        """Termos que contêm ``query`` (sem acento/caixa), na ordem de inserção."""
+        query = normalize(query)
+        return [self.terms[i] for i in self._candidates(query) if query in self._normalized[i]]
+
+    def autocomplete(self, query: str, limit: int = 10):
+        """Sugestões para ``query``: primeiro quem começa com ela, depois o restante."""
+        query = normalize(query)
+        matches = [i for i in self._candidates(query) if query in self._normalized[i]]
+
+        def rank(i):
+            normalized = self._normalized[i]
+            if normalized.startswith(query):
+                return 0, normalized
+            if any(word.startswith(query) for word in normalized.split()):
+                return 1, normalized
+            return 2, normalized
+
+        return [self.terms[i] for i in sorted(matches, key=rank)[:limit]]
@@ -0,0 +1,295 @@
+# md_data_processing/dataset.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from md_core.config import DATA_PATH
+
+CACHE_VERSION = 1
+DATE_COL = 'data_ocorrencia'
+ID_COL = 'id_ocorrencia'
+TIME_COLS = ['ano', 'mes', 'dia_semana', 'hora']
+# Colunas do CSV de ocorrências (e dos registros recebidos pela API)
+SOURCE_COLS = [ID_COL, DATE_COL, 'bairro', 'tipo_crime', 'descricao_modus_operandi', 'arma_utilizada',
+               'quantidade_vitimas', 'quantidade_suspeitos', 'sexo_suspeito', 'idade_suspeito', 'orgao_responsavel',
+               'status_investigacao', 'latitude', 'longitude']
+# Tipos usados com ``compact=True``: categorias para os textos de baixa cardinalidade,
+# inteiros pequenos para contagens e partes da data, float32 (~0,5 m) para as coordenadas.
+# O id vira inteiro (ver ``encode_ids``).
+COMPACT_DTYPES = {
+    'bairro': 'category', 'tipo_crime': 'category', 'descricao_modus_operandi': 'category',
+    'arma_utilizada': 'category', 'sexo_suspeito': 'category', 'orgao_responsavel': 'category',
+    'status_investigacao': 'category',
+    'quantidade_vitimas': 'int16', 'quantidade_suspeitos': 'int16', 'idade_suspeito': 'int16',
+    'latitude': 'float32', 'longitude': 'float32',
+    'ano': 'int16', 'mes': 'int8', 'dia_semana': 'int8', 'hora': 'int8',
+}
+# Dígitos que cabem com folga em um int64
+MAX_ID_DIGITS = 18
+
+
+def _cache_dir(csv_path: Path) -> Path:
+    return csv_path.parent / ".cache" / csv_path.stem
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stamp(csv_path: Path) -> dict:
+    stat = csv_path.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _write_json(path: Path, payload: dict):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_meta(csv_path: Path, cache_dir: Path):
+    """Lê os metadados do cache se ele ainda corresponder ao CSV de origem."""
+    meta_path = cache_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        # meta.json truncado ou corrompido: o cache é reconstruído a partir do CSV.
+        return None
+    if not isinstance(meta, dict) or meta.get("version") != CACHE_VERSION:
+        return None
+    stamp = _source_stamp(csv_path)
+    if meta["source"]["mtime_ns"] == stamp["mtime_ns"] and meta["source"]["size"] == stamp["size"]:
+        return meta
+    # mtime mudou (ex.: checkout/cópia): confere pelo conteúdo antes de reconstruir.
+    if meta["source"]["size"] == stamp["size"] and meta["source"]["sha256"] == _file_sha256(csv_path):
+        meta["source"].update(stamp)
+        _write_json(meta_path, meta)
+        return meta
+    return None
+
+
+def derive_time_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte data_ocorrencia e deriva ano/mes/dia_semana/hora (in-place)."""
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+    df['ano'] = df[DATE_COL].dt.year
+    df['mes'] = df[DATE_COL].dt.month
+    df['dia_semana'] = df[DATE_COL].dt.dayofweek
+    df['hora'] = df[DATE_COL].dt.hour
+    return df
+
+
+def encode_ids(ids, prefix: str = None):
+    """Separa ids ``<prefixo><número>`` (ex.: OCR100000) em ``(prefixo, números int64)``.
+
+    O prefixo é o do primeiro id quando não informado. Devolve ``(None, None)``
+    se algum id não seguir o padrão (outro prefixo, sem dígitos, zeros à
+    esquerda), pois aí o número não reconstruiria o texto original.
+    """
+    ids = np.ascontiguousarray(np.asarray(ids, dtype=str))
+    if not len(ids):
+        return prefix, np.empty(0, dtype=np.int64)
+    if prefix is None:
+        prefix = str(ids[0]).rstrip("0123456789")
+    largura = ids.dtype.itemsize // 4
+    if len(prefix) >= largura:
+        return None, None
+    # Cada caractere de um array 'U' é um code point de 4 bytes; o texto curto é completado com NUL.
+    chars = ids.view(np.uint32).reshape(len(ids), largura)
+    if len(prefix) and not (chars[:, :len(prefix)] == np.array([ord(c) for c in prefix], dtype=np.uint32)).all():
+        return None, None
+    numeros = np.zeros(len(ids), dtype=np.int64)
+    n_digitos = np.zeros(len(ids), dtype=np.int64)
+    for j in range(len(prefix), largura):
+        coluna = chars[:, j].astype(np.int64)
+        presente = coluna != 0
+        # NUL só completa o fim do texto: um dígito depois dele não é um id do padrão.
+        if (presente & (n_digitos < j - len(prefix))).any():
+            return None, None
+        digito = coluna - ord("0")
+        if ((digito < 0) | (digito > 9))[presente].any():
+            return None, None
+        numeros = np.where(presente, numeros * 10 + digito, numeros)
+        n_digitos += presente
+    primeiro = chars[:, len(prefix)].astype(np.int64) - ord("0")
+    if (n_digitos == 0).any() or n_digitos.max() > MAX_ID_DIGITS or ((primeiro == 0) & (n_digitos > 1)).any():
+        return None, None
+    return prefix, numeros
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica os tipos de ``COMPACT_DTYPES`` e codifica o id como inteiro.
+
+    O prefixo do id fica em ``df.attrs['id_prefix']``; se os ids não seguirem o
+    padrão eles continuam como texto (e ``id_prefix`` fica ``None``).
+    """
+    df = df.astype({col: dtype for col, dtype in COMPACT_DTYPES.items()
+                    if col in df.columns and df[col].dtype != dtype})
+    if ID_COL in df.columns and not pd.api.types.is_integer_dtype(df[ID_COL]):
+        prefix, numeros = encode_ids(df[ID_COL].astype(str).to_numpy())
+        if numeros is not None:
+            df[ID_COL] = numeros
+        df.attrs['id_prefix'] = prefix
+    return df
+
+
+def _parse_csv(csv_path: Path) -> pd.DataFrame:
+    return derive_time_columns(pd.read_csv(csv_path))
+
+
+def _publish_dir(tmp_dir: Path, cache_dir: Path):
+    """Troca ``cache_dir`` por ``tmp_dir`` com renomeações (nunca há diretório pela metade)."""
+    antigo = None
+    if cache_dir.exists():
+        antigo = cache_dir.with_name(f".{cache_dir.name}.{uuid.uuid4().hex}.old")
+        try:
+            os.replace(cache_dir, antigo)
+        except FileNotFoundError:
+            antigo = None
+    try:
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        # Outro processo publicou um cache completo primeiro; fica valendo o dele.
+        pass
+    if antigo is not None:
+        # Quem ainda mapeia os arquivos antigos continua lendo: o conteúdo só some ao fechar.
+        shutil.rmtree(antigo, ignore_errors=True)
+
+
+def build_cache(csv_path: Path = DATA_PATH) -> dict:
+    """Converte o CSV em um cache colunar (um .npy por coluna + meta.json).
+
+    Os arquivos são gravados num diretório temporário ao lado do cache e só
+    então colocados no lugar, então processos construindo ou lendo ao mesmo
+    tempo (workers, benchmark) nunca veem um ``.npy`` incompleto.
+    """
+    csv_path = Path(csv_path)
+    cache_dir = _cache_dir(csv_path)
+    df = _parse_csv(csv_path)
+
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{cache_dir.name}.", suffix=".tmp", dir=cache_dir.parent))
+    try:
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            if col == DATE_COL:
+                kind, values = "datetime", series.to_numpy(dtype="datetime64[ns]").view(np.int64)
+                extra = {}
+            elif col == ID_COL:
+                kind, values = "string", np.asarray(series.astype(str), dtype=str)
+                extra = {}
+            elif pd.api.types.is_numeric_dtype(series):
+                kind, values = "numeric", series.to_numpy()
+                extra = {}
+            else:
+                codes, categories = pd.factorize(series, sort=True)
+                kind, values = "category", codes.astype(np.int32)
+                extra = {"categories": categories.tolist()}
+            np.save(tmp_dir / f"{col}.npy", values)
+            columns.append({"name": col, "kind": kind, **extra})
+
+        meta = {
+            "version": CACHE_VERSION,
+            "source": {**_source_stamp(csv_path), "sha256": _file_sha256(csv_path)},
+            "n_rows": len(df),
+            "columns": columns,
+        }
+        # meta.json é gravado por último: sem ele o cache é considerado inválido.
+        _write_json(tmp_dir / "meta.json", meta)
+        _publish_dir(tmp_dir, cache_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return meta
+
+
+def dataset_fingerprint(csv_path: Path = DATA_PATH) -> str:
+    """sha256 do CSV de origem, reaproveitando o valor guardado no cache colunar."""
+    csv_path = Path(csv_path)
+    meta = _read_meta(csv_path, _cache_dir(csv_path)) or build_cache(csv_path)
+    return meta["source"]["sha256"]
+
+
+def _read_column(cache_dir: Path, spec: dict):
+    # Mapeamento copy-on-write: as páginas vêm do arquivo sob demanda e só são
+    # copiadas para a memória do processo se a coluna for alterada (o .npy nunca muda).
+    values = np.load(cache_dir / f"{spec['name']}.npy", mmap_mode='c')
+    if spec["kind"] == "category":
+        dtype = pd.CategoricalDtype(spec["categories"])
+        return pd.Categorical.from_codes(np.asarray(values), dtype=dtype)
+    if spec["kind"] == "datetime":
+        return values.view("datetime64[ns]")
+    if spec["kind"] == "string":
+        return np.asarray(values, dtype=object)
+    return values
+
+
+def load_occurrences(csv_path: Path = DATA_PATH, columns: list = None, derive_time: bool = True,
+                     use_cache: bool = True, compact: bool = False) -> pd.DataFrame:
+    """Carrega as ocorrências com datas já convertidas e colunas temporais derivadas.
+
+    Na primeira leitura o CSV é convertido em um cache colunar tipado ao lado
+    do arquivo (``data/.cache/<nome>/``); as leituras seguintes mapeiam os
+    arrays em memória em vez de reprocessar o CSV. O cache é invalidado quando
+    o CSV muda (mtime/tamanho, confirmado por hash do conteúdo).
+    Colunas categóricas voltam como ``category``. Com ``compact=True`` as
+    colunas usam os tipos enxutos de ``COMPACT_DTYPES`` e o id vira inteiro
+    (ver ``compact_frame``); combinado com ``columns``, só o necessário é lido.
+    """
+    csv_path = Path(csv_path)
+    if not use_cache:
+        df = _parse_csv(csv_path)
+        if not derive_time:
+            df = df.drop(columns=TIME_COLS)
+        df = df[columns] if columns is not None else df
+        return compact_frame(df) if compact else df
+
+    cache_dir = _cache_dir(csv_path)
+    meta = _read_meta(csv_path, cache_dir)
+    if meta is not None:
+        try:
+            return _frame_from_cache(cache_dir, meta, columns, derive_time, compact)
+        except (OSError, ValueError):
+            print(f"Cache colunar corrompido em {cache_dir}; reconstruindo a partir do CSV.")
+    meta = build_cache(csv_path)
+    return _frame_from_cache(cache_dir, meta, columns, derive_time, compact)
+
+
+def _frame_from_cache(cache_dir: Path, meta: dict, columns: list, derive_time: bool,
+                      compact: bool = False) -> pd.DataFrame:
+    specs = meta["columns"]
+    if not derive_time:
+        specs = [spec for spec in specs if spec["name"] not in TIME_COLS]
+    if columns is not None:
+        by_name = {spec["name"]: spec for spec in specs}
+        specs = [by_name[col] for col in columns]
+    # copy=False mantém as colunas como views dos arrays mapeados; o padrão do
+    # construtor copiaria tudo para a memória, dobrando o pico durante a carga.
+    if not compact:
+        return pd.DataFrame({spec["name"]: _read_column(cache_dir, spec) for spec in specs}, copy=False)
+    colunas = {}
+    prefix = None
+    for spec in specs:
+        if spec["name"] == ID_COL and spec["kind"] == "string":
+            # Codifica direto do array de texto do cache, sem criar um objeto str por linha.
+            prefix, numeros = encode_ids(np.load(cache_dir / f"{ID_COL}.npy", mmap_mode='r'))
+            if numeros is not None:
+                colunas[ID_COL] = numeros
+                continue
+        colunas[spec["name"]] = _read_column(cache_dir, spec)
+    df = compact_frame(pd.DataFrame(colunas, copy=False))
+    if ID_COL in df.columns and pd.api.types.is_integer_dtype(df[ID_COL]):
+        df.attrs['id_prefix'] = prefix
+    return df
@@ -1,18 +1,12 @@
 # md_data_processing/preprocessor.py
-import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from md_core.config import NUM_COLS, CAT_COLS, TARGET
+from md_data_processing.dataset import load_occurrences
 
 def load_data(path):
     """Carrega os dados e realiza a engenharia de features temporais."""
-    df = pd.read_csv(path)
-    df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'])
-    df['ano'] = df['data_ocorrencia'].dt.year
-    df['mes'] = df['data_ocorrencia'].dt.month
-    df['dia_semana'] = df['data_ocorrencia'].dt.dayofweek
-    df['hora'] = df['data_ocorrencia'].dt.hour
-    return df
+    return load_occurrences(path)
 
 def create_preprocessor():
     """Cria o objeto ColumnTransformer para o pipeline."""
@@ -0,0 +1,88 @@
+import asyncio
+
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes em lotes para uma única execução de process_batch.
+
+    Requisições que chegam dentro de uma janela de max_wait_ms (ou até
+    max_batch_size itens) são processadas juntas em uma thread do executor
+    (o padrão do loop, se nenhum for informado) e os resultados são devolvidos
+    a cada chamador na mesma ordem.
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 64, max_wait_ms: float = 5.0, executor=None):
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self):
+        # A fila fica presa ao event loop em que foi criada; se o loop mudar
+        # (ex.: reinício do servidor ou TestClient), o worker é recriado.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(self.executor, self.process_batch, items)
+            except Exception as exc:
+                if len(batch) == 1:
+                    self._fail(batch[0][1], exc)
+                else:
+                    # Um item inválido não deve derrubar o lote inteiro:
+                    # reprocessa individualmente para isolar o erro.
+                    for entry in batch:
+                        await self._run_single(entry)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run_single(self, entry):
+        item, future = entry
+        try:
+            result = await self._loop.run_in_executor(self.executor, self.process_batch, [item])
+        except Exception as exc:
+            self._fail(future, exc)
+            return
+        if not future.done():
+            future.set_result(result[0])
+
+    @staticmethod
+    def _fail(future, exc):
+        if not future.done():
+            future.set_exception(exc)
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
@@ -0,0 +1,32 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+
+class BoosterClassifier(ClassifierMixin, BaseEstimator):
+    """Adapta um ``lightgbm.Booster`` já treinado à interface de classificador do sklearn.
+
+    Usado quando o modelo é treinado pela API nativa do LightGBM (ex.: treino
+    em streaming) mas precisa entrar no ``Pipeline`` consumido pela API. Só
+    serve para inferência (não tem ``fit``): esse Pipeline é usado passo a
+    passo, pré-processador e depois classificador, como faz o ``Predictor``.
+    """
+
+    def __init__(self, booster=None, classes=None):
+        self.booster = booster
+        self.classes = classes
+
+    @property
+    def classes_(self):
+        return np.asarray(self.classes, dtype=object)
+
+    def __sklearn_is_fitted__(self):
+        return self.booster is not None
+
+    def predict_proba(self, X):
+        proba = self.booster.predict(X)
+        if proba.ndim == 1:
+            proba = np.column_stack((1 - proba, proba))
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
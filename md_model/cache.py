@@ -0,0 +1,25 @@
+import hashlib
+import json
+
+from md_core.lru import LRUCache
+
+
+class PredictionCache(LRUCache):
+    """Cache LRU com expiração de resultados de predição.
+
+    A chave é um hash da entrada canônica (campos em ordem fixa, JSON compacto)
+    mais a versão do modelo, então uma troca de modelo nunca devolve resultado
+    da versão anterior. ``maxsize=0`` desliga o cache.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl_s: float = 600.0):
+        super().__init__(maxsize, ttl_s)
+
+    @staticmethod
+    def key(input_data: dict, model_version):
+        canonical = json.dumps([model_version, input_data], sort_keys=True, ensure_ascii=False,
+                               separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def stats(self):
+        return {**super().stats(), "ttl_s": self.ttl_s}
@@ -0,0 +1,175 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+class UnsupportedTransformerError(ValueError):
+    """O pré-processador contém um passo que o encoder rápido não sabe reproduzir."""
+
+
+class FastFeatureEncoder:
+    """Codificador compilado a partir de um ColumnTransformer já treinado.
+
+    Converte um dicionário de entrada diretamente em um vetor NumPy, sem
+    construir DataFrame nem passar pelo ColumnTransformer. Suporta os passos
+    usados nos scripts de treino: StandardScaler, OneHotEncoder
+    (handle_unknown='ignore'), TfidfVectorizer e colunas em passthrough.
+    """
+
+    def __init__(self, blocks: list, n_features: int):
+        self.blocks = blocks
+        self.n_features = n_features
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor):
+        blocks = []
+        offset = 0
+        for name, transformer, columns in active_transformers(preprocessor):
+            if transformer == 'passthrough':
+                block = ('passthrough', offset, columns)
+                width = len(columns)
+            elif isinstance(transformer, StandardScaler):
+                block, width = _compile_scaler(transformer, offset, columns)
+            elif isinstance(transformer, OneHotEncoder):
+                block, width = _compile_one_hot(transformer, offset, columns)
+            elif isinstance(transformer, TfidfVectorizer):
+                block, width = _compile_tfidf(transformer, offset, columns)
+            else:
+                raise UnsupportedTransformerError(
+                    f"Transformador '{name}' ({type(transformer).__name__}) não suportado."
+                )
+            blocks.append(block)
+            offset += width
+        return cls(blocks, offset)
+
+    def transform_one(self, input_data: dict, out=None):
+        row = np.zeros(self.n_features, dtype=np.float64) if out is None else out
+        for block in self.blocks:
+            kind = block[0]
+            if kind == 'scaler':
+                _, offset, columns, mean, scale = block
+                values = np.fromiter((input_data[col] for col in columns), dtype=np.float64, count=len(columns))
+                row[offset:offset + len(columns)] = (values - mean) / scale
+            elif kind == 'onehot':
+                _, offset, columns, lookups = block
+                for col, lookup in zip(columns, lookups):
+                    index = lookup.get(input_data[col])
+                    if index is not None:
+                        row[offset + index] = 1.0
+            elif kind == 'tfidf':
+                _, offset, column, analyzer, vocabulary, idf, sublinear_tf, norm = block
+                counts = Counter(
+                    vocabulary[token] for token in analyzer(input_data[column]) if token in vocabulary
+                )
+                if not counts:
+                    continue
+                indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+                values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+                if sublinear_tf:
+                    values = np.log(values) + 1.0
+                if idf is not None:
+                    values = values * idf[indices]
+                if norm == 'l2':
+                    values = values / np.sqrt(np.dot(values, values))
+                elif norm == 'l1':
+                    values = values / np.abs(values).sum()
+                row[offset + indices] = values
+            else:
+                _, offset, columns = block
+                for i, col in enumerate(columns):
+                    row[offset + i] = input_data[col]
+        return row
+
+    def transform(self, inputs: list):
+        matrix = np.zeros((len(inputs), self.n_features), dtype=np.float64)
+        for i, input_data in enumerate(inputs):
+            self.transform_one(input_data, out=matrix[i])
+        return matrix
+
+    def matches(self, preprocessor, samples: list, atol: float = 1e-9):
+        """Verifica se o encoder reproduz o ColumnTransformer nas amostras."""
+        expected = preprocessor.transform(pd.DataFrame(samples))
+        if hasattr(expected, 'toarray'):
+            expected = expected.toarray()
+        return np.allclose(self.transform(samples), expected, rtol=0, atol=atol)
+
+    def sample_inputs(self):
+        """Gera entradas sintéticas que exercitam todos os blocos do encoder."""
+        base, unknown = {}, {}
+        for block in self.blocks:
+            kind = block[0]
+            if kind == 'scaler':
+                for col, mean in zip(block[2], block[3]):
+                    base[col] = float(mean)
+                    unknown[col] = float(mean) + 1.0
+            elif kind == 'onehot':
+                for col, lookup in zip(block[2], block[3]):
+                    base[col] = next(iter(lookup), '')
+                    unknown[col] = '__categoria_desconhecida__'
+            elif kind == 'tfidf':
+                terms = sorted(block[4], key=block[4].get)[:5]
+                base[block[2]] = ' '.join(terms)
+                unknown[block[2]] = ''
+            else:
+                for col in block[2]:
+                    base[col] = 0.0
+                    unknown[col] = 1.0
+        return [base, unknown]
+
+
+def active_transformers(preprocessor):
+    """Passos do ColumnTransformer que geram colunas, com as colunas já resolvidas por nome."""
+    feature_names = list(preprocessor.feature_names_in_)
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop' or _is_empty(columns):
+            continue
+        yield name, transformer, _resolve_columns(columns, feature_names)
+
+
+def _is_empty(columns):
+    try:
+        return len(columns) == 0
+    except TypeError:
+        return False
+
+
+def _resolve_columns(columns, feature_names):
+    if isinstance(columns, str):
+        return columns
+    if isinstance(columns, slice) or np.asarray(columns).dtype == bool:
+        return list(np.asarray(feature_names)[columns])
+    return [feature_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+
+
+def _compile_scaler(scaler, offset, columns):
+    width = len(columns)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(width)
+    scale = scaler.scale_ if scaler.with_std else np.ones(width)
+    block = ('scaler', offset, list(columns), np.asarray(mean, dtype=np.float64),
+             np.asarray(scale, dtype=np.float64))
+    return block, width
+
+
+def _compile_one_hot(encoder, offset, columns):
+    if encoder.drop_idx_ is not None or getattr(encoder, 'infrequent_categories_', None) is not None:
+        raise UnsupportedTransformerError("OneHotEncoder com drop/infrequent não é suportado.")
+    if encoder.handle_unknown != 'ignore':
+        raise UnsupportedTransformerError("OneHotEncoder precisa de handle_unknown='ignore'.")
+    lookups = []
+    position = 0
+    for categories in encoder.categories_:
+        lookups.append({category: position + i for i, category in enumerate(categories.tolist())})
+        position += len(categories)
+    return ('onehot', offset, list(columns), lookups), position
+
+
+def _compile_tfidf(vectorizer, offset, column):
+    if vectorizer.binary:
+        raise UnsupportedTransformerError("TfidfVectorizer com binary=True não é suportado.")
+    idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None
+    block = ('tfidf', offset, column, vectorizer.build_analyzer(), dict(vectorizer.vocabulary_),
+             idf, vectorizer.sublinear_tf, vectorizer.norm)
+    return block, len(vectorizer.vocabulary_)
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from md_model.predictor import CrimePredictor
+
+
+class ModelManager:
+    """Mantém o preditor ativo (e o candidato em modo sombra) em sincronia com o registro.
+
+    Versões novas são carregadas e aquecidas fora do caminho das requisições;
+    a troca é uma única atribuição de referência, então requisições em
+    andamento terminam com o preditor que já tinham em mãos.
+    """
+
+    def __init__(self, registry, name: str, fallback_paths=(), shadow_sample_rate: float = 0.0,
+                 shadow_max_pending: int = 8):
+        self.registry = registry
+        self.name = name
+        self.fallback_paths = [Path(path) for path in fallback_paths]
+        self.shadow_sample_rate = shadow_sample_rate
+        # Preditor ativo e a versão dele, publicados juntos numa única atribuição.
+        self.active = (None, None)
+        self.candidate_version = None
+        self.candidate = None
+        self.shadow_stats = {"amostras": 0, "concordancia": 0, "erros": 0, "descartadas": 0}
+        self.last_error = None
+        self._manifest_mtime = None
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        # Limita a fila do executor: um candidato mais lento que o tráfego perde amostras
+        # em vez de acumular lotes sem fim na memória.
+        self._shadow_slots = threading.BoundedSemaphore(max(1, shadow_max_pending))
+
+    @property
+    def predictor(self):
+        return self.active[0]
+
+    @property
+    def active_version(self):
+        return self.active[1]
+
+    def _resolve_active(self):
+        version = self.registry.active_version(self.name)
+        if version is not None:
+            return version, self.registry.model_path(self.name, version)
+        # Sem versão promovida no registro: usa os artefatos legados em artifacts/.
+        for path in self.fallback_paths:
+            if path.exists():
+                return f"legado:{path.name}", path
+        raise FileNotFoundError(f"Nenhum artefato encontrado para o modelo '{self.name}'.")
+
+    @staticmethod
+    def _load(path):
+        predictor = CrimePredictor(model_pipeline_path=path)
+        # Aquece o caminho de predição antes de receber tráfego.
+        if predictor.encoder is not None:
+            predictor.predict_batch(predictor.encoder.sample_inputs())
+        return predictor
+
+    def reload(self):
+        """Carrega as versões ativa/candidata do registro se mudaram; retorna o status."""
+        with self._reload_lock:
+            self._manifest_mtime = self.registry.mtime()
+            version, path = self._resolve_active()
+            if version != self.active_version:
+                predictor = self._load(path)
+                self.active = (predictor, version)
+                print(f"Modelo '{self.name}' ativo: versão {version}")
+
+            candidate_version = self.registry.candidate_version(self.name)
+            if candidate_version != self.candidate_version:
+                candidate = None
+                if candidate_version is not None:
+                    candidate = self._load(self.registry.model_path(self.name, candidate_version))
+                self.candidate, self.candidate_version = candidate, candidate_version
+                with self._stats_lock:
+                    self.shadow_stats = {"amostras": 0, "concordancia": 0, "erros": 0, "descartadas": 0}
+            self.last_error = None
+        return self.status()
+
+    def _safe_reload(self):
+        try:
+            self.reload()
+        except Exception as exc:
+            # Falha ao carregar mantém a versão atual servindo.
+            self.last_error = repr(exc)
+            print(f"Falha ao recarregar o modelo '{self.name}': {exc!r}")
+
+    def reload_async(self):
+        threading.Thread(target=self._safe_reload, daemon=True, name="model-reload").start()
+
+    def start_polling(self, interval_s: float):
+        """Verifica o manifesto a cada ``interval_s`` segundos e recarrega quando ele muda."""
+        def poll():
+            while True:
+                time.sleep(interval_s)
+                if self.registry.mtime() != self._manifest_mtime:
+                    self._safe_reload()
+
+        threading.Thread(target=poll, daemon=True, name="model-poll").start()
+
+    # --- Modo sombra ---
+
+    def shadow(self, inputs: list, resultados: list):
+        """Envia uma amostra do tráfego ao candidato, fora do caminho da resposta."""
+        candidate = self.candidate
+        if candidate is None or self.shadow_sample_rate <= 0:
+            return
+        amostra = [(entrada, resultado) for entrada, resultado in zip(inputs, resultados)
+                   if random.random() < self.shadow_sample_rate]
+        if not amostra:
+            return
+        if not self._shadow_slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.shadow_stats["descartadas"] += len(amostra)
+            return
+        self._shadow_pool.submit(self._score_shadow, candidate, amostra)
+
+    def _score_shadow(self, candidate, amostra):
+        try:
+            previstos = candidate.predict_batch([entrada for entrada, _ in amostra])
+        except Exception:
+            with self._stats_lock:
+                self.shadow_stats["erros"] += len(amostra)
+            return
+        finally:
+            self._shadow_slots.release()
+        concordancia = sum(previsto["tipo_crime_predito"] == resultado["tipo_crime_predito"]
+                           for previsto, (_, resultado) in zip(previstos, amostra))
+        with self._stats_lock:
+            self.shadow_stats["amostras"] += len(amostra)
+            self.shadow_stats["concordancia"] += concordancia
+
+    def status(self):
+        with self._stats_lock:
+            stats = dict(self.shadow_stats)
+        stats["taxa_concordancia"] = stats["concordancia"] / stats["amostras"] if stats["amostras"] else None
+        return {
+            "modelo": self.name,
+            "versao_ativa": self.active_version,
+            "versao_candidata": self.candidate_version,
+            "sombra": {"taxa_amostragem": self.shadow_sample_rate, **stats},
+            "ultimo_erro": self.last_error,
+        }
@@ -1,21 +1,71 @@
+from pathlib import Path
+
 import joblib
 import pandas as pd
 
+from md_core.metrics import span
+from md_model.encoder import FastFeatureEncoder, UnsupportedTransformerError
+from md_model.serving import load_serving_artifact
+
 
 class CrimePredictor:
+    # Acima deste tamanho de lote o ColumnTransformer vetorizado volta a compensar.
+    fast_path_max_batch = 256
+
     def __init__(self, model_pipeline_path: str):
+        if Path(model_pipeline_path).is_dir():
+            # Artefato de serviço (md_model/serving.py): booster nativo + tabelas em mmap,
+            # sem o Pipeline sklearn; a paridade foi conferida na exportação.
+            self.pipeline = None
+            self.preprocessor = None
+            self.encoder, self.classifier = load_serving_artifact(model_pipeline_path)
+            return
         self.pipeline = joblib.load(model_pipeline_path)
+        self.preprocessor = self.pipeline.named_steps['preprocessor']
+        self.classifier = self.pipeline.named_steps['classifier']
+        self.encoder = self._build_encoder()
+
+    def _build_encoder(self):
+        """Compila o encoder rápido e confere a paridade com o pipeline sklearn."""
+        try:
+            encoder = FastFeatureEncoder.from_column_transformer(self.preprocessor)
+        except UnsupportedTransformerError as exc:
+            print(f"Encoder rápido desativado: {exc}")
+            return None
+        if not encoder.matches(self.preprocessor, encoder.sample_inputs()):
+            print("Encoder rápido desativado: divergência em relação ao ColumnTransformer.")
+            return None
+        return encoder
+
+    def _transform(self, inputs: list):
+        if self.preprocessor is None or (self.encoder is not None and len(inputs) <= self.fast_path_max_batch):
+            with span("predictor.preprocess"):
+                return self.encoder.transform(inputs)
+        with span("predictor.dataframe"):
+            frame = pd.DataFrame(inputs)
+        with span("predictor.preprocess"):
+            return self.preprocessor.transform(frame)
 
     def predict(self, input_data: dict):
-        input_df = pd.DataFrame([input_data])
+        return self.predict_batch([input_data])[0]
 
-        prediction = self.pipeline.predict(input_df)
-        prediction_proba = self.pipeline.predict_proba(input_df)
+    def predict_batch(self, inputs: list):
+        """Prediz um lote de ocorrências com uma única passada pelo pipeline."""
+        if not inputs:
+            return []
 
-        classes = self.pipeline.named_steps['classifier'].classes_
-        probabilities = dict(zip(classes, prediction_proba[0]))
+        # O pré-processamento roda uma única vez; a classe predita é derivada
+        # das probabilidades em vez de chamar pipeline.predict separadamente.
+        features = self._transform(inputs)
+        with span("predictor.predict_proba"):
+            prediction_proba = self.classifier.predict_proba(features)
 
-        return {
-            "tipo_crime_predito": prediction[0],
-            "probabilidades": probabilities
-        }
\ No newline at end of file
+        with span("predictor.postprocess"):
+            classes = self.classifier.classes_
+            resultados = []
+            for proba in prediction_proba:
+                resultados.append({
+                    "tipo_crime_predito": classes[proba.argmax()],
+                    "probabilidades": dict(zip(classes, proba))
+                })
+        return resultados
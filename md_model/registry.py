@@ -0,0 +1,192 @@
+"""Registro de modelos versionados.
+
+Cada modelo treinado é copiado para um diretório imutável
+``artifacts/registry/<nome>/<versão>/`` (pipeline ``.joblib`` e, quando existir,
+o artefato de serviço ``.serving``) e descrito em ``artifacts/registry.json``
+com data, hash e métricas de avaliação. O manifesto também guarda, por modelo,
+a versão ativa (servida pela API) e uma candidata opcional (modo sombra).
+
+Uso pela linha de comando::
+
+    python -m md_model.registry list
+    python -m md_model.registry promote lightgbm <versão>
+    python -m md_model.registry candidate lightgbm <versão>|none
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: trava pelo msvcrt
+    fcntl = None
+    import msvcrt
+
+MANIFEST_NAME = "registry.json"
+REGISTRY_DIRNAME = "registry"
+
+
+def _lock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return
+    # msvcrt trava bytes a partir da posição atual; LK_LOCK desiste após ~10 s, então repete.
+    fh.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_UN)
+        return
+    fh.seek(0)
+    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _sha256(path: Path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.models_dir = self.root / REGISTRY_DIRNAME
+
+    # --- Manifesto ---
+
+    def load(self):
+        if not self.manifest_path.exists():
+            return {"models": {}}
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def _save(self, manifest: dict):
+        tmp_path = self.manifest_path.with_name(f"{MANIFEST_NAME}.tmp-{os.getpid()}")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextmanager
+    def _locked(self):
+        """Seção crítica entre processos (ex.: vários scripts de treino registrando ao mesmo tempo)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / f".{MANIFEST_NAME}.lock", "w") as lock:
+            _lock_file(lock)
+            try:
+                manifest = self.load()
+                yield manifest
+                self._save(manifest)
+            finally:
+                _unlock_file(lock)
+
+    def mtime(self):
+        """Marca de modificação do manifesto (usada pela API para detectar novas versões)."""
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # --- Versões ---
+
+    def register(self, name: str, pipeline_path, metrics: dict = None, serving_path=None, promote: bool = False,
+                 extra: dict = None):
+        """Copia os artefatos para uma versão nova e a registra; retorna o identificador da versão."""
+        pipeline_path = Path(pipeline_path)
+        sha256 = _sha256(pipeline_path)
+        version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{sha256[:8]}"
+        destino = self.models_dir / name / version
+        staging = destino.with_name(f"{version}.tmp-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        shutil.copy2(pipeline_path, staging / "model.joblib")
+        if serving_path is not None and Path(serving_path).is_dir():
+            shutil.copytree(serving_path, staging / "model.serving")
+        os.replace(staging, destino)
+
+        entry = {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": str(pipeline_path),
+            "sha256": sha256,
+            "metrics": metrics or {},
+            **(extra or {}),
+        }
+        with self._locked() as manifest:
+            model = manifest["models"].setdefault(name, {"active": None, "candidate": None, "versions": []})
+            model["versions"].append(entry)
+            if promote:
+                model["active"] = version
+        return version
+
+    def versions(self, name: str):
+        return self.load()["models"].get(name, {}).get("versions", [])
+
+    def _set(self, name: str, field: str, version):
+        with self._locked() as manifest:
+            model = manifest["models"].get(name)
+            if model is None:
+                raise KeyError(f"Modelo não registrado: {name}")
+            if version is not None and version not in {entry["version"] for entry in model["versions"]}:
+                raise KeyError(f"Versão não registrada: {name}/{version}")
+            model[field] = version
+
+    def promote(self, name: str, version: str):
+        self._set(name, "active", version)
+
+    def set_candidate(self, name: str, version):
+        self._set(name, "candidate", version)
+
+    def active_version(self, name: str):
+        return self.load()["models"].get(name, {}).get("active")
+
+    def candidate_version(self, name: str):
+        return self.load()["models"].get(name, {}).get("candidate")
+
+    def model_path(self, name: str, version: str):
+        """Artefato a carregar para a versão: o de serviço quando existir, senão o pipeline."""
+        base = self.models_dir / name / version
+        serving = base / "model.serving"
+        return serving if serving.is_dir() else base / "model.joblib"
+
+
+def main(argv=None):
+    from md_core.config import ARTIFACTS_PATH
+
+    parser = argparse.ArgumentParser(description="Registro de modelos versionados.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    promote = sub.add_parser("promote")
+    promote.add_argument("name")
+    promote.add_argument("version")
+    candidate = sub.add_parser("candidate")
+    candidate.add_argument("name")
+    candidate.add_argument("version", help="Versão candidata, ou 'none' para desligar o modo sombra")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(ARTIFACTS_PATH)
+    if args.command == "list":
+        for name, model in registry.load()["models"].items():
+            for entry in model["versions"]:
+                marca = "*" if entry["version"] == model["active"] else ("~" if entry["version"] == model["candidate"] else " ")
+                print(f"{marca} {name} {entry['version']} {json.dumps(entry['metrics'], ensure_ascii=False)}")
+    elif args.command == "promote":
+        registry.promote(args.name, args.version)
+    else:
+        registry.set_candidate(args.name, None if args.version == "none" else args.version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Artefato compacto de serviço para a API.
+
+Em vez do ``Pipeline`` sklearn inteiro em joblib, o artefato é um diretório::
+
+    <modelo>.serving/
+        meta.json       classes, layout dos blocos e parâmetros do analisador de texto
+        model.txt       Booster do LightGBM no formato texto nativo
+        <i>_*.npy       tabelas numéricas do encoder (médias, escalas, vocabulário, idf)
+
+As tabelas são abertas com ``mmap_mode='r'``: workers no mesmo host
+compartilham as páginas do cache do sistema operacional em vez de manter cada
+um a sua cópia dos objetos Python desserializados.
+"""
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from md_model.booster import BoosterClassifier
+from md_model.encoder import FastFeatureEncoder, UnsupportedTransformerError, active_transformers
+
+FORMAT_VERSION = 1
+SERVING_SUFFIX = ".serving"
+# Parâmetros do TfidfVectorizer que definem o analisador (nenhum depende do ajuste).
+ANALYZER_PARAMS = ("analyzer", "lowercase", "strip_accents", "token_pattern", "ngram_range", "encoding",
+                   "decode_error")
+
+
+def serving_path(model_path) -> Path:
+    """Diretório do artefato de serviço correspondente a um ``.joblib``."""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + SERVING_SUFFIX)
+
+
+class ArrayVocabulary:
+    """Vocabulário do TF-IDF sobre arrays ordenados (mmap), com a interface de dicionário usada pelo encoder."""
+
+    def __init__(self, terms: np.ndarray, columns: np.ndarray):
+        self.terms = terms
+        self.columns = columns
+
+    def get(self, term, default=None):
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return int(self.columns[i])
+        return default
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def __getitem__(self, term):
+        column = self.get(term)
+        if column is None:
+            raise KeyError(term)
+        return column
+
+    def __iter__(self):
+        return iter(self.terms.tolist())
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def _booster_of(classifier):
+    if isinstance(classifier, BoosterClassifier):
+        return classifier.booster
+    booster = getattr(classifier, "booster_", None)
+    if booster is None:
+        raise ValueError(f"Artefato de serviço só suporta LightGBM (recebido {type(classifier).__name__}).")
+    return booster
+
+
+def _export_tfidf(vectorizer: TfidfVectorizer, directory: Path, i: int):
+    if vectorizer.preprocessor is not None or vectorizer.tokenizer is not None or callable(vectorizer.analyzer):
+        raise UnsupportedTransformerError("TfidfVectorizer com funções customizadas não é exportável.")
+    vocabulary = vectorizer.vocabulary_
+    terms = np.array(sorted(vocabulary))
+    np.save(directory / f"{i}_terms.npy", terms)
+    np.save(directory / f"{i}_columns.npy", np.array([vocabulary[t] for t in terms.tolist()], dtype=np.int32))
+    if vectorizer.use_idf:
+        np.save(directory / f"{i}_idf.npy", np.asarray(vectorizer.idf_, dtype=np.float64))
+    stop_words = vectorizer.get_stop_words()
+    return {
+        "analyzer": {**{key: getattr(vectorizer, key) for key in ANALYZER_PARAMS},
+                     "stop_words": sorted(stop_words) if stop_words is not None else None},
+        "use_idf": vectorizer.use_idf,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "norm": vectorizer.norm,
+    }
+
+
+def _write_artifact(pipeline, directory: Path):
+    preprocessor = pipeline.named_steps['preprocessor']
+    classifier = pipeline.named_steps['classifier']
+    booster = _booster_of(classifier)
+    # O encoder rápido valida os passos suportados e fornece offsets e larguras.
+    encoder = FastFeatureEncoder.from_column_transformer(preprocessor)
+
+    blocks = []
+    for i, ((_, transformer, columns), block) in enumerate(zip(active_transformers(preprocessor), encoder.blocks)):
+        kind, offset = block[0], block[1]
+        spec = {"kind": kind, "offset": offset, "columns": columns}
+        if kind == 'scaler':
+            np.save(directory / f"{i}_mean.npy", block[3])
+            np.save(directory / f"{i}_scale.npy", block[4])
+        elif kind == 'onehot':
+            spec["categories"] = [np.asarray(categories).tolist() for categories in transformer.categories_]
+        elif kind == 'tfidf':
+            spec.update(_export_tfidf(transformer, directory, i))
+        blocks.append(spec)
+
+    booster.save_model(str(directory / "model.txt"))
+    meta = {
+        "format": FORMAT_VERSION,
+        "classes": np.asarray(classifier.classes_).tolist(),
+        "n_features": encoder.n_features,
+        "blocks": blocks,
+    }
+    # meta.json por último: sem ele o diretório não é considerado um artefato válido.
+    (directory / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, default=_json_default),
+                                         encoding="utf-8")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def export_serving_artifact(pipeline, directory, atol: float = 1e-9) -> Path:
+    """Exporta o pipeline treinado e confere que o artefato reproduz suas probabilidades."""
+    directory = Path(directory)
+    staging = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    try:
+        _write_artifact(pipeline, staging)
+        encoder, classifier = load_serving_artifact(staging)
+        samples = encoder.sample_inputs()
+        # Passo a passo, como o Predictor: pipeline.predict_proba exigiria um
+        # classificador com fit, e o BoosterClassifier só encapsula um modelo pronto.
+        steps = pipeline.named_steps
+        expected = steps['classifier'].predict_proba(steps['preprocessor'].transform(pd.DataFrame(samples)))
+        if not np.allclose(classifier.predict_proba(encoder.transform(samples)), expected, rtol=0, atol=atol):
+            raise ValueError("Artefato de serviço diverge do pipeline sklearn.")
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Troca o diretório publicado de uma vez (rename), sem expor um artefato pela metade.
+    previous = directory.with_name(f"{directory.name}.old-{os.getpid()}")
+    if directory.exists():
+        directory.rename(previous)
+    staging.rename(directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return directory
+
+
+def _load_block(spec: dict, directory: Path, i: int):
+    kind, offset = spec["kind"], spec["offset"]
+    if kind == 'scaler':
+        return ('scaler', offset, spec["columns"], np.load(directory / f"{i}_mean.npy", mmap_mode='r'),
+                np.load(directory / f"{i}_scale.npy", mmap_mode='r'))
+    if kind == 'onehot':
+        lookups, position = [], 0
+        for categories in spec["categories"]:
+            lookups.append({category: position + j for j, category in enumerate(categories)})
+            position += len(categories)
+        return ('onehot', offset, spec["columns"], lookups)
+    if kind == 'tfidf':
+        params = dict(spec["analyzer"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        analyzer = TfidfVectorizer(**params).build_analyzer()
+        vocabulary = ArrayVocabulary(np.load(directory / f"{i}_terms.npy", mmap_mode='r'),
+                                     np.load(directory / f"{i}_columns.npy", mmap_mode='r'))
+        idf = np.load(directory / f"{i}_idf.npy", mmap_mode='r') if spec["use_idf"] else None
+        return ('tfidf', offset, spec["columns"], analyzer, vocabulary, idf, spec["sublinear_tf"], spec["norm"])
+    return ('passthrough', offset, spec["columns"])
+
+
+def load_serving_artifact(directory):
+    """Carrega ``(encoder, classificador)`` de um artefato de serviço."""
+    import lightgbm as lgb
+
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Formato de artefato não suportado: {meta.get('format')}")
+    blocks = [_load_block(spec, directory, i) for i, spec in enumerate(meta["blocks"])]
+    encoder = FastFeatureEncoder(blocks, meta["n_features"])
+    classifier = BoosterClassifier(lgb.Booster(model_file=str(directory / "model.txt")), meta["classes"])
+    return encoder, classifier
+
+
+def main(argv=None):
+    """Exporta artefatos de serviço a partir de pipelines ``.joblib`` já treinados."""
+    import joblib
+
+    for model_path in (argv if argv is not None else sys.argv[1:]):
+        destino = export_serving_artifact(joblib.load(model_path), serving_path(model_path))
+        print(f"Artefato de serviço salvo em: {destino}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# md_training/common.py
+"""Peças compartilhadas pelos scripts de treino e pelo orquestrador."""
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from md_data_processing.dataset import load_occurrences
+
+# --- DEFINIÇÃO DOS CAMINHOS ---
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE_DIR = SCRIPT_DIR.parent
+DATA_FILE = BASE_DIR / "data" / "dataset_ocorrencias_delegacia_5.csv"
+ARTIFACTS_DIR = BASE_DIR / "artifacts"
+REPORTS_DIR = BASE_DIR / "reports"
+
+TARGET = "tipo_crime"
+TEXT_COL = 'descricao_modus_operandi'
+FEATURES_TO_DROP = [TARGET, "id_ocorrencia", "data_ocorrencia"]
+TRAIN_FRACTION = 0.8
+TFIDF_PARAMS = {"max_features": 1000, "ngram_range": (1, 2)}
+BALANCE_MODES = ("smote", "class_weight")
+
+os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+os.makedirs(REPORTS_DIR, exist_ok=True)
+
+
+def portuguese_stopwords():
+    """Stopwords do NLTK em português, baixando o pacote na primeira vez."""
+    import nltk
+    from nltk.corpus import stopwords
+    try:
+        return stopwords.words('portuguese')
+    except LookupError:
+        print("Baixando o pacote 'stopwords' do NLTK...")
+        nltk.download('stopwords')
+        return stopwords.words('portuguese')
+
+
+def load_temporal_split(data_file=DATA_FILE, train_fraction: float = TRAIN_FRACTION):
+    """Carrega as ocorrências e faz a divisão temporal (treino = primeiros 80%)."""
+    # Cache colunar compartilhado (sem as colunas temporais derivadas, fora do modelo)
+    df = load_occurrences(data_file, derive_time=False)
+    df_sorted = df.sort_values("data_ocorrencia")
+    train_size = int(train_fraction * len(df_sorted))
+    train_df = df_sorted.iloc[:train_size]
+    test_df = df_sorted.iloc[train_size:]
+
+    X_train, y_train = train_df.drop(columns=FEATURES_TO_DROP), train_df[TARGET]
+    X_test, y_test = test_df.drop(columns=FEATURES_TO_DROP), test_df[TARGET]
+    return X_train, y_train, X_test, y_test
+
+
+def feature_columns(X):
+    """Separa as colunas numéricas e categóricas (a coluna de texto vai para o TF-IDF)."""
+    num_cols = X.select_dtypes(include=np.number).columns.tolist()
+    cat_cols = [col for col in X.select_dtypes(include=['object', 'category']).columns.tolist() if col != TEXT_COL]
+    return num_cols, cat_cols
+
+
+def create_preprocessor(num_cols, cat_cols, stop_words, sparse: bool = False):
+    """ColumnTransformer usado por todos os modelos.
+
+    Com ``sparse=True`` todos os blocos saem em CSR e o ColumnTransformer nunca
+    densifica a matriz final (``sparse_threshold=1.0``).
+    """
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), num_cols),
+            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=sparse), cat_cols),
+            ("text_tfidf", TfidfVectorizer(stop_words=stop_words, **TFIDF_PARAMS), TEXT_COL)
+        ],
+        remainder='passthrough',
+        sparse_threshold=1.0 if sparse else 0.3
+    )
+
+
+def parse_training_mode(argv=None):
+    """Lê as opções de modo de treino (--sparse, --balance, --streaming) da linha de comando.
+
+    ``--balance smote`` (padrão) reamostra o treino com SMOTE, que aceita CSR;
+    ``--balance class_weight`` troca a reamostragem por pesos de classe e evita
+    multiplicar as linhas da matriz. ``--streaming`` lê o CSV em blocos de
+    ``--chunksize`` linhas (apenas LightGBM, sempre com pesos de classe).
+    ``--promote`` torna o modelo registrado a versão ativa servida pela API.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--sparse", action="store_true", help="Mantém as matrizes de features em CSR")
+    parser.add_argument("--balance", choices=BALANCE_MODES, default="smote")
+    parser.add_argument("--streaming", action="store_true", help="Treino fora da memória, em blocos do CSV")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--promote", action="store_true", help="Promove a versão registrada para a API")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def evaluation_metrics(y_test, y_pred):
+    """Métricas guardadas junto da versão no registro de modelos."""
+    from sklearn.metrics import accuracy_score, f1_score
+    return {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "f1_macro": float(f1_score(y_test, y_pred, average="macro", zero_division=0)),
+        "n_test": int(len(y_test)),
+    }
+
+
+def register_model(name: str, model_path, metrics: dict, promote: bool = False):
+    """Registra o artefato salvo como nova versão em artifacts/registry.json."""
+    from md_model.registry import ModelRegistry
+    from md_model.serving import serving_path
+    version = ModelRegistry(ARTIFACTS_DIR).register(name, model_path, metrics, serving_path(model_path), promote)
+    print(f"Versão registrada: {name}/{version}{' (ativa)' if promote else ''}")
+    return version
+
+
+def save_confusion_matrix(y_test, y_pred, title: str, file_name: str):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    fig, ax = plt.subplots(figsize=(15, 15))
+    ConfusionMatrixDisplay.from_predictions(y_test, y_pred, ax=ax, xticks_rotation='vertical', colorbar=True)
+    plt.title(title)
+    plt.tight_layout()
+    confusion_matrix_path = REPORTS_DIR / file_name
+    plt.savefig(confusion_matrix_path)
+    plt.close(fig)
+    return confusion_matrix_path
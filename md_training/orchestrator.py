@@ -0,0 +1,263 @@
+# md_training/orchestrator.py
+"""Orquestrador de treino.
+
+Carrega os dados, faz a divisão temporal, ajusta o pré-processador e roda o
+SMOTE uma única vez; as matrizes resultantes ficam em cache no disco
+(``artifacts/.train_cache/<hash da configuração>``) e os modelos são treinados
+em paralelo, cada um em um processo com seu próprio orçamento de núcleos.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from md_data_processing.dataset import dataset_fingerprint
+from md_training.common import (ARTIFACTS_DIR, BALANCE_MODES, DATA_FILE, TFIDF_PARAMS, TRAIN_FRACTION,
+                                load_temporal_split, feature_columns, create_preprocessor,
+                                portuguese_stopwords, save_confusion_matrix, evaluation_metrics, register_model)
+
+CACHE_ROOT = ARTIFACTS_DIR / ".train_cache"
+CACHE_VERSION = 1
+SMOTE_RANDOM_STATE = 42
+
+MODELS = {
+    "baseline": {"balance": False, "artifact": None, "weight": 0, "serving": False,
+                 "title": "Baseline (Dummy)", "report": "confusion_matrix_Baseline.png"},
+    "randomforest": {"balance": True, "artifact": "randomforest_model.joblib", "weight": 1, "serving": False,
+                     "title": "RandomForest", "report": "confusion_matrix_RandomForest.png"},
+    "lightgbm": {"balance": True, "artifact": "lightgbm_model.joblib", "weight": 1, "serving": True,
+                 "title": "LightGBM", "report": "confusion_matrix_LightGBM.png"},
+}
+
+
+def build_classifier(name: str, n_jobs: int, class_weight=None, params: dict = None):
+    """Classificador do modelo; ``params`` sobrescreve os hiperparâmetros padrão (ex.: da busca)."""
+    params = dict(params or {})
+    if name == "baseline":
+        from sklearn.dummy import DummyClassifier
+        return DummyClassifier(strategy='most_frequent', random_state=42)
+    if name == "randomforest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=42, n_jobs=n_jobs, class_weight=class_weight, **params)
+    if name == "lightgbm":
+        from lightgbm import LGBMClassifier
+        if "subsample" in params:
+            # Sem subsample_freq o LightGBM ignora o subsample.
+            params.setdefault("subsample_freq", 1)
+        return LGBMClassifier(random_state=42, n_jobs=n_jobs, class_weight=class_weight, **params)
+    raise ValueError(f"Modelo desconhecido: {name}")
+
+
+# --- Cache de matrizes pré-processadas ---
+
+def save_matrix(path_stem: Path, X):
+    if sparse.issparse(X):
+        sparse.save_npz(path_stem.with_suffix(".npz"), X.tocsr())
+    else:
+        np.save(path_stem.with_suffix(".npy"), np.asarray(X))
+
+
+def load_matrix(path_stem: Path):
+    if path_stem.with_suffix(".npz").exists():
+        return sparse.load_npz(path_stem.with_suffix(".npz"))
+    return np.load(path_stem.with_suffix(".npy"), mmap_mode='r')
+
+
+def save_labels(path: Path, y):
+    np.save(path, np.asarray(y.astype(str), dtype=str))
+
+
+def load_labels(path: Path):
+    return np.load(path).astype(object)
+
+
+def config_hash(data_file=DATA_FILE, stop_words=None, extra: dict = None):
+    """Hash da configuração que determina as matrizes em cache."""
+    import sklearn
+    config = {
+        "version": CACHE_VERSION,
+        "data_sha256": dataset_fingerprint(data_file),
+        "train_fraction": TRAIN_FRACTION,
+        "tfidf": {k: list(v) if isinstance(v, tuple) else v for k, v in TFIDF_PARAMS.items()},
+        "stop_words": sorted(stop_words or []),
+        "smote_random_state": SMOTE_RANDOM_STATE,
+        "sklearn": sklearn.__version__,
+        **(extra or {}),
+    }
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def prepare_data(data_file=DATA_FILE, with_smote: bool = True, force: bool = False, sparse: bool = False):
+    """Prepara (ou reaproveita do cache) as matrizes de treino/teste.
+
+    Retorna o diretório do cache, que contém o pré-processador ajustado, as
+    matrizes transformadas, os rótulos e, opcionalmente, o treino reamostrado
+    pelo SMOTE. Com ``sparse=True`` as matrizes ficam em CSR do início ao fim.
+    """
+    stop_words = portuguese_stopwords()
+    cache_dir = CACHE_ROOT / config_hash(data_file, stop_words, {"sparse": sparse})
+    meta_path = cache_dir / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() and not force else None
+    if meta is not None and (meta["smote"] or not with_smote):
+        print(f"Matrizes pré-processadas reaproveitadas de {cache_dir}")
+        return cache_dir
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if meta_path.exists():
+        meta_path.unlink()
+
+    inicio = time.perf_counter()
+    X_train, y_train, X_test, y_test = load_temporal_split(data_file)
+    num_cols, cat_cols = feature_columns(X_train)
+    preprocessor = create_preprocessor(num_cols, cat_cols, stop_words, sparse=sparse)
+    X_train_t = preprocessor.fit_transform(X_train, y_train)
+    X_test_t = preprocessor.transform(X_test)
+
+    joblib.dump(preprocessor, cache_dir / "preprocessor.joblib")
+    save_matrix(cache_dir / "X_train", X_train_t)
+    save_matrix(cache_dir / "X_test", X_test_t)
+    save_labels(cache_dir / "y_train.npy", y_train)
+    save_labels(cache_dir / "y_test.npy", y_test)
+
+    if with_smote:
+        from imblearn.over_sampling import SMOTE
+        X_res, y_res = SMOTE(random_state=SMOTE_RANDOM_STATE).fit_resample(X_train_t, load_labels(cache_dir / "y_train.npy"))
+        save_matrix(cache_dir / "X_train_smote", X_res)
+        save_labels(cache_dir / "y_train_smote.npy", y_res)
+
+    meta = {"smote": with_smote, "n_train": int(X_train_t.shape[0]), "n_test": int(X_test_t.shape[0]),
+            "n_features": int(X_train_t.shape[1])}
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    print(f"Dados preparados em {time.perf_counter() - inicio:.1f}s ({cache_dir})")
+    return cache_dir
+
+
+def train_model(name: str, cache_dir: Path, n_jobs: int, balance: str = "smote", params: dict = None):
+    """Treina e avalia um modelo a partir das matrizes em cache (executado no pool)."""
+    from sklearn.metrics import classification_report
+    from sklearn.pipeline import Pipeline
+
+    spec = MODELS[name]
+    inicio = time.perf_counter()
+    suffix = "_smote" if spec["balance"] and balance == "smote" else ""
+    X_train = load_matrix(cache_dir / f"X_train{suffix}")
+    y_train = load_labels(cache_dir / f"y_train{suffix}.npy")
+    X_test = load_matrix(cache_dir / "X_test")
+    y_test = load_labels(cache_dir / "y_test.npy")
+
+    class_weight = 'balanced' if spec["balance"] and balance == "class_weight" else None
+    classifier = build_classifier(name, n_jobs, class_weight, params)
+    classifier.fit(X_train, y_train)
+    y_pred = classifier.predict(X_test)
+    report = classification_report(y_test, y_pred, zero_division=0)
+    confusion_matrix_path = save_confusion_matrix(y_test, y_pred, f"Matriz de Confusão - {spec['title']}",
+                                                  spec["report"])
+
+    model_path = None
+    if spec["artifact"]:
+        # Pipeline final (sem SMOTE) para uso na API
+        api_pipeline = Pipeline(steps=[
+            ('preprocessor', joblib.load(cache_dir / "preprocessor.joblib")),
+            ('classifier', classifier)
+        ])
+        model_path = ARTIFACTS_DIR / spec["artifact"]
+        joblib.dump(api_pipeline, model_path)
+        if spec["serving"]:
+            from md_model.serving import export_serving_artifact, serving_path
+            export_serving_artifact(api_pipeline, serving_path(model_path))
+
+    return {"name": name, "report": report, "seconds": time.perf_counter() - inicio, "n_jobs": n_jobs,
+            "metrics": evaluation_metrics(y_test, y_pred),
+            "confusion_matrix": str(confusion_matrix_path), "model_path": str(model_path) if model_path else None}
+
+
+def core_budgets(names: list, total_cores: int = None, overrides: dict = None):
+    """Divide os núcleos entre os modelos proporcionalmente ao peso de cada um."""
+    total_cores = total_cores or os.cpu_count() or 1
+    overrides = overrides or {}
+    budgets = {name: overrides[name] for name in names if name in overrides}
+    restantes = [name for name in names if name not in budgets]
+    livres = max(total_cores - sum(budgets.values()), len(restantes))
+    peso_total = sum(MODELS[name]["weight"] for name in restantes) or 1
+    for name in restantes:
+        budgets[name] = max(1, livres * MODELS[name]["weight"] // peso_total)
+    return budgets
+
+
+def run(names: list = None, total_cores: int = None, overrides: dict = None, force: bool = False,
+        sparse: bool = False, balance: str = "smote", tuned: bool = False, promote: bool = False):
+    names = names or list(MODELS)
+    with_smote = balance == "smote" and any(MODELS[name]["balance"] for name in names)
+    cache_dir = prepare_data(with_smote=with_smote, force=force, sparse=sparse)
+    budgets = core_budgets(names, total_cores, overrides)
+    params = {}
+    if tuned:
+        from md_training.tuning import load_best_params
+        params = {name: load_best_params(name, cache_dir, balance) for name in names}
+        for name in names:
+            if params[name] is not None:
+                print(f"{MODELS[name]['title']}: hiperparâmetros da busca {params[name]}")
+            elif MODELS[name]["balance"]:
+                print(f"{MODELS[name]['title']}: sem busca com --balance {balance}; usando os padrões")
+    print(f"Treinando {', '.join(names)} em paralelo (núcleos: {budgets})")
+
+    resultados = {}
+    # "spawn" evita herdar o estado do OpenMP do processo pai (fork + OpenMP pode travar).
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(names), mp_context=context) as pool:
+        futures = {pool.submit(train_model, name, cache_dir, budgets[name], balance, params.get(name)): name for name in names}
+        for future in as_completed(futures):
+            resultado = future.result()
+            resultados[resultado["name"]] = resultado
+            print(f"--- {MODELS[resultado['name']]['title']} concluído em {resultado['seconds']:.1f}s "
+                  f"({resultado['n_jobs']} núcleos) ---")
+            print(resultado["report"])
+            print(f"Matriz de Confusão salva em: {resultado['confusion_matrix']}")
+            if resultado["model_path"]:
+                print(f"Modelo para API salvo em: {resultado['model_path']}")
+                # Registro feito aqui, no processo pai: um único escritor do manifesto.
+                register_model(resultado["name"], resultado["model_path"], resultado["metrics"], promote)
+    return resultados
+
+
+def _parse_budgets(values):
+    overrides = {}
+    for value in values or []:
+        name, _, cores = value.partition("=")
+        overrides[name] = int(cores)
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treina os modelos com pré-processamento compartilhado.")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--cores", type=int, default=None, help="Total de núcleos a distribuir")
+    parser.add_argument("--budget", nargs="*", metavar="MODELO=NUCLEOS", help="Núcleos fixos por modelo")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache de matrizes pré-processadas")
+    parser.add_argument("--sparse", action="store_true", help="Mantém as matrizes de features em CSR")
+    parser.add_argument("--balance", choices=BALANCE_MODES, default="smote",
+                        help="smote (reamostragem) ou class_weight (pesos de classe, sem multiplicar linhas)")
+    parser.add_argument("--tuned", action="store_true",
+                        help="Usa os hiperparâmetros encontrados por md_training/tuning.py")
+    parser.add_argument("--promote", action="store_true", help="Promove as versões registradas para a API")
+    args = parser.parse_args(argv)
+
+    print(">>> Iniciando o pipeline de treinamento de modelos...")
+    run(args.models, args.cores, _parse_budgets(args.budget), args.force, args.sparse, args.balance, args.tuned,
+        args.promote)
+    print(">>> Pipeline de treinamento de modelos finalizado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# md_training/streaming.py
+"""Treino do LightGBM fora da memória (out-of-core).
+
+O CSV é lido em blocos e nunca é carregado inteiro:
+
+1. uma primeira leitura só da coluna de data define o corte temporal 80/20
+   (k-ésimo menor timestamp, sem ordenar o arquivo);
+2. uma passada de ajuste acumula, apenas nas linhas de treino, média/variância
+   do StandardScaler (``partial_fit``), as categorias do OneHotEncoder e as
+   frequências de termos/documentos do TF-IDF;
+3. uma passada de transformação grava as features em memmaps no disco, de onde
+   o ``lightgbm.Dataset`` é construído por meio de ``lightgbm.Sequence``.
+
+Como o SMOTE precisa do conjunto inteiro em memória, aqui o desbalanceamento é
+tratado com pesos de classe ("balanced").
+"""
+import json
+import math
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import classification_report
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from md_model.booster import BoosterClassifier
+from md_model.serving import export_serving_artifact, serving_path
+from md_training.common import (ARTIFACTS_DIR, DATA_FILE, FEATURES_TO_DROP, TARGET, TEXT_COL, TFIDF_PARAMS,
+                                TRAIN_FRACTION, evaluation_metrics, portuguese_stopwords, register_model,
+                                save_confusion_matrix)
+
+STREAMING_DIR = ARTIFACTS_DIR / ".train_cache" / "streaming"
+DEFAULT_CHUNKSIZE = 100_000
+LGBM_PARAMS = {"learning_rate": 0.1, "num_leaves": 31, "seed": 42, "verbosity": -1}
+NUM_BOOST_ROUND = 100
+
+
+def _read_chunks(data_file, chunksize: int, usecols=None):
+    for chunk in pd.read_csv(data_file, chunksize=chunksize, usecols=usecols):
+        chunk['data_ocorrencia'] = pd.to_datetime(chunk['data_ocorrencia'])
+        yield chunk
+
+
+def temporal_cutoff(data_file, chunksize: int, train_fraction: float = TRAIN_FRACTION):
+    """Timestamp de corte: linhas anteriores a ele formam os primeiros 80% no tempo."""
+    stamps = np.concatenate([
+        chunk['data_ocorrencia'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        for chunk in _read_chunks(data_file, chunksize, usecols=['data_ocorrencia'])
+    ])
+    train_size = int(train_fraction * len(stamps))
+    return np.partition(stamps, train_size)[train_size], len(stamps)
+
+
+def _is_train(chunk, cutoff):
+    return chunk['data_ocorrencia'].to_numpy(dtype='datetime64[ns]').view(np.int64) < cutoff
+
+
+class _StreamingStats:
+    """Estatísticas acumuladas na passada de ajuste (apenas linhas de treino)."""
+
+    def __init__(self, stop_words):
+        self.scaler = StandardScaler()
+        self.categories = {}
+        self.labels = Counter()
+        self.term_counts = Counter()
+        self.doc_counts = Counter()
+        self.n_docs = 0
+        self.n_train = 0
+        self.n_test = 0
+        self.num_cols = None
+        self.cat_cols = None
+        self.analyzer = TfidfVectorizer(stop_words=stop_words, **TFIDF_PARAMS).build_analyzer()
+
+    def update(self, chunk, train_mask):
+        X = chunk.drop(columns=FEATURES_TO_DROP)
+        if self.num_cols is None:
+            self.num_cols = X.select_dtypes(include=np.number).columns.tolist()
+            self.cat_cols = [col for col in X.columns if col not in self.num_cols and col != TEXT_COL]
+            self.categories = {col: set() for col in self.cat_cols}
+        self.n_test += int((~train_mask).sum())
+        train = X[train_mask]
+        if not len(train):
+            return
+        self.n_train += len(train)
+        self.scaler.partial_fit(train[self.num_cols])
+        for col in self.cat_cols:
+            self.categories[col].update(train[col].dropna().unique().tolist())
+        self.labels.update(chunk.loc[train_mask, TARGET].tolist())
+        # Descrições se repetem muito: analisa cada texto distinto uma vez só.
+        for doc, freq in train[TEXT_COL].value_counts().items():
+            terms = self.analyzer(doc)
+            for term, count in Counter(terms).items():
+                self.term_counts[term] += count * freq
+                self.doc_counts[term] += freq
+        self.n_docs += len(train)
+
+    def vocabulary(self):
+        selected = sorted(self.term_counts, key=lambda term: (-self.term_counts[term], term))
+        selected = sorted(selected[:TFIDF_PARAMS["max_features"]])
+        return {term: i for i, term in enumerate(selected)}
+
+    def idf(self, vocabulary):
+        # Mesma fórmula do TfidfTransformer com smooth_idf=True.
+        doc_freq = np.array([self.doc_counts[term] for term in vocabulary], dtype=np.float64)
+        return np.log((1 + self.n_docs) / (1 + doc_freq)) + 1
+
+
+def build_preprocessor(stats: _StreamingStats, stop_words, sample: pd.DataFrame):
+    """Monta o ColumnTransformer já ajustado a partir das estatísticas acumuladas.
+
+    Categorias e vocabulário são fixados na configuração, então o ajuste na
+    amostra só define a estrutura; média/variância e idf vêm do streaming.
+    """
+    vocabulary = stats.vocabulary()
+    categories = [sorted(stats.categories[col]) for col in stats.cat_cols]
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), stats.num_cols),
+            ("cat", OneHotEncoder(categories=categories, handle_unknown="ignore", sparse_output=False),
+             stats.cat_cols),
+            ("text_tfidf", TfidfVectorizer(stop_words=stop_words, vocabulary=vocabulary,
+                                           ngram_range=TFIDF_PARAMS["ngram_range"]), TEXT_COL)
+        ],
+        remainder='passthrough'
+    )
+    preprocessor.fit(sample.drop(columns=FEATURES_TO_DROP))
+
+    scaler = preprocessor.named_transformers_['num']
+    for attr in ('mean_', 'var_', 'scale_', 'n_samples_seen_'):
+        setattr(scaler, attr, getattr(stats.scaler, attr))
+    preprocessor.named_transformers_['text_tfidf'].idf_ = stats.idf(vocabulary)
+    return preprocessor
+
+
+class _MemmapSequence(lgb.Sequence):
+    """Expõe o memmap ao LightGBM por lotes (convertidos para float64, como ele exige)."""
+
+    def __init__(self, data, batch_size: int):
+        self.data = data
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        return np.asarray(self.data[idx], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _spill_features(data_file, chunksize, cutoff, preprocessor, classes, stats):
+    """Transforma o CSV bloco a bloco e grava treino/teste em memmaps float32."""
+    STREAMING_DIR.mkdir(parents=True, exist_ok=True)
+    n_features = len(preprocessor.get_feature_names_out())
+    X_train = np.lib.format.open_memmap(STREAMING_DIR / "X_train.npy", mode='w+', dtype=np.float32,
+                                        shape=(stats.n_train, n_features))
+    X_test = np.lib.format.open_memmap(STREAMING_DIR / "X_test.npy", mode='w+', dtype=np.float32,
+                                       shape=(stats.n_test, n_features))
+    y_train = np.empty(stats.n_train, dtype=np.int32)
+    y_test = np.empty(stats.n_test, dtype=object)
+    class_index = {label: i for i, label in enumerate(classes)}
+    pos_train = pos_test = 0
+    for chunk in _read_chunks(data_file, chunksize):
+        train_mask = _is_train(chunk, cutoff)
+        features = preprocessor.transform(chunk.drop(columns=FEATURES_TO_DROP))
+        if hasattr(features, 'toarray'):
+            features = features.toarray()
+        labels = chunk[TARGET].to_numpy(dtype=object)
+        n = int(train_mask.sum())
+        X_train[pos_train:pos_train + n] = features[train_mask]
+        y_train[pos_train:pos_train + n] = [class_index[label] for label in labels[train_mask]]
+        pos_train += n
+        m = len(chunk) - n
+        X_test[pos_test:pos_test + m] = features[~train_mask]
+        y_test[pos_test:pos_test + m] = labels[~train_mask]
+        pos_test += m
+    X_train.flush()
+    X_test.flush()
+    return X_train, y_train, X_test, y_test
+
+
+def train_lightgbm_streaming(data_file=DATA_FILE, chunksize: int = DEFAULT_CHUNKSIZE, n_jobs: int = -1,
+                             promote: bool = False):
+    print("--- Módulo de Treinamento: LightGBM (streaming) ---")
+    inicio = time.perf_counter()
+    stop_words = portuguese_stopwords()
+
+    cutoff, n_rows = temporal_cutoff(data_file, chunksize)
+    print(f"Corte temporal em {pd.Timestamp(cutoff)} ({n_rows} linhas)")
+
+    stats = _StreamingStats(stop_words)
+    sample = None
+    for chunk in _read_chunks(data_file, chunksize):
+        train_mask = _is_train(chunk, cutoff)
+        stats.update(chunk, train_mask)
+        if sample is None and train_mask.any():
+            sample = chunk[train_mask].head(1000)
+    preprocessor = build_preprocessor(stats, stop_words, sample)
+    classes = sorted(stats.labels)
+
+    X_train, y_train, X_test, y_test = _spill_features(data_file, chunksize, cutoff, preprocessor, classes, stats)
+
+    # Pesos "balanced": n / (n_classes * contagem da classe).
+    class_weights = np.array([stats.n_train / (len(classes) * stats.labels[label]) for label in classes])
+    dataset = lgb.Dataset(_MemmapSequence(X_train, batch_size=min(chunksize, 65536)), label=y_train,
+                          weight=class_weights[y_train], params={"max_bin": 255, "verbosity": -1})
+    dataset.construct()
+    dataset.save_binary(str(STREAMING_DIR / "train.bin"))
+
+    print("Treinando o modelo LightGBM (streaming)...")
+    params = {**LGBM_PARAMS, "objective": "multiclass", "num_class": len(classes), "num_threads": max(n_jobs, 0)}
+    booster = lgb.train(params, dataset, num_boost_round=NUM_BOOST_ROUND)
+    classifier = BoosterClassifier(booster, classes)
+
+    print("Avaliando o modelo LightGBM (streaming)...")
+    y_pred = np.concatenate([
+        classifier.predict(X_test[inicio_lote:inicio_lote + chunksize])
+        for inicio_lote in range(0, len(X_test), chunksize)
+    ]) if len(X_test) else np.empty(0, dtype=object)
+    print("Relatório de Classificação (LightGBM streaming):")
+    print(classification_report(y_test, y_pred, zero_division=0))
+    confusion_matrix_path = save_confusion_matrix(y_test, y_pred, 'Matriz de Confusão - LightGBM',
+                                                  "confusion_matrix_LightGBM.png")
+    print(f"Matriz de Confusão do LightGBM salva em: {confusion_matrix_path}")
+
+    api_pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('classifier', classifier)])
+    model_path = ARTIFACTS_DIR / "lightgbm_model.joblib"
+    joblib.dump(api_pipeline, model_path)
+    (STREAMING_DIR / "meta.json").write_text(json.dumps({
+        "n_train": stats.n_train, "n_test": stats.n_test, "classes": classes,
+        "seconds": math.floor(time.perf_counter() - inicio)
+    }, ensure_ascii=False), encoding="utf-8")
+    print(f"Modelo LightGBM para API salvo em: {model_path}")
+    print(f"Artefato de serviço salvo em: {export_serving_artifact(api_pipeline, serving_path(model_path))}")
+    register_model("lightgbm", model_path, evaluation_metrics(y_test, y_pred), promote=promote)
+    print("--- Módulo LightGBM (streaming) concluído. ---")
+    return api_pipeline
@@ -1,77 +1,47 @@
 # train_randomforest.py
-import pandas as pd
-import numpy as np
 import joblib
-import os
-import matplotlib.pyplot as plt
+import sys
 from pathlib import Path
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline  # <-- CORREÇÃO: ADICIONADO ESTE IMPORT
-from sklearn.metrics import classification_report, ConfusionMatrixDisplay
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import classification_report
 from sklearn.ensemble import RandomForestClassifier
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
-from nltk.corpus import stopwords
-import nltk
 
-print("--- Módulo de Treinamento: RandomForest ---")
-
-# --- Download de dependências do NLTK ---
-try:
-    stopwords.words('portuguese')
-except LookupError:
-    print("Baixando o pacote 'stopwords' do NLTK...")
-    nltk.download('stopwords')
-
-# --- DEFINIÇÃO DOS CAMINHOS ---
-SCRIPT_DIR = Path(__file__).resolve().parent
-BASE_DIR = SCRIPT_DIR.parent
-DATA_FILE = BASE_DIR / "data" / "dataset_ocorrencias_delegacia_5.csv"
-ARTIFACTS_DIR = BASE_DIR / "artifacts"
-REPORTS_DIR = BASE_DIR / "reports"
-
-os.makedirs(ARTIFACTS_DIR, exist_ok=True)
-os.makedirs(REPORTS_DIR, exist_ok=True)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from md_training.common import (ARTIFACTS_DIR, load_temporal_split, feature_columns, create_preprocessor,
+                                parse_training_mode, portuguese_stopwords, save_confusion_matrix,
+                                evaluation_metrics, register_model)
 
-# --- Carregamento e Preparação dos Dados ---
-df = pd.read_csv(DATA_FILE)
-df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'])
+print("--- Módulo de Treinamento: RandomForest ---")
 
-target = "tipo_crime"
-features_to_drop = [target, "id_ocorrencia", "data_ocorrencia"]
+# --- Modo de treino (--sparse / --balance smote|class_weight) ---
+mode = parse_training_mode()
 
-# --- Divisão Temporal (Temporal Split) ---
-df_sorted = df.sort_values("data_ocorrencia")
-train_size = int(0.8 * len(df_sorted))
-train_df = df_sorted.iloc[:train_size]
-test_df = df_sorted.iloc[train_size:]
+# --- Download de dependências do NLTK ---
+stop_words = portuguese_stopwords()
 
-X_train, y_train = train_df.drop(columns=features_to_drop), train_df[target]
-X_test, y_test = test_df.drop(columns=features_to_drop), test_df[target]
+# --- Carregamento e Divisão Temporal (Temporal Split) ---
+X_train, y_train, X_test, y_test = load_temporal_split()
 
 # --- Definição das colunas ---
-num_cols = X_train.select_dtypes(include=np.number).columns.tolist()
-text_col = 'descricao_modus_operandi'
-cat_cols = [col for col in X_train.select_dtypes(include=['object']).columns.tolist() if col != text_col]
+num_cols, cat_cols = feature_columns(X_train)
 
 # --- Pipeline de Pré-processamento ---
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), num_cols),
-        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), cat_cols),
-        ("text_tfidf", TfidfVectorizer(max_features=1000, ngram_range=(1, 2), stop_words=stopwords.words('portuguese')), text_col)
-    ],
-    remainder='passthrough'
-)
-
-# --- Pipeline de Modelagem (com SMOTE) ---
-pipeline = ImbPipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('smote', SMOTE(random_state=42)),
-    ('classifier', RandomForestClassifier(random_state=42, n_jobs=-1))
-])
+preprocessor = create_preprocessor(num_cols, cat_cols, stop_words, sparse=mode.sparse)
+
+# --- Pipeline de Modelagem (com SMOTE ou pesos de classe) ---
+if mode.balance == "smote":
+    pipeline = ImbPipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('smote', SMOTE(random_state=42)),
+        ('classifier', RandomForestClassifier(random_state=42, n_jobs=-1))
+    ])
+else:
+    pipeline = ImbPipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(random_state=42, n_jobs=-1, class_weight='balanced'))
+    ])
 
 # Treinamento
 print("Treinando o modelo RandomForest...")
@@ -84,13 +54,8 @@ print("Relatório de Classificação (RandomForest):")
 print(classification_report(y_test, y_pred, zero_division=0))
 
 # Salvar Matriz de Confusão
-fig, ax = plt.subplots(figsize=(15, 15))
-ConfusionMatrixDisplay.from_predictions(y_test, y_pred, ax=ax, xticks_rotation='vertical', colorbar=True)
-plt.title('Matriz de Confusão - RandomForest')
-plt.tight_layout()
-confusion_matrix_path = REPORTS_DIR / "confusion_matrix_RandomForest.png"
-plt.savefig(confusion_matrix_path)
-
+confusion_matrix_path = save_confusion_matrix(y_test, y_pred, 'Matriz de Confusão - RandomForest',
+                                              "confusion_matrix_RandomForest.png")
 print(f"Matriz de Confusão do RandomForest salva em: {confusion_matrix_path}")
 
 # Salvar o pipeline final (sem SMOTE) para uso na API
@@ -102,4 +67,5 @@ model_path = ARTIFACTS_DIR / "randomforest_model.joblib"
 joblib.dump(api_pipeline, model_path)
 
 print(f"Modelo RandomForest para API salvo em: {model_path}")
-print("--- Módulo RandomForest concluído. ---")
\ No newline at end of file
+register_model("randomforest", model_path, evaluation_metrics(y_test, y_pred), promote=mode.promote)
+print("--- Módulo RandomForest concluído. ---")
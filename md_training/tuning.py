@@ -0,0 +1,274 @@
+# md_training/tuning.py
+"""Busca de hiperparâmetros (successive halving / Hyperband).
+
+Cada configuração é avaliada com orçamentos crescentes de árvores; só a fração
+``1/eta`` melhor de cada degrau sobe para o próximo. As avaliações:
+
+- reaproveitam as matrizes pré-processadas do orquestrador (mesmo cache em
+  ``artifacts/.train_cache/<hash>``, abertas via mmap em cada processo);
+- validam em dobras temporais dentro do treino (o teste 80/20 fica intocado);
+- balanceiam as classes como o treino final: com ``--balance smote`` o trecho
+  de ajuste de cada dobra é reamostrado pelo SMOTE (a validação não), com
+  ``--balance class_weight`` usam pesos de classe;
+- rodam em paralelo num pool de processos;
+- são gravadas uma a uma num arquivo NDJSON, então uma busca interrompida
+  retoma de onde parou sem repetir tentativas.
+
+O melhor resultado vai para ``<cache>/tuning/<modelo>_best.json`` e pode ser
+usado pelo orquestrador com ``--tuned``.
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from md_training.common import BALANCE_MODES, TRAIN_FRACTION
+from md_training.orchestrator import SMOTE_RANDOM_STATE, build_classifier, load_labels, load_matrix, prepare_data
+
+SEARCH_SPACES = {
+    "lightgbm": {
+        "learning_rate": ("log", 0.01, 0.3),
+        "num_leaves": ("int", 15, 255),
+        "min_child_samples": ("int", 5, 100),
+        "subsample": ("float", 0.5, 1.0),
+        "colsample_bytree": ("float", 0.3, 1.0),
+        "reg_lambda": ("log", 1e-3, 10.0),
+    },
+    "randomforest": {
+        "max_depth": ("choice", [None, 10, 20, 40]),
+        "max_features": ("choice", ["sqrt", "log2", 0.1, 0.3]),
+        "min_samples_leaf": ("int", 1, 10),
+    },
+}
+# Orçamento (número de árvores) mínimo e máximo de cada modelo.
+RESOURCES = {"lightgbm": (50, 1000), "randomforest": (25, 400)}
+
+
+def sample_config(space: dict, rng: np.random.Generator):
+    config = {}
+    for name, (kind, *args) in space.items():
+        if kind == "log":
+            config[name] = float(math.exp(rng.uniform(math.log(args[0]), math.log(args[1]))))
+        elif kind == "float":
+            config[name] = float(rng.uniform(args[0], args[1]))
+        elif kind == "int":
+            config[name] = int(rng.integers(args[0], args[1] + 1))
+        elif kind == "choice":
+            config[name] = args[0][int(rng.integers(len(args[0])))]
+        else:
+            raise ValueError(f"Tipo de parâmetro desconhecido: {kind}")
+    return config
+
+
+def temporal_folds(n_rows: int, n_folds: int = 1):
+    """Dobras temporais (fim do ajuste, fim da validação) sobre o treino ordenado por data.
+
+    Com uma dobra, os primeiros 80% ajustam e o restante valida; com ``k``
+    dobras a origem rola: a dobra ``i`` ajusta em ``i + 1`` blocos e valida no
+    bloco seguinte.
+    """
+    if n_folds == 1:
+        return [(int(TRAIN_FRACTION * n_rows), n_rows)]
+    size = n_rows // (n_folds + 1)
+    return [((i + 1) * size, n_rows if i == n_folds - 1 else (i + 2) * size) for i in range(n_folds)]
+
+
+def evaluate_trial(name: str, cache_dir: str, params: dict, budget: int, n_folds: int, n_jobs: int,
+                   balance: str = "smote"):
+    """Treina uma configuração com ``budget`` árvores e devolve o F1 macro médio nas dobras.
+
+    O balanceamento é o mesmo do treino final (``balance``), e o modelo
+    avaliado tem exatamente ``budget`` árvores: é esse o ``n_estimators``
+    levado para o orquestrador, que não tem conjunto de validação para early
+    stopping.
+    """
+    from sklearn.metrics import f1_score
+
+    cache_dir = Path(cache_dir)
+    X = load_matrix(cache_dir / "X_train")
+    y = load_labels(cache_dir / "y_train.npy")
+    inicio = time.perf_counter()
+    class_weight = 'balanced' if balance == "class_weight" else None
+    scores = []
+    for fit_end, val_end in temporal_folds(X.shape[0], n_folds):
+        classifier = build_classifier(name, n_jobs, class_weight, params={**params, "n_estimators": budget})
+        X_fit, y_fit = X[:fit_end], y[:fit_end]
+        X_val, y_val = X[fit_end:val_end], y[fit_end:val_end]
+        if balance == "smote":
+            from imblearn.over_sampling import SMOTE
+            X_fit, y_fit = SMOTE(random_state=SMOTE_RANDOM_STATE).fit_resample(X_fit, y_fit)
+        if name == "lightgbm":
+            classifier.set_params(verbosity=-1)
+        classifier.fit(X_fit, y_fit)
+        scores.append(float(f1_score(y_val, classifier.predict(X_val), average="macro", zero_division=0)))
+    return {"score": float(np.mean(scores)), "seconds": time.perf_counter() - inicio}
+
+
+class TrialStore:
+    """Resultados já avaliados, persistidos em NDJSON (uma linha por tentativa)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.results = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                # Uma linha truncada (processo morto no meio da escrita) é descartada.
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.results[(record["trial"], record["budget"])] = record
+
+    def get(self, trial: str, budget: int):
+        return self.results.get((trial, budget))
+
+    def add(self, record: dict):
+        self.results[(record["trial"], record["budget"])] = record
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def best(self):
+        """Melhor resultado no maior orçamento avaliado (desempate pelo score)."""
+        if not self.results:
+            return None
+        return max(self.results.values(), key=lambda r: (r["budget"], r["score"]))
+
+
+class HalvingSearch:
+    def __init__(self, name: str, cache_dir: Path, eta: int = 3, min_resource: int = None,
+                 max_resource: int = None, n_folds: int = 1, seed: int = 42, workers: int = None,
+                 total_cores: int = None, balance: str = "smote"):
+        default_min, default_max = RESOURCES[name]
+        self.name = name
+        self.cache_dir = cache_dir
+        self.eta = eta
+        self.min_resource = min_resource or default_min
+        self.max_resource = max_resource or default_max
+        self.n_folds = n_folds
+        self.seed = seed
+        self.balance = balance
+        total_cores = total_cores or os.cpu_count() or 1
+        self.workers = max(1, min(workers or total_cores, total_cores))
+        self.n_jobs = max(1, total_cores // self.workers)
+        tuning_dir = cache_dir / "tuning"
+        tuning_dir.mkdir(parents=True, exist_ok=True)
+        self.store = TrialStore(tuning_dir / f"{name}-{self._search_hash()}.ndjson")
+        self.best_path = tuning_dir / f"{name}_best.json"
+
+    def _search_hash(self):
+        config = {"name": self.name, "space": SEARCH_SPACES[self.name], "eta": self.eta, "seed": self.seed,
+                  "min_resource": self.min_resource, "max_resource": self.max_resource, "n_folds": self.n_folds,
+                  "balance": self.balance}
+        payload = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:12]
+
+    def _evaluate(self, pool, trials: dict, budget: int):
+        """Avalia (ou recupera do disco) todas as tentativas num degrau de orçamento."""
+        futures = {}
+        for trial, params in trials.items():
+            if self.store.get(trial, budget) is None:
+                futures[trial] = pool.submit(evaluate_trial, self.name, str(self.cache_dir), params, budget,
+                                             self.n_folds, self.n_jobs, self.balance)
+        for trial, future in futures.items():
+            result = future.result()
+            self.store.add({"trial": trial, "budget": budget, "params": trials[trial], **result})
+            print(f"  [{self.name}] {trial} @ {budget} árvores: F1 macro {result['score']:.4f} "
+                  f"({result['seconds']:.1f}s)")
+        return {trial: self.store.get(trial, budget)["score"] for trial in trials}
+
+    def successive_halving(self, pool, n_configs: int, min_resource: int, bracket: int = 0):
+        rng = np.random.default_rng([self.seed, bracket])
+        trials = {f"b{bracket}-{i}": sample_config(SEARCH_SPACES[self.name], rng) for i in range(n_configs)}
+        budget = min_resource
+        while trials:
+            print(f"[{self.name}] bracket {bracket}: {len(trials)} configurações com {budget} árvores")
+            scores = self._evaluate(pool, trials, budget)
+            next_budget = budget * self.eta
+            if next_budget > self.max_resource or len(trials) == 1:
+                break
+            keep = max(1, len(trials) // self.eta)
+            ranking = sorted(trials, key=lambda trial: -scores[trial])[:keep]
+            trials = {trial: trials[trial] for trial in ranking}
+            budget = next_budget
+
+    def hyperband(self, pool):
+        s_max = int(math.floor(math.log(self.max_resource / self.min_resource, self.eta)))
+        for s in range(s_max, -1, -1):
+            n_configs = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            min_resource = int(self.max_resource * self.eta ** -s)
+            self.successive_halving(pool, n_configs, min_resource, bracket=s)
+
+    def run(self, n_configs: int = 27, hyperband: bool = False):
+        inicio = time.perf_counter()
+        if self.store.results:
+            print(f"[{self.name}] retomando a busca: {len(self.store.results)} avaliações já em {self.store.path}")
+        # "spawn" pelo mesmo motivo do orquestrador (fork + OpenMP pode travar).
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            if hyperband:
+                self.hyperband(pool)
+            else:
+                self.successive_halving(pool, n_configs, self.min_resource)
+
+        best = self.store.best()
+        params = {**best["params"], "n_estimators": best["budget"]}
+        self.best_path.write_text(json.dumps({"params": params, "score": best["score"], "trial": best["trial"],
+                                              "balance": self.balance}, ensure_ascii=False, indent=2),
+                                  encoding="utf-8")
+        print(f"[{self.name}] melhor F1 macro {best['score']:.4f} com {params} "
+              f"({time.perf_counter() - inicio:.1f}s; salvo em {self.best_path})")
+        return params
+
+
+def load_best_params(name: str, cache_dir: Path, balance: str = "smote"):
+    """Hiperparâmetros do melhor resultado da busca para este cache e balanceamento, ou ``None``."""
+    best_path = cache_dir / "tuning" / f"{name}_best.json"
+    if not best_path.exists():
+        return None
+    best = json.loads(best_path.read_text(encoding="utf-8"))
+    # Buscas anteriores ao parâmetro balance avaliavam com pesos de classe.
+    if best.get("balance", "class_weight") != balance:
+        return None
+    return best["params"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros com successive halving / Hyperband.")
+    parser.add_argument("--models", nargs="+", choices=list(SEARCH_SPACES), default=list(SEARCH_SPACES))
+    parser.add_argument("--configs", type=int, default=27, help="Configurações iniciais (successive halving)")
+    parser.add_argument("--hyperband", action="store_true", help="Roda todos os brackets do Hyperband")
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--min-resource", type=int, default=None, help="Árvores no primeiro degrau")
+    parser.add_argument("--max-resource", type=int, default=None, help="Máximo de árvores")
+    parser.add_argument("--folds", type=int, default=1, help="Dobras temporais de validação dentro do treino")
+    parser.add_argument("--workers", type=int, default=None, help="Processos em paralelo")
+    parser.add_argument("--cores", type=int, default=None, help="Total de núcleos a distribuir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--balance", choices=BALANCE_MODES, default="smote",
+                        help="Balanceamento das tentativas; use o mesmo do treino final")
+    parser.add_argument("--sparse", action="store_true", help="Mantém as matrizes de features em CSR")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache de matrizes pré-processadas")
+    args = parser.parse_args(argv)
+
+    # O SMOTE das tentativas é feito por dobra, então o cache não precisa do treino reamostrado.
+    cache_dir = prepare_data(with_smote=False, force=args.force, sparse=args.sparse)
+    for name in args.models:
+        search = HalvingSearch(name, cache_dir, eta=args.eta, min_resource=args.min_resource,
+                               max_resource=args.max_resource, n_folds=args.folds, seed=args.seed,
+                               workers=args.workers, total_cores=args.cores, balance=args.balance)
+        search.run(n_configs=args.configs, hyperband=args.hyperband)
+
+
+if __name__ == "__main__":
+    main()
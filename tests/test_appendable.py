@@ -0,0 +1,34 @@
+"""Versões de um AppendOnlyArray não enxergam os acréscimos umas das outras."""
+import numpy as np
+
+from md_data_analysis.appendable import AppendOnlyArray
+
+
+def test_versoes_isoladas():
+    v0 = AppendOnlyArray(np.arange(3, dtype=np.int32))
+    v1 = v0.appended(np.array([3, 4], dtype=np.int32))
+    v2 = v1.appended(np.array([5], dtype=np.int32))
+    # Acrescentar a partir de uma versão antiga não pode sobrescrever a mais nova.
+    ramo = v1.appended(np.array([99], dtype=np.int32))
+    assert v0.array.tolist() == [0, 1, 2]
+    assert v1.array.tolist() == [0, 1, 2, 3, 4]
+    assert v2.array.tolist() == [0, 1, 2, 3, 4, 5]
+    assert ramo.array.tolist() == [0, 1, 2, 3, 4, 99]
+
+
+def test_reaproveita_o_buffer():
+    v = AppendOnlyArray(np.zeros(0, dtype=np.int64))
+    buffers = set()
+    for i in range(1000):
+        v = v.appended(np.array([i]))
+        buffers.add(id(v._buffer))
+    assert v.array.tolist() == list(range(1000))
+    # Crescimento geométrico: poucas realocações para mil acréscimos.
+    assert len(buffers) < 30
+
+
+def test_promove_o_tipo():
+    v = AppendOnlyArray(np.array(['OCR1'])).appended(np.array(['OCR123456']))
+    assert v.array.tolist() == ['OCR1', 'OCR123456']
+    linhas = AppendOnlyArray(np.array([[0, 1]], dtype=np.int32)).appended(np.array([[2, 3]], dtype=np.int32))
+    assert linhas.array.tolist() == [[0, 1], [2, 3]]
@@ -0,0 +1,54 @@
+"""O cubo esparso devolve as mesmas contagens que um groupby sobre as linhas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from md_data_analysis.cube import OccurrenceCube
+
+DIMS = ['bairro', 'tipo_crime', 'hora']
+
+
+@pytest.fixture
+def linhas():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        'bairro': rng.choice(['Boa Viagem', 'Pina', 'Torre', 'Graças'], n),
+        'tipo_crime': rng.choice(['Roubo', 'Furto', 'Homicídio'], n),
+        'hora': rng.integers(0, 24, n),
+    })
+
+
+def _esperado(df, filters, keep):
+    for dim, valores in filters.items():
+        df = df[df[dim].isin(valores)]
+    return sorted((chave if isinstance(chave, tuple) else (chave,)) + (total,)
+                  for chave, total in df.groupby(keep).size().items())
+
+
+@pytest.mark.parametrize("filters, keep", [
+    ({}, ['bairro']),
+    ({}, ['bairro', 'hora']),
+    ({'tipo_crime': ['Roubo']}, ['bairro', 'hora']),
+    ({'bairro': ['Pina', 'Inexistente', 'Torre'], 'hora': [3, 19]}, ['bairro', 'hora']),
+    ({'bairro': ['Bairro Novo']}, ['tipo_crime']),
+])
+def test_agregado_igual_ao_groupby(linhas, filters, keep):
+    cubo = OccurrenceCube.from_frame(linhas.iloc[:1500], DIMS, {'hora': list(range(24))})
+    extra = linhas.iloc[1500:].copy()
+    extra.loc[extra.index[:10], 'bairro'] = 'Bairro Novo'
+    anterior = cubo.copy()
+    cubo.add(extra)
+    todas = pd.concat([linhas.iloc[:1500], extra])
+
+    contagem = cubo.aggregate(filters, keep)
+    assert sorted(cubo.nonzero_cells(contagem, keep, filters)) == _esperado(todas, filters, keep)
+    # A cópia anterior ao add não vê as linhas novas.
+    assert anterior.marginal(['bairro']).sum() == 1500
+    assert 'Bairro Novo' not in anterior.labels['bairro']
+
+
+def test_eixo_filtrado_segue_a_ordem_do_filtro(linhas):
+    cubo = OccurrenceCube.from_frame(linhas, DIMS)
+    contagem = cubo.aggregate({'bairro': ['Torre', 'Pina']}, ['bairro'])
+    assert contagem.tolist() == [(linhas['bairro'] == 'Torre').sum(), (linhas['bairro'] == 'Pina').sum()]
@@ -0,0 +1,89 @@
+"""Paridade do FastFeatureEncoder com o ColumnTransformer sklearn que ele reproduz."""
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import MinMaxScaler
+
+from md_model.encoder import FastFeatureEncoder, UnsupportedTransformerError
+from md_training.common import DATA_FILE, FEATURES_TO_DROP, TEXT_COL, create_preprocessor, feature_columns
+
+ARTIFACT = Path(__file__).resolve().parent.parent / "artifacts" / "lightgbm_model.joblib"
+STOP_WORDS = ['a', 'o', 'de', 'da', 'do', 'com', 'em', 'e']
+
+
+def _expected(preprocessor, inputs):
+    expected = preprocessor.transform(pd.DataFrame(inputs))
+    return expected.toarray() if hasattr(expected, 'toarray') else expected
+
+
+def _assert_parity(preprocessor, inputs):
+    encoder = FastFeatureEncoder.from_column_transformer(preprocessor)
+    np.testing.assert_allclose(encoder.transform(inputs), _expected(preprocessor, inputs), rtol=0, atol=1e-9)
+    for x in inputs:
+        np.testing.assert_allclose(encoder.transform_one(x), _expected(preprocessor, [x])[0], rtol=0, atol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def training_frame():
+    df = pd.read_csv(DATA_FILE, nrows=600)
+    return df.drop(columns=FEATURES_TO_DROP)
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["denso", "esparso"])
+def preprocessor(request, training_frame):
+    num_cols, cat_cols = feature_columns(training_frame)
+    return create_preprocessor(num_cols, cat_cols, STOP_WORDS, sparse=request.param).fit(training_frame)
+
+
+@pytest.fixture(scope="module")
+def samples(training_frame):
+    return training_frame.head(20).to_dict(orient='records')
+
+
+def test_linhas_do_treino(preprocessor, samples):
+    _assert_parity(preprocessor, samples)
+
+
+def test_categorias_ineditas(preprocessor, samples):
+    inputs = [dict(x, bairro="Bairro Inexistente", arma_utilizada="Catapulta") for x in samples[:5]]
+    _assert_parity(preprocessor, inputs)
+
+
+def test_campos_ausentes(preprocessor, samples):
+    # Categóricos ausentes (None) viram linha de zeros; numéricos ausentes (NaN) propagam NaN.
+    inputs = [dict(samples[0], bairro=None, sexo_suspeito=None), dict(samples[1], idade_suspeito=np.nan),
+              dict(samples[2], **{TEXT_COL: ""})]
+    encoder = FastFeatureEncoder.from_column_transformer(preprocessor)
+    np.testing.assert_allclose(encoder.transform(inputs), _expected(preprocessor, inputs), rtol=0, atol=1e-9,
+                               equal_nan=True)
+
+
+def test_texto_fora_do_vocabulario(preprocessor, samples):
+    inputs = [dict(samples[0], **{TEXT_COL: "xilofone zumbido quasar"}),
+              dict(samples[1], **{TEXT_COL: samples[1][TEXT_COL] + " xilofone " + samples[1][TEXT_COL].upper()})]
+    _assert_parity(preprocessor, inputs)
+
+
+def test_sample_inputs_batem(preprocessor):
+    encoder = FastFeatureEncoder.from_column_transformer(preprocessor)
+    assert encoder.matches(preprocessor, encoder.sample_inputs())
+
+
+def test_transformador_nao_suportado(training_frame):
+    preprocessor = ColumnTransformer([("num", MinMaxScaler(), ["idade_suspeito"])]).fit(training_frame)
+    with pytest.raises(UnsupportedTransformerError):
+        FastFeatureEncoder.from_column_transformer(preprocessor)
+
+
+@pytest.mark.skipif(not ARTIFACT.exists(), reason="modelo treinado não encontrado em artifacts/")
+def test_pipeline_treinado(samples):
+    import joblib
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        preprocessor = joblib.load(ARTIFACT).named_steps['preprocessor']
+    inputs = samples + [dict(samples[0], bairro="Bairro Inexistente", **{TEXT_COL: "xilofone quasar"})]
+    _assert_parity(preprocessor, inputs)
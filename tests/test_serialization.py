@@ -0,0 +1,32 @@
+"""Os dois caminhos de ``dumps`` (orjson e json padrão) geram os mesmos bytes."""
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from md_core import serialization
+from md_core.serialization import dumps, to_columns
+
+VALORES = [
+    {"latitude": float("nan"), "longitude": -34.9, "ocorrencias": 3},
+    [float("inf"), float("-inf"), 1.5, None, "Boa Viagem"],
+    {"x": np.float32("nan"), "y": np.float64(2.5), "n": np.int16(7)},
+    {"coords": np.array([[1.0, np.nan], [np.inf, -8.0]], dtype=np.float32)},
+    {"data": datetime(2024, 5, 1, 19, 30), "dia": date(2024, 5, 1), "tupla": (np.nan, 1)},
+    to_columns([{"a": 1.0, "b": "x"}, {"a": float("nan"), "b": "y"}], ["a", "b"]),
+]
+
+
+@pytest.mark.parametrize("valor", VALORES)
+def test_stdlib_escreve_nan_como_null(valor, monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    corpo = dumps(valor)
+    assert b"NaN" not in corpo and b"Infinity" not in corpo
+
+
+@pytest.mark.parametrize("valor", VALORES)
+def test_backends_identicos(valor, monkeypatch):
+    pytest.importorskip("orjson")
+    com_orjson = dumps(valor)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert dumps(valor) == com_orjson